@@ -1,14 +1,31 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request
 from flask_cors import CORS
-import pickle
 import numpy as np
+import pandas as pd
 import sys
 import os
+import logging
+import multiprocessing
+from app_logging import configure_logging
 from priority_manager import PriorityManager
+from forecasting import LoadForecaster
+from telemetry import SITE_FIELD, DEFAULT_SITE, INTERVAL_MINUTES
+from feature_pipeline import FeaturePipeline, FEATURES, aggregate_feature_names, extract_mcb_readings, fill_load_features, fill_frame_load_features, model_features, model_input
 
 # Add parent directory to path to import grid_failure_handler
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from grid_failure_handler import simulate_grid_failure
+from shedding_planner import SheddingPlanner
+from grid_state import GridStateStore, APPLIED, DUPLICATE
+from grid_quality import SiteQualityMonitors, VOLTAGE_MIN, VOLTAGE_MAX, FREQUENCY_MIN, FREQUENCY_MAX
+from execution import InferenceExecutor
+from model_hosting import MODEL_HOSTING, load_model
+from mcb_inventory import InventoryStore
+from audit_log import AuditLog, AUDIT_LOG_DIR, AUDIT_LOG_ENABLED, KIND_PREDICT, KIND_MCB_DETAILED, model_version
+
+# Log records are handed to a background thread instead of written inline
+configure_logging()
+logger = logging.getLogger("app")
 
 app = Flask(__name__)
 CORS(app)
@@ -16,63 +33,117 @@ CORS(app)
 # Initialize priority manager
 priority_manager = PriorityManager()
 
-# Grid power state management
-grid_state = {
-    "power": 0.0,          # Grid power in kW
-    "voltage": 220.0,      # Grid voltage in V
-    "current": 0.0,        # Grid current in A
-    "status": 0,           # 0 = offline/failed, 1 = online/active
-    "frequency": 50.0,     # Grid frequency in Hz
-    "last_updated": None   # Timestamp of last update
-}
+# Grid power state per site, published as immutable versioned snapshots
+grid_states = GridStateStore()
+
+# Sag/swell, frequency excursion and RMS analytics over every applied reading
+grid_quality = SiteQualityMonitors()
+
+# MCB circuits per site, from mcb_inventory.json or the MCB_INVENTORY file/database
+mcb_inventories = InventoryStore()
+
+# Shedding plans per site, seeded from the configured MCB loads and priorities
+# and kept current from readings taken while the grid is up; built in the
+# background
+shedding_planner = SheddingPlanner()
+shedding_planner.start()
+for inventory_site, inventory in mcb_inventories.sites.items():
+    shedding_planner.update_loads(inventory_site, inventory.mcb_powers(), inventory.mcb_priorities())
 
 # Define model paths
 MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
 PRIORITY_MODEL_PATH = os.path.join(MODEL_DIR, "priority_reg.pkl")
 SOURCE_MODEL_PATH = os.path.join(MODEL_DIR, "source_clf.pkl")
+FORECAST_MODEL_PATH = os.path.join(MODEL_DIR, "forecast_model.pkl")
+DATASET_PATH = os.path.join(os.path.dirname(MODEL_DIR), "dataset", "energy_dataset.csv")
 
-# Load models
+# Load models; MODEL_HOSTING=shared maps one flattened copy into every worker
 try:
-    with open(PRIORITY_MODEL_PATH, "rb") as f:
-        priority_reg = pickle.load(f)
-    with open(SOURCE_MODEL_PATH, "rb") as f:
-        source_clf = pickle.load(f)
-    print("Models loaded successfully")
+    priority_reg = load_model(PRIORITY_MODEL_PATH)
+    source_clf = load_model(SOURCE_MODEL_PATH)
+    MODEL_VERSION = model_version(PRIORITY_MODEL_PATH, SOURCE_MODEL_PATH)
+    logger.info("Models loaded successfully", extra={"hosting": MODEL_HOSTING, "model_version": MODEL_VERSION})
+    # Models trained before the feature pipeline only read the base features
+    for name, model in [("priority_reg", priority_reg), ("source_clf", source_clf)]:
+        if not set(aggregate_feature_names()) & set(model_features(model)):
+            logger.warning(f"{name} has no rolling aggregate features; retrain with train_and_save_models.py to use them")
 except Exception as e:
-    print(f"Error loading models: {e}")
+    logger.error(f"Error loading models: {e}")
     # Instead of exiting, we'll set the variables to None and check in each endpoint
     priority_reg = None
     source_clf = None
+    MODEL_VERSION = ""
 
-FEATURES = [
-    "Solar_Power(kW)", "Wind_Power(kW)", "DG_Power(kW)", "UPS_Power(kW)",
-    "Battery_Percentage(%)", "Total_Load_Demand(kW)", "Critical_Load(kW)", "Non_Critical_Load(kW)"
-]
+# Every shedding decision is recorded off the request path; see audit_log.py
+# for the query tool. AUDIT_LOG=0 turns recording off.
+audit_log = AuditLog(AUDIT_LOG_DIR).start() if AUDIT_LOG_ENABLED else None
 
-@app.route("/predict", methods=["POST"])
-def predict():
+# Optionally run model inference on a pre-warmed process pool so /predict is
+# not limited to one core; INFERENCE_WORKERS=0 keeps it on the request thread.
+# Workers are spawned (see execution.py); when this module is the main
+# script each worker re-imports it, so only the parent creates the pool.
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", "0"))
+inference_executor = None
+if INFERENCE_WORKERS > 0 and priority_reg is not None and multiprocessing.parent_process() is None:
+    try:
+        inference_executor = InferenceExecutor(PRIORITY_MODEL_PATH, SOURCE_MODEL_PATH, INFERENCE_WORKERS).start()
+        logger.info(f"Inference pool started with {INFERENCE_WORKERS} workers")
+    except Exception as e:
+        logger.error(f"Error starting inference pool: {e}")
+
+# Load the forecaster and seed per-site history from the dataset
+try:
+    forecaster = LoadForecaster.load(FORECAST_MODEL_PATH)
+    if os.path.exists(DATASET_PATH):
+        # Same derived loads the forecaster was trained on and /predict feeds it
+        history = pd.read_csv(DATASET_PATH)
+        forecaster.warm_start(fill_frame_load_features(history, mcb_inventories,
+                                                       SITE_FIELD if SITE_FIELD in history.columns else None))
+    logger.info("Forecast model loaded successfully")
+except Exception as e:
+    logger.error(f"Error loading forecast model: {e}")
+    forecaster = None
+
+# Per-site rolling aggregates shared by both models
+feature_pipeline = FeaturePipeline(mcb_inventories)
+
+# Each endpoint's logic lives in a *_response function that returns a JSON
+# body (and optional status code), so the Flask routes below and the async
+# app in asgi_app.py serve identical behaviour.
+
+def predict_response(data):
     try:
         # Check if models are loaded
         if priority_reg is None or source_clf is None:
-            return jsonify({
+            return {
                 "error": "Models not loaded correctly. Please check server logs."
-            }), 500
+            }, 500
             
-        data = request.json
+        # Load totals are derived from the MCB readings, as in training
+        site_id = data.get(SITE_FIELD, DEFAULT_SITE)
+        data = fill_load_features(data, mcb_inventories.for_site(site_id))
         
         # Validate required fields
         missing_fields = [field for field in FEATURES if field not in data]
         if missing_fields:
-            return jsonify({
+            return {
                 "error": f"Missing required fields: {', '.join(missing_fields)}"
-            }), 400
+            }, 400
         
-        # Create feature array for prediction
-        X = np.array([[data[feature] for feature in FEATURES]])
+        # Every reading also advances the site's forecast history
+        if forecaster is not None:
+            forecaster.observe(site_id, data)
+
+        # Advance the site's rolling aggregates, then build each model's input
+        # in the feature order it was trained with
+        features = feature_pipeline.update(site_id, data)
         
         # Make predictions
-        priority = float(priority_reg.predict(X)[0])
-        optimal_source = str(source_clf.predict(X)[0])
+        if inference_executor is not None:
+            priority, optimal_source = inference_executor.predict(features)
+        else:
+            priority = float(priority_reg.predict(model_input(features, priority_reg))[0])
+            optimal_source = str(source_clf.predict(model_input(features, source_clf))[0])
         
         # Get grid status and power
         grid_status = data.get("Grid_Status", 0)  # Default to 0 (failed) if not provided
@@ -83,18 +154,32 @@ def predict():
             "optimal_source": "Grid_Power(kW)" if grid_status == 1 else optimal_source
         }
         
-        # Extract MCB power values
-        mcb_powers = {}
-        for key in data:
-            if key.startswith("MCB_") and key.endswith("_Power(kW)"):
-                mcb_id = key.replace("_Power(kW)", "")
-                mcb_powers[mcb_id] = data[key]
+        # Extract MCB power values and priorities as numbers
+        mcb_powers, request_priorities = extract_mcb_readings(data)
         
         # Validate we have MCB data
         if not mcb_powers:
-            return jsonify({
+            return {
                 "error": "No MCB power data found in request"
-            }), 400
+            }, 400
+        
+        # Priorities sent with the request win; other MCBs take the site's
+        # configured priority, and unknown ones fall back to MCB number order
+        configured_priorities = mcb_inventories.for_site(site_id).mcb_priorities()
+        mcb_priorities = {mcb_id: request_priorities.get(mcb_id, configured_priorities.get(mcb_id))
+                          for mcb_id in mcb_powers}
+        mcb_priorities = {mcb_id: value for mcb_id, value in mcb_priorities.items() if value is not None}
+        
+        # Readings while the grid is up keep the site's plan current for the
+        # next failure; the planner rebuilds only when loads drift past its
+        # tolerance
+        if grid_status == 1:
+            shedding_planner.update_loads(site_id, mcb_powers, mcb_priorities)
+        
+        # Loads within the tolerance of the site's plan (or the default
+        # site's) use it; anything else is allocated directly
+        shedding_plan = (shedding_planner.get_plan(site_id, mcb_powers, mcb_priorities)
+                         or shedding_planner.get_plan(DEFAULT_SITE, mcb_powers, mcb_priorities))
         
         # Simulate power management response
         power_response = simulate_grid_failure(
@@ -106,111 +191,176 @@ def predict():
             data["Total_Load_Demand(kW)"],
             mcb_powers,
             grid_status,
-            grid_power
+            grid_power,
+            shedding_plan,
+            mcb_priorities
         )
         
         result["grid_status"] = "Active" if grid_status == 1 else "Failure"
         result["power_management"] = power_response
         
-        return jsonify(result)
+        if audit_log is not None:
+            audit_log.record(KIND_PREDICT, site_id, grid_status,
+                             {**data, "total_available_power": power_response["total_available_power"]},
+                             MODEL_VERSION, power_response["mcb_statuses"], mcb_powers,
+                             power_response["remaining_power"], priority, result["optimal_source"])
+        
+        return result
     
     except KeyError as e:
-        return jsonify({"error": f"Missing key in request: {str(e)}"}), 400
+        return {"error": f"Missing key in request: {str(e)}"}, 400
+    except ValueError as e:
+        return {"error": f"Invalid value in request: {str(e)}"}, 400
     except Exception as e:
-        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+        logger.exception("Prediction failed")
+        return {"error": f"An error occurred: {str(e)}"}, 500
 
-@app.route("/health", methods=["GET"])
-def health_check():
+@app.route("/predict", methods=["POST"])
+def predict():
+    return predict_response(request.json)
+
+def forecast_response(data):
+    """Ingest optional new readings and forecast the next intervals per site"""
+    try:
+        if forecaster is None:
+            return {
+                "error": "Forecast model not loaded. Please check server logs."
+            }, 500
+
+        data = data or {}
+        steps = int(data.get("steps", forecaster.horizon))
+
+        # Readings are applied in order, so each site's state only moves forward
+        for reading in data.get("readings", []):
+            forecaster.observe(reading.get(SITE_FIELD, DEFAULT_SITE), reading)
+
+        forecasts, pending = forecaster.forecast(data.get("sites"), steps)
+
+        return {
+            "status": "success",
+            "data": {
+                "interval_minutes": INTERVAL_MINUTES,
+                "steps": steps,
+                "forecasts": forecasts,
+                "pending_sites": pending
+            }
+        }
+
+    except ValueError as e:
+        return {"error": f"Invalid forecast request: {str(e)}"}, 400
+    except Exception as e:
+        return {"error": f"An error occurred: {str(e)}"}, 500
+
+@app.route("/forecast", methods=["POST"])
+def forecast():
+    return forecast_response(request.json)
+
+def health_check_response():
     """Health check endpoint to verify the API is running and models are loaded"""
     try:
         # Verify models are loaded
         if 'priority_reg' not in globals() or 'source_clf' not in globals():
-            return jsonify({
+            return {
                 "status": "error",
                 "message": "Models not loaded correctly"
-            }), 500
+            }, 500
             
-        return jsonify({
+        return {
             "status": "healthy",
             "message": "API is running and models are loaded"
-        })
+        }
     except Exception as e:
-        return jsonify({
+        return {
             "status": "error", 
             "message": str(e)
-        }), 500
+        }, 500
+
+@app.route("/health", methods=["GET"])
+def health_check():
+    return health_check_response()
 
 # Priority management endpoints
-@app.route("/priorities", methods=["GET"])
-def get_priorities():
+def get_priorities_response():
     """Get current MCB priorities"""
     try:
-        return jsonify(priority_manager.get_priorities())
+        return priority_manager.get_priorities()
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return {"error": str(e)}, 500
+
+@app.route("/priorities", methods=["GET"])
+def get_priorities():
+    return get_priorities_response()
 
 # Grid power management endpoints
-@app.route("/api/grid/power", methods=["POST"])
-def set_grid_power():
+def set_grid_power_response(data):
     """Set grid power values manually"""
     try:
-        data = request.json
-        
-        # Update grid state with provided values
-        if "power" in data:
-            grid_state["power"] = float(data["power"])
-        if "voltage" in data:
-            grid_state["voltage"] = float(data["voltage"])
-        if "current" in data:
-            grid_state["current"] = float(data["current"])
-        if "status" in data:
-            grid_state["status"] = int(data["status"])
-        if "frequency" in data:
-            grid_state["frequency"] = float(data["frequency"])
-            
-        # Update timestamp
-        from datetime import datetime
-        grid_state["last_updated"] = datetime.now().isoformat()
-        
-        # Calculate power if not provided but voltage and current are
-        if "power" not in data and "voltage" in data and "current" in data:
-            grid_state["power"] = (grid_state["voltage"] * grid_state["current"]) / 1000.0
-            
-        return jsonify({
+        # Readings may carry a site, a controller sequence number and an
+        # idempotency key; the update is applied as one snapshot or not at all
+        site_id = data.get(SITE_FIELD, DEFAULT_SITE)
+        outcome, state = grid_states.apply(
+            data,
+            site_id=site_id,
+            sequence=data.get("sequence"),
+            idempotency_key=data.get("idempotency_key"),
+        )
+
+        if outcome == APPLIED:
+            from datetime import datetime
+            # Snapshots are fed in the store's order; one overtaken by a newer
+            # snapshot on another request is skipped
+            grid_quality.update(site_id, [state["voltage"]], [state["current"]], [state["frequency"]],
+                                [datetime.fromisoformat(state["last_updated"]).timestamp()], state["version"])
+            message = "Grid power values updated successfully"
+        elif outcome == DUPLICATE:
+            message = "Duplicate update ignored; returning the original result"
+        else:
+            message = f"Out-of-order reading dropped (sequence {data.get('sequence')} <= {state['last_sequence']})"
+
+        return {
             "status": "success",
-            "message": "Grid power values updated successfully",
-            "data": grid_state
-        })
+            "result": outcome,
+            "message": message,
+            "data": dict(state)
+        }
         
-    except ValueError as e:
-        return jsonify({
+    except (TypeError, ValueError) as e:
+        return {
             "status": "error",
             "message": f"Invalid numeric value: {str(e)}"
-        }), 400
+        }, 400
     except Exception as e:
-        return jsonify({
+        return {
             "status": "error", 
             "message": f"Failed to update grid power: {str(e)}"
-        }), 500
+        }, 500
 
-@app.route("/api/grid/power", methods=["GET"])
-def get_grid_power():
+@app.route("/api/grid/power", methods=["POST"])
+def set_grid_power():
+    return set_grid_power_response(request.json)
+
+def get_grid_power_response(site_id=DEFAULT_SITE):
     """Get current grid power values"""
     try:
-        return jsonify({
+        return {
             "status": "success",
-            "data": grid_state
-        })
+            "data": dict(grid_states.snapshot(site_id))
+        }
     except Exception as e:
-        return jsonify({
+        return {
             "status": "error",
             "message": f"Failed to get grid power: {str(e)}"
-        }), 500
+        }, 500
 
-@app.route("/api/grid/status", methods=["GET"])
-def get_grid_status():
+@app.route("/api/grid/power", methods=["GET"])
+def get_grid_power():
+    return get_grid_power_response(request.args.get("site_id", DEFAULT_SITE))
+
+def get_grid_status_response(site_id=DEFAULT_SITE):
     """Get grid connection status and quality metrics"""
     try:
+        grid_state = grid_states.snapshot(site_id)
+
         # Calculate data age
         data_age = None
         if grid_state["last_updated"]:
@@ -221,12 +371,13 @@ def get_grid_status():
         # Determine status based on values and age
         is_online = grid_state["status"] == 1
         is_recent = data_age is not None and data_age < 300  # 5 minutes
-        voltage_ok = 200 <= grid_state["voltage"] <= 250
-        frequency_ok = 49 <= grid_state["frequency"] <= 51
+        voltage_ok = VOLTAGE_MIN <= grid_state["voltage"] <= VOLTAGE_MAX
+        frequency_ok = FREQUENCY_MIN <= grid_state["frequency"] <= FREQUENCY_MAX
+        quality_summary = grid_quality.summary(site_id)
         
         quality = "good" if (is_online and voltage_ok and frequency_ok) else "poor"
         
-        return jsonify({
+        return {
             "status": "success",
             "data": {
                 "connected": is_online,
@@ -235,155 +386,190 @@ def get_grid_status():
                 "voltage_status": "normal" if voltage_ok else "abnormal",
                 "frequency_status": "normal" if frequency_ok else "abnormal",
                 "last_update": grid_state["last_updated"],
-                "power_available": grid_state["power"] > 0.1
+                "power_available": grid_state["power"] > 0.1,
+                "quality_events": quality_summary["events"],
+                "events_in_progress": quality_summary["events_in_progress"]
             }
-        })
+        }
     except Exception as e:
-        return jsonify({
+        return {
             "status": "error",
             "message": f"Failed to get grid status: {str(e)}"
-        }), 500
+        }, 500
 
-@app.route("/api/grid/reset", methods=["POST"])
-def reset_grid_power():
-    """Reset grid power values to default"""
+@app.route("/api/grid/status", methods=["GET"])
+def get_grid_status():
+    return get_grid_status_response(request.args.get("site_id", DEFAULT_SITE))
+
+def ingest_grid_samples_response(data):
+    """Analyze a batch of voltage, current and frequency samples for a site"""
+    try:
+        site_id = data.get(SITE_FIELD, DEFAULT_SITE)
+        voltage = np.asarray(data["voltage"], dtype=float)
+        current = np.asarray(data["current"], dtype=float)
+        frequency = np.asarray(data["frequency"], dtype=float)
+        timestamps = np.asarray(data["timestamps"], dtype=float) if "timestamps" in data else None
+        lengths = {len(voltage), len(current), len(frequency)}
+        if timestamps is not None:
+            lengths.add(len(timestamps))
+        if len(lengths) != 1:
+            return {"status": "error", "message": "Sample arrays must all have the same length"}, 400
+
+        result = grid_quality.update(site_id, voltage, current, frequency, timestamps)
+        return {
+            "status": "success",
+            "data": {
+                "samples": len(voltage),
+                "windows": len(result["windows"]["rms_voltage"]),
+                "events": {kind: len(events["start_sample"]) for kind, events in result["events"].items()},
+                "quality": grid_quality.summary(site_id)
+            }
+        }
+    except KeyError as e:
+        return {"status": "error", "message": f"Missing required field: {str(e)}"}, 400
+    except (TypeError, ValueError) as e:
+        return {"status": "error", "message": f"Invalid numeric value: {str(e)}"}, 400
+    except Exception as e:
+        return {"status": "error", "message": f"Failed to analyze grid samples: {str(e)}"}, 500
+
+@app.route("/api/grid/quality", methods=["POST"])
+def ingest_grid_samples():
+    return ingest_grid_samples_response(request.json)
+
+def get_grid_quality_response(site_id=DEFAULT_SITE):
+    """Sag/swell and frequency excursion counts, recent events and the latest RMS window"""
+    try:
+        return {
+            "status": "success",
+            "data": grid_quality.summary(site_id)
+        }
+    except Exception as e:
+        return {
+            "status": "error",
+            "message": f"Failed to get grid quality: {str(e)}"
+        }, 500
+
+@app.route("/api/grid/quality", methods=["GET"])
+def get_grid_quality():
+    return get_grid_quality_response(request.args.get("site_id", DEFAULT_SITE))
+
+def reset_grid_power_response(site_id=DEFAULT_SITE):
+    """Reset a site's grid power values to default"""
     try:
-        grid_state.update({
-            "power": 0.0,
-            "voltage": 220.0,
-            "current": 0.0,
-            "status": 0,
-            "frequency": 50.0,
-            "last_updated": None
-        })
+        state = grid_states.reset(site_id)
         
-        return jsonify({
+        return {
             "status": "success",
             "message": "Grid power values reset to default",
-            "data": grid_state
-        })
+            "data": dict(state)
+        }
     except Exception as e:
-        return jsonify({
+        return {
             "status": "error",
             "message": f"Failed to reset grid power: {str(e)}"
-        }), 500
+        }, 500
 
-@app.route("/priorities/<mcb_type>/<mcb_name>", methods=["PUT"])
-def update_priority(mcb_type, mcb_name):
+@app.route("/api/grid/reset", methods=["POST"])
+def reset_grid_power():
+    return reset_grid_power_response(request.args.get("site_id", DEFAULT_SITE))
+
+def update_priority_response(mcb_type, mcb_name, data):
     """Update priority for a specific MCB"""
     try:
-        data = request.json
         new_priority = data.get("priority")
         if new_priority is None:
-            return jsonify({"error": "Priority value not provided"}), 400
+            return {"error": "Priority value not provided"}, 400
             
         success = priority_manager.update_priority(mcb_type, mcb_name, new_priority)
         if success:
-            return jsonify({"message": "Priority updated successfully"})
+            return {"message": "Priority updated successfully"}
         else:
-            return jsonify({"error": "Invalid MCB type or name"}), 400
+            return {"error": "Invalid MCB type or name"}, 400
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return {"error": str(e)}, 500
 
-@app.route("/priorities/reset", methods=["POST"])
-def reset_priorities():
+@app.route("/priorities/<mcb_type>/<mcb_name>", methods=["PUT"])
+def update_priority(mcb_type, mcb_name):
+    return update_priority_response(mcb_type, mcb_name, request.json)
+
+def reset_priorities_response():
     """Reset priorities to default values"""
     try:
         priority_manager.reset_to_default()
-        return jsonify({"message": "Priorities reset to default values"})
+        return {"message": "Priorities reset to default values"}
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return {"error": str(e)}, 500
 
-@app.route("/api/mcb/status", methods=["GET"])
-def get_mcb_status():
+@app.route("/priorities/reset", methods=["POST"])
+def reset_priorities():
+    return reset_priorities_response()
+
+def get_mcb_status_response(site_id=DEFAULT_SITE):
     """Get MCB ON/OFF status as JSON with 1=ON, 0=OFF"""
     try:
         # This would typically come from your actual MCB control system
         # For demonstration, I'll create a sample MCB status based on power availability and grid status
         
         # Determine which MCBs should be ON based on grid status and power availability
+        grid_state = grid_states.snapshot(site_id)
         grid_online = grid_state["status"] == 1
         power_available = grid_state["power"] > 0.1
         
-        # Sample MCB statuses - in a real system, these would come from actual MCB states
-        # MCBs 1-3 are critical loads, MCBs 4-8 are non-critical
-        mcb_statuses = {}
-        
-        if grid_online and power_available:
-            # Grid is online and has power - all MCBs can be ON
-            for i in range(1, 9):  # MCBs 1-8
-                mcb_statuses[f"relay{i}"] = 1
-        elif power_available:
-            # Power available but grid might be unstable - only critical MCBs ON
-            for i in range(1, 5):  # MCBs 1-3 (critical)
-                mcb_statuses[f"relay{i}"] = 1
-        else:
-            # No power available - all MCBs OFF
-            for i in range(1, 5):  # MCBs 1-8
-                mcb_statuses[f"relay{i}"] = 0
+        # Critical MCBs stay ON when there is power but the grid is not online
+        inventory = mcb_inventories.for_site(site_id)
+        statuses = inventory.relay_statuses(grid_online, power_available)
+        mcb_statuses = {f"relay{mcb_id}": status
+                        for mcb_id, status in zip(inventory.ids.tolist(), statuses.astype(int).tolist())}
         
         from datetime import datetime
         response = {
                 "mcb_statuses": mcb_statuses
         }
         
-        return jsonify(response)
+        return response
         
     except Exception as e:
-        return jsonify({
+        return {
             "status": "error",
             "message": f"Failed to get MCB status: {str(e)}"
-        }), 500
+        }, 500
 
-@app.route("/api/mcb/detailed", methods=["GET"])
-def get_mcb_detailed():
+@app.route("/api/mcb/status", methods=["GET"])
+def get_mcb_status():
+    return get_mcb_status_response(request.args.get("site_id", DEFAULT_SITE))
+
+def get_mcb_detailed_response(site_id=DEFAULT_SITE):
     """Get detailed MCB information including status, power, and priority"""
     try:
-        # Get MCB power data from the latest prediction or default values
-        mcb_data = {}
-        
-        # Sample MCB configuration - in real system this would come from database/config
-        default_mcbs = [
-            {"id": 1, "name": "Critical Load 1", "power": 8.0, "priority": 1, "is_critical": True},
-            {"id": 2, "name": "Critical Load 2", "power": 7.0, "priority": 2, "is_critical": True},
-            {"id": 3, "name": "Critical Load 3", "power": 6.0, "priority": 3, "is_critical": True},
-            {"id": 4, "name": "Non-Critical Load 1", "power": 5.0, "priority": 7, "is_critical": False},
-            {"id": 5, "name": "Non-Critical Load 2", "power": 5.0, "priority": 8, "is_critical": False},
-            {"id": 6, "name": "Non-Critical Load 3", "power": 4.0, "priority": 9, "is_critical": False},
-            {"id": 7, "name": "Non-Critical Load 4", "power": 3.0, "priority": 10, "is_critical": False},
-            {"id": 8, "name": "Non-Critical Load 5", "power": 2.0, "priority": 11, "is_critical": False}
-        ]
+        inventory = mcb_inventories.for_site(site_id)
         
         # Determine MCB status based on grid conditions
+        grid_state = grid_states.snapshot(site_id)
         grid_online = grid_state["status"] == 1
         power_available = grid_state["power"] > 0.1
         available_power = grid_state["power"]
         
-        total_critical_power = sum(mcb["power"] for mcb in default_mcbs if mcb["is_critical"])
-        total_power_demand = sum(mcb["power"] for mcb in default_mcbs)
+        statuses = inventory.detailed_statuses(grid_online, available_power)
+        summary = inventory.summary(statuses)
+        total_power_demand = summary["total_power_demand"]
+        active_power_load = summary["active_power_load"]
         
-        for mcb in default_mcbs:
-            mcb_id = f"MCB_{mcb['id']}"
-            
-            # Determine if this MCB should be ON
-            if not power_available:
-                status = 0  # No power available
-            elif mcb["is_critical"]:
-                status = 1  # Critical loads always ON if power available
-            elif grid_online and available_power >= total_power_demand:
-                status = 1  # Enough power for all loads
-            elif available_power >= total_critical_power + mcb["power"]:
-                status = 1  # Enough power for critical + this non-critical load
-            else:
-                status = 0  # Not enough power
-            
-            mcb_data[mcb_id] = {
-                "status": status,
-                "name": mcb["name"],
-                "power_kw": mcb["power"],
-                "priority": mcb["priority"],
-                "is_critical": mcb["is_critical"]
-            }
+        mcb_data = {
+            mcb_id: {"status": status, "name": name, "power_kw": power, "priority": priority,
+                     "is_critical": is_critical}
+            for mcb_id, status, name, power, priority, is_critical in zip(
+                inventory.mcb_keys(), statuses.astype(int).tolist(), inventory.names,
+                inventory.power.tolist(), inventory.priority.tolist(), inventory.critical.tolist())
+        }
+        
+        if audit_log is not None:
+            # Rule-based decision, so no model version is recorded
+            audit_log.record(KIND_MCB_DETAILED, site_id, grid_state["status"],
+                             {"Grid_Power(kW)": grid_state["power"], "total_available_power": available_power,
+                              "Total_Load_Demand(kW)": total_power_demand},
+                             "", {mcb_id: mcb["status"] for mcb_id, mcb in mcb_data.items()},
+                             {mcb_id: mcb["power_kw"] for mcb_id, mcb in mcb_data.items()},
+                             available_power - active_power_load)
         
         from datetime import datetime
         response = {
@@ -391,11 +577,11 @@ def get_mcb_detailed():
             "data": {
                 "mcbs": mcb_data,
                 "summary": {
-                    "total_mcbs": len(default_mcbs),
-                    "mcbs_on": sum(1 for mcb in mcb_data.values() if mcb["status"] == 1),
-                    "mcbs_off": sum(1 for mcb in mcb_data.values() if mcb["status"] == 0),
+                    "total_mcbs": summary["total_mcbs"],
+                    "mcbs_on": summary["mcbs_on"],
+                    "mcbs_off": summary["mcbs_off"],
                     "total_power_demand": total_power_demand,
-                    "active_power_load": sum(mcb["power_kw"] for mcb in mcb_data.values() if mcb["status"] == 1),
+                    "active_power_load": active_power_load,
                     "grid_power_available": available_power
                 },
                 "grid_conditions": {
@@ -409,13 +595,17 @@ def get_mcb_detailed():
             "message": "Detailed MCB information retrieved successfully"
         }
         
-        return jsonify(response)
+        return response
         
     except Exception as e:
-        return jsonify({
+        return {
             "status": "error",
             "message": f"Failed to get detailed MCB information: {str(e)}"
-        }), 500
+        }, 500
+
+@app.route("/api/mcb/detailed", methods=["GET"])
+def get_mcb_detailed():
+    return get_mcb_detailed_response(request.args.get("site_id", DEFAULT_SITE))
 
 if __name__ == "__main__":
     app.run(debug=True, host="0.0.0.0", port=5000)
@@ -0,0 +1,233 @@
+"""
+Async (ASGI) entry point for the backend API
+
+Serves the same routes as the Flask app with the same endpoint logic from
+app.py. Blocking work (model inference, forecasting, priority file writes,
+per-circuit MCB responses that grow with the site's inventory) runs on a
+thread pool, together with JSON encoding of its response, so the event loop
+keeps accepting connections. Each client address is rate limited with a
+token bucket.
+
+Run from the backend folder:
+    hypercorn asgi_app:app --bind 0.0.0.0:5000
+"""
+
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import parse_qs
+
+import app as backend
+
+# Token bucket per client address; RATE_LIMIT_PER_SECOND=0 disables limiting
+RATE_LIMIT_PER_SECOND = float(os.environ.get("RATE_LIMIT_PER_SECOND", "50"))
+RATE_LIMIT_BURST = int(os.environ.get("RATE_LIMIT_BURST", "100"))
+MAX_TRACKED_CLIENTS = 10000
+
+# Threads for handlers that block (inference, disk writes, large responses)
+BLOCKING_WORKERS = int(os.environ.get("ASGI_BLOCKING_WORKERS", str(min(32, (os.cpu_count() or 1) + 4))))
+MAX_BODY_BYTES = 1024 * 1024
+
+# (method, path, handler, reads a JSON body, runs on the thread pool)
+ROUTES = [
+    ("POST", "/predict", backend.predict_response, True, True),
+    ("POST", "/forecast", backend.forecast_response, True, True),
+    ("GET", "/health", backend.health_check_response, False, False),
+    ("GET", "/priorities", backend.get_priorities_response, False, False),
+    ("PUT", "/priorities/<mcb_type>/<mcb_name>", backend.update_priority_response, True, True),
+    ("POST", "/priorities/reset", backend.reset_priorities_response, False, True),
+    ("POST", "/api/grid/power", backend.set_grid_power_response, True, False),
+    ("GET", "/api/grid/power", backend.get_grid_power_response, False, False),
+    ("GET", "/api/grid/status", backend.get_grid_status_response, False, False),
+    ("POST", "/api/grid/quality", backend.ingest_grid_samples_response, True, True),
+    ("GET", "/api/grid/quality", backend.get_grid_quality_response, False, False),
+    ("POST", "/api/grid/reset", backend.reset_grid_power_response, False, False),
+    ("GET", "/api/mcb/status", backend.get_mcb_status_response, False, True),
+    ("GET", "/api/mcb/detailed", backend.get_mcb_detailed_response, False, True),
+]
+
+# Handlers that take an optional ?site_id= query parameter
+SITE_QUERY_HANDLERS = {
+    backend.get_grid_power_response,
+    backend.get_grid_status_response,
+    backend.get_grid_quality_response,
+    backend.reset_grid_power_response,
+    backend.get_mcb_status_response,
+    backend.get_mcb_detailed_response,
+}
+
+CORS_HEADERS = [(b"access-control-allow-origin", b"*")]
+
+blocking_executor = ThreadPoolExecutor(max_workers=BLOCKING_WORKERS, thread_name_prefix="asgi-blocking")
+
+
+class RateLimiter:
+    """Token bucket per client; only touched from the event loop, so no locking"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+
+    def allow(self, client):
+        """Return (allowed, retry_after_seconds) and take a token when allowed"""
+        if self.rate <= 0:
+            return True, 0.0
+        now = time.monotonic()
+        tokens, last = self.buckets.get(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        if tokens < 1:
+            self.buckets[client] = (tokens, now)
+            return False, (1 - tokens) / self.rate
+        self.buckets[client] = (tokens - 1, now)
+        if len(self.buckets) > MAX_TRACKED_CLIENTS:
+            self._prune(now)
+        return True, 0.0
+
+    def _prune(self, now):
+        # Buckets idle long enough to have refilled are equivalent to new ones
+        refill_time = self.burst / self.rate
+        for client, (_, last) in list(self.buckets.items()):
+            if now - last >= refill_time:
+                del self.buckets[client]
+
+
+rate_limiter = RateLimiter(RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST)
+
+
+def match_route(method, path):
+    """Return (handler, path_args, reads_body, blocking) or an error status"""
+    segments = path.rstrip("/").split("/") if path != "/" else [""]
+    allowed_methods = False
+    for route_method, route_path, handler, reads_body, blocking in ROUTES:
+        route_segments = route_path.split("/")
+        if len(route_segments) != len(segments):
+            continue
+        args = []
+        for route_segment, segment in zip(route_segments, segments):
+            if route_segment.startswith("<"):
+                args.append(segment)
+            elif route_segment != segment:
+                break
+        else:
+            if route_method == method:
+                return (handler, args, reads_body, blocking), None
+            allowed_methods = True
+    return None, 405 if allowed_methods else 404
+
+
+async def read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if len(body) > MAX_BODY_BYTES:
+            raise ValueError("Request body too large")
+        if not message.get("more_body", False):
+            return body
+
+
+def respond(handler, *args):
+    """Call a handler and return (status, JSON body); blocking routes run this on the thread pool"""
+    result = handler(*args)
+    payload, status = result if isinstance(result, tuple) else (result, 200)
+    return status, json.dumps(payload, sort_keys=True).encode()
+
+
+async def send_json(send, status, payload, extra_headers=()):
+    await send_body(send, status, json.dumps(payload, sort_keys=True).encode(), extra_headers)
+
+
+async def send_body(send, status, body, extra_headers=()):
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+        *CORS_HEADERS,
+        *extra_headers,
+    ]
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def send_preflight(send, scope):
+    requested = dict(scope["headers"]).get(b"access-control-request-headers", b"")
+    headers = [
+        *CORS_HEADERS,
+        (b"access-control-allow-methods", b"GET, POST, PUT, OPTIONS"),
+        (b"access-control-allow-headers", requested),
+        (b"content-length", b"0"),
+    ]
+    await send({"type": "http.response.start", "status": 200, "headers": headers})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            blocking_executor.shutdown(wait=False)
+            if backend.inference_executor is not None:
+                backend.inference_executor.shutdown()
+            if backend.audit_log is not None:
+                backend.audit_log.close()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    method = scope["method"]
+    if method == "OPTIONS":
+        await send_preflight(send, scope)
+        return
+
+    client = scope.get("client")
+    allowed, retry_after = rate_limiter.allow(client[0] if client else "unknown")
+    if not allowed:
+        await send_json(send, 429, {"error": "Too many requests"},
+                        [(b"retry-after", str(max(1, round(retry_after))).encode())])
+        return
+
+    route, error_status = match_route(method, scope["path"])
+    if route is None:
+        await send_json(send, error_status, {"error": "Not found" if error_status == 404 else "Method not allowed"})
+        return
+    handler, args, reads_body, blocking = route
+
+    if reads_body:
+        try:
+            body = await read_body(receive)
+            args.append(json.loads(body) if body else None)
+        except ValueError as e:
+            await send_json(send, 400, {"error": f"Invalid request body: {str(e)}"})
+            return
+
+    if handler in SITE_QUERY_HANDLERS:
+        site_id = parse_qs(scope.get("query_string", b"").decode()).get("site_id")
+        if site_id:
+            handler = partial(handler, site_id=site_id[0])
+
+    if blocking:
+        status, body = await asyncio.get_running_loop().run_in_executor(blocking_executor, respond, handler, *args)
+    else:
+        status, body = respond(handler, *args)
+    await send_body(send, status, body)
+
+
+if __name__ == "__main__":
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+
+    config = Config()
+    config.bind = ["0.0.0.0:5000"]
+    asyncio.run(serve(app, config))
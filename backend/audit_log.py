@@ -0,0 +1,453 @@
+"""
+Append-only audit log of MCB shedding decisions
+
+Every decision from /predict and /api/mcb/detailed is queued in memory and
+written by a background thread as one length-prefixed binary record:
+inputs, model version, the MCB on/off vector with each MCB's load, and the
+remaining power. Each segment file has a fixed-width index of (timestamp,
+offset, site hash, kind), so queries filter with NumPy and only decode the
+records that match.
+
+Usage (from the backend folder):
+    python audit_log.py --site default --since 2025-09-03T09:00 --until 2025-09-03T12:00
+    python audit_log.py --kind predict --limit 20 --newest-first
+    python audit_log.py --stats
+"""
+
+import argparse
+import atexit
+import glob
+import hashlib
+import json
+import logging
+import math
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+AUDIT_LOG_DIR = os.environ.get("AUDIT_LOG_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                             "audit_logs"))
+AUDIT_LOG_ENABLED = os.environ.get("AUDIT_LOG", "1") != "0"
+# Decisions waiting for the writer; when full, new ones are dropped and counted
+AUDIT_QUEUE_SIZE = int(os.environ.get("AUDIT_QUEUE_SIZE", "100000"))
+MAX_SEGMENT_BYTES = 64 * 1024 * 1024
+MAX_BATCH = 1024
+
+KIND_PREDICT = 0
+KIND_MCB_DETAILED = 1
+KIND_NAMES = {KIND_PREDICT: "predict", KIND_MCB_DETAILED: "mcb_detailed"}
+
+# Inputs recorded with every decision, NaN when a decision has no such value
+INPUT_FIELDS = [
+    "Solar_Power(kW)", "Wind_Power(kW)", "DG_Power(kW)", "UPS_Power(kW)", "Battery_Percentage(%)",
+    "Total_Load_Demand(kW)", "Grid_Power(kW)", "total_available_power",
+]
+
+# Record: u32 body length, then the header, the inputs, the site / model
+# version / source strings, MCB numbers (u32), MCB loads (f32) and a
+# little-endian bitmask of ON statuses
+LENGTH = struct.Struct("<I")
+HEADER = struct.Struct("<dBbffHHHH")
+# Limits of the header fields; record() coerces or rejects values beyond them
+MAX_TEXT_BYTES = 0xFFFF
+MAX_MCBS = 0xFFFF
+MAX_MCB_NUMBER = 0xFFFFFFFF
+MAX_FLOAT32 = 3.4028234663852886e38
+# Recorded when the grid status is missing or not a small integer
+GRID_STATUS_UNKNOWN = -1
+INPUTS = struct.Struct(f"<{len(INPUT_FIELDS)}f")
+INDEX_ENTRY = struct.Struct("<dQIB3x")
+INDEX_DTYPE = np.dtype([("timestamp", "<f8"), ("offset", "<u8"), ("site_hash", "<u4"), ("kind", "u1"),
+                        ("pad", "V3")])
+
+
+def site_hash(site_id):
+    return zlib.crc32(site_id.encode())
+
+
+def mcb_number(mcb_id):
+    number = int(mcb_id.split("_")[1])
+    if not 0 <= number <= MAX_MCB_NUMBER:
+        raise ValueError(f"{mcb_id} is outside the recordable MCB numbers")
+    return number
+
+
+def as_float32(value):
+    """Float that packs as f32: NaN when missing or not a number, infinite beyond the f32 range"""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return math.nan
+    if math.isfinite(value) and abs(value) > MAX_FLOAT32:
+        return math.copysign(math.inf, value)
+    return value
+
+
+def as_grid_status(value):
+    """Grid status as a signed byte, GRID_STATUS_UNKNOWN when missing or out of range"""
+    try:
+        value = int(value)
+    except (TypeError, ValueError, OverflowError):
+        return GRID_STATUS_UNKNOWN
+    return value if -128 <= value <= 127 else GRID_STATUS_UNKNOWN
+
+
+def clip_text(value):
+    """String whose UTF-8 form fits a u16 length, cut at a character boundary"""
+    text = "" if value is None else str(value)
+    return text.encode("utf-8", "replace")[:MAX_TEXT_BYTES].decode("utf-8", "ignore")
+
+
+def model_version(*paths):
+    """Short content hash per model file, e.g. "3f9a0c1b2d4e+9b8c7d6e5f4a"; matches the sha256 in model manifests"""
+    digests = []
+    for path in paths:
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha.update(block)
+        digests.append(sha.hexdigest()[:12])
+    return "+".join(digests)
+
+
+def encode_record(timestamp, kind, site_id, grid_status, inputs, version, mcb_statuses, mcb_powers,
+                  remaining_power, priority, source):
+    """Pack one decision; returns the length-prefixed bytes"""
+    ids = sorted(mcb_statuses, key=mcb_number)
+    count = len(ids)
+    site = site_id.encode()
+    version = version.encode()
+    source = source.encode()
+    bits = 0
+    for position, mcb_id in enumerate(ids):
+        if mcb_statuses[mcb_id]:
+            bits |= 1 << position
+    body = b"".join([
+        HEADER.pack(timestamp, kind, grid_status, priority, remaining_power, len(site), len(version), len(source),
+                    count),
+        INPUTS.pack(*inputs),
+        site, version, source,
+        struct.pack(f"<{count}I", *[mcb_number(mcb_id) for mcb_id in ids]),
+        struct.pack(f"<{count}f", *[mcb_powers.get(mcb_id, math.nan) for mcb_id in ids]),
+        bits.to_bytes((count + 7) // 8, "little"),
+    ])
+    return LENGTH.pack(len(body)) + body
+
+
+def decode_record(buffer, offset):
+    """Unpack the record starting at `offset` into a dict"""
+    position = offset + LENGTH.size
+    timestamp, kind, grid_status, priority, remaining, site_len, version_len, source_len, count = \
+        HEADER.unpack_from(buffer, position)
+    position += HEADER.size
+    inputs = INPUTS.unpack_from(buffer, position)
+    position += INPUTS.size
+    # Lengths are in bytes, so split before decoding
+    strings = []
+    for length in (site_len, version_len, source_len):
+        strings.append(bytes(buffer[position:position + length]).decode())
+        position += length
+    site, version, source = strings
+    numbers = struct.unpack_from(f"<{count}I", buffer, position)
+    position += 4 * count
+    powers = struct.unpack_from(f"<{count}f", buffer, position)
+    position += 4 * count
+    bits = int.from_bytes(buffer[position:position + (count + 7) // 8], "little")
+    return {
+        "timestamp": timestamp,
+        "time": datetime.fromtimestamp(timestamp).isoformat(),
+        "kind": KIND_NAMES.get(kind, kind),
+        "site_id": site,
+        "model_version": version,
+        "optimal_source": source or None,
+        "priority": None if math.isnan(priority) else priority,
+        "grid_status": grid_status,
+        "inputs": {field: value for field, value in zip(INPUT_FIELDS, inputs) if not math.isnan(value)},
+        "mcb_statuses": {f"MCB_{n}": (bits >> k) & 1 for k, n in enumerate(numbers)},
+        "mcb_powers": {f"MCB_{n}": p for n, p in zip(numbers, powers)},
+        "remaining_power": remaining,
+    }
+
+
+class AuditLog:
+    """
+    Non-blocking recorder of shedding decisions
+
+    `record` only builds a tuple and puts it on a bounded queue; encoding
+    and disk writes happen on the writer thread, in batches. Segments are
+    named after their first record and the writing process, so several
+    workers can share one folder.
+    """
+
+    def __init__(self, directory=AUDIT_LOG_DIR, queue_size=AUDIT_QUEUE_SIZE, segment_bytes=MAX_SEGMENT_BYTES):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.pending = queue.Queue(maxsize=queue_size)
+        self.written = 0
+        self.dropped = 0
+        # Decisions that could not be recorded at all (see record and _write)
+        self.rejected = 0
+        self.writer = None
+        self._log = None
+        self._index = None
+        self._size = 0
+        self._segment = 0
+
+    def start(self):
+        self.writer = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self.writer.start()
+        atexit.register(self.close)
+        return self
+
+    def close(self, timeout=5.0):
+        """Write everything queued so far and stop the writer"""
+        if self.writer is None:
+            return
+        try:
+            self.pending.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self.writer.join(timeout)
+        self.writer = None
+
+    def record(self, kind, site_id, grid_status, data, version, mcb_statuses, mcb_powers, remaining_power,
+               priority=math.nan, source=""):
+        """
+        Queue one decision for writing; never blocks or raises
+
+        Values that don't fit the record are coerced: numbers that aren't
+        numbers become NaN (grid status GRID_STATUS_UNKNOWN) and strings are
+        cut to MAX_TEXT_BYTES. A decision whose MCB IDs can't be recorded is
+        counted in `rejected` instead of failing the request.
+
+        Parameters:
+        - kind: KIND_PREDICT or KIND_MCB_DETAILED
+        - data: Request or state values, read for INPUT_FIELDS
+        - version: Model version string (see model_version)
+        - mcb_statuses, mcb_powers: Dictionaries keyed by MCB ID
+        """
+        try:
+            inputs = tuple(as_float32(data.get(field)) for field in INPUT_FIELDS)
+            if len(mcb_statuses) > MAX_MCBS:
+                raise ValueError(f"{len(mcb_statuses)} MCBs, at most {MAX_MCBS} fit a record")
+            for mcb_id in mcb_statuses:
+                mcb_number(mcb_id)
+            entry = (time.time(), kind, clip_text(site_id), as_grid_status(grid_status), inputs, clip_text(version),
+                     {mcb_id: bool(status) for mcb_id, status in mcb_statuses.items()},
+                     {mcb_id: as_float32(power) for mcb_id, power in mcb_powers.items()},
+                     as_float32(remaining_power), as_float32(priority), clip_text(source))
+        except Exception as e:
+            self._reject(e)
+            return
+        try:
+            self.pending.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 10000 == 0:
+                logger.warning("Audit queue full, decisions dropped", extra={"dropped": self.dropped})
+
+    def _reject(self, error):
+        self.rejected += 1
+        if self.rejected == 1 or self.rejected % 10000 == 0:
+            logger.warning(f"Audit record rejected: {error}", extra={"rejected": self.rejected})
+
+    def _run(self):
+        while True:
+            batch = [self.pending.get()]
+            while len(batch) < MAX_BATCH:
+                try:
+                    batch.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            try:
+                self._write([entry for entry in batch if entry is not None])
+            except Exception as e:
+                logger.error(f"Error writing audit records: {e}")
+                # How much of the batch reached the segment is unknown, so
+                # later records go to a new one with offsets read from disk
+                self._close_segment()
+            if stop:
+                self._close_segment()
+                return
+
+    def _write(self, entries):
+        records = []
+        index = []
+        for entry in entries:
+            # A record that fails to encode is skipped; the rest of the batch is written
+            try:
+                record = encode_record(*entry)
+            except Exception as e:
+                self._reject(e)
+                continue
+            if self._log is None or self._size + len(record) > self.segment_bytes:
+                self._flush(records, index)
+                records, index = [], []
+                self._open_segment(entry[0])
+            index.append(INDEX_ENTRY.pack(entry[0], self._size, site_hash(entry[2]), entry[1]))
+            records.append(record)
+            self._size += len(record)
+        self._flush(records, index)
+
+    def _flush(self, records, index):
+        if not records:
+            return
+        # Records go to disk before the index entries that point at them
+        self._log.write(b"".join(records))
+        self._log.flush()
+        self._index.write(b"".join(index))
+        self._index.flush()
+        self.written += len(records)
+
+    def _open_segment(self, timestamp):
+        self._close_segment()
+        os.makedirs(self.directory, exist_ok=True)
+        self._segment += 1
+        stamp = datetime.fromtimestamp(timestamp).strftime("%Y%m%dT%H%M%S")
+        path = os.path.join(self.directory, f"decisions-{stamp}-{os.getpid()}-{self._segment}")
+        self._log = open(path + ".log", "ab")
+        self._index = open(path + ".idx", "ab")
+        self._size = self._log.tell()
+
+    def _close_segment(self):
+        if self._log is not None:
+            self._log.close()
+            self._index.close()
+            self._log = self._index = None
+
+
+def segment_start(path):
+    """Time of a segment's first record, from its file name"""
+    return datetime.strptime(os.path.basename(path).split("-")[1], "%Y%m%dT%H%M%S").timestamp()
+
+
+def query(directory=AUDIT_LOG_DIR, site_id=None, since=None, until=None, kind=None, limit=None,
+          newest_first=False):
+    """
+    Decisions matching the filters, in time order
+
+    Parameters:
+    - site_id: Only this site
+    - since, until: Epoch seconds bounds (inclusive)
+    - kind: "predict" or "mcb_detailed"
+    - limit: Return at most this many
+    - newest_first: Most recent decisions first (applied before the limit)
+
+    Returns:
+    - List of decoded decision dicts
+    """
+    kind_code = {name: code for code, name in KIND_NAMES.items()}.get(kind) if kind else None
+    matches = []
+    for log_path in sorted(glob.glob(os.path.join(directory, "decisions-*.log"))):
+        # Names are second-resolution; a segment's records can't start after its name
+        if until is not None and segment_start(log_path) > until + 1:
+            continue
+        entries = np.fromfile(log_path[:-4] + ".idx", dtype=INDEX_DTYPE)
+        mask = np.ones(len(entries), dtype=bool)
+        if site_id is not None:
+            mask &= entries["site_hash"] == site_hash(site_id)
+        if since is not None:
+            mask &= entries["timestamp"] >= since
+        if until is not None:
+            mask &= entries["timestamp"] <= until
+        if kind_code is not None:
+            mask &= entries["kind"] == kind_code
+        if mask.any():
+            matches.append((log_path, entries[mask]))
+
+    if not matches:
+        return []
+    timestamps = np.concatenate([entries["timestamp"] for _, entries in matches])
+    offsets = np.concatenate([entries["offset"] for _, entries in matches])
+    segments = np.concatenate([np.full(len(entries), i) for i, (_, entries) in enumerate(matches)])
+    order = np.argsort(timestamps, kind="stable")
+    if newest_first:
+        order = order[::-1]
+
+    buffers = {}
+    decisions = []
+    for i in order:
+        segment = int(segments[i])
+        if segment not in buffers:
+            with open(matches[segment][0], "rb") as f:
+                buffers[segment] = f.read()
+        buffer = buffers[segment]
+        offset = int(offsets[i])
+        if offset + LENGTH.size > len(buffer):
+            continue  # index entry for a record that never reached disk
+        decision = decode_record(buffer, offset)
+        if site_id is not None and decision["site_id"] != site_id:
+            continue  # site hash collision
+        decisions.append(decision)
+        if limit is not None and len(decisions) >= limit:
+            break
+    return decisions
+
+
+def stats(directory=AUDIT_LOG_DIR):
+    """Decision counts per site and kind, with the time range covered"""
+    counts = {}
+    first = last = None
+    for log_path in sorted(glob.glob(os.path.join(directory, "decisions-*.log"))):
+        entries = np.fromfile(log_path[:-4] + ".idx", dtype=INDEX_DTYPE)
+        if not len(entries):
+            continue
+        first = min(first, entries["timestamp"].min()) if first is not None else entries["timestamp"].min()
+        last = max(last, entries["timestamp"].max()) if last is not None else entries["timestamp"].max()
+        with open(log_path, "rb") as f:
+            buffer = f.read()
+        # One decoded record per distinct site hash names the site
+        _, positions, per_hash = np.unique(entries["site_hash"], return_index=True, return_counts=True)
+        for position, count in zip(positions, per_hash):
+            site = decode_record(buffer, int(entries["offset"][position]))["site_id"]
+            counts[site] = counts.get(site, 0) + int(count)
+    return {
+        "decisions": sum(counts.values()),
+        "per_site": counts,
+        "first": datetime.fromtimestamp(first).isoformat() if first is not None else None,
+        "last": datetime.fromtimestamp(last).isoformat() if last is not None else None,
+    }
+
+
+def parse_time(value):
+    """Epoch seconds from an ISO timestamp or a number"""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default=AUDIT_LOG_DIR)
+    parser.add_argument("--site")
+    parser.add_argument("--since", help="ISO time or epoch seconds")
+    parser.add_argument("--until", help="ISO time or epoch seconds")
+    parser.add_argument("--kind", choices=list(KIND_NAMES.values()))
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--newest-first", action="store_true")
+    parser.add_argument("--stats", action="store_true", help="print counts per site instead of decisions")
+    args = parser.parse_args()
+
+    if args.stats:
+        print(json.dumps(stats(args.dir), indent=2))
+        return
+    decisions = query(args.dir, args.site, parse_time(args.since), parse_time(args.until), args.kind, args.limit,
+                      args.newest_first)
+    for decision in decisions:
+        print(json.dumps(decision))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Offline replay of historical telemetry through MCB allocation policies
+
+Streams a CSV with the energy_dataset.csv schema in fixed-size chunks,
+evaluates every policy on each chunk with NumPy on a process pool, and
+reduces the per-chunk metrics in order. Memory stays bounded by the chunk
+size times the number of chunks in flight.
+
+Usage (from the backend folder):
+    python backtest.py ../dataset/energy_dataset.csv --workers 4
+    python backtest.py big.csv --policy greedy_by_priority --policy my_policies:keep_critical
+"""
+
+import argparse
+import importlib
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from mcb_inventory import InventoryStore
+from telemetry import DEFAULT_SITE, INTERVAL_MINUTES
+
+# grid_failure_handler lives in the project root, next to the backend folder
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from grid_failure_handler import allocate_mcb_power_batch
+
+SOURCE_COLUMNS = ["Solar_Power(kW)", "Wind_Power(kW)", "DG_Power(kW)", "UPS_Power(kW)"]
+DEFAULT_CHUNK_ROWS = 250000
+
+
+def sequential_sum(values):
+    """Row sums added left to right, as Python's sum() does in simulate_grid_failure"""
+    return np.cumsum(values, axis=1)[:, -1] if values.shape[1] else np.zeros(len(values))
+
+
+def _keep_all_on_when_load_fits(statuses, powers, available):
+    # Like simulate_grid_failure, skip shedding when the whole load fits, so
+    # float error in the running subtraction cannot drop the last MCB
+    statuses[sequential_sum(powers) <= available] = True
+    return statuses
+
+
+def greedy_by_mcb_number(powers, priorities, available):
+    """Serve MCB_1, MCB_2, ... while power lasts, ignoring priorities"""
+    statuses, _ = allocate_mcb_power_batch(powers, available)
+    return _keep_all_on_when_load_fits(statuses, powers, available)
+
+
+def greedy_by_priority(powers, priorities, available):
+    """The live policy in simulate_grid_failure: serve MCBs in MCB_i_Priority order, lowest number first"""
+    order = np.argsort(priorities, axis=1, kind="stable")
+    sorted_statuses, _ = allocate_mcb_power_batch(np.take_along_axis(powers, order, axis=1), available)
+    statuses = np.empty_like(sorted_statuses)
+    np.put_along_axis(statuses, order, sorted_statuses, axis=1)
+    return _keep_all_on_when_load_fits(statuses, powers, available)
+
+
+POLICIES = {
+    "greedy_by_mcb_number": greedy_by_mcb_number,
+    "greedy_by_priority": greedy_by_priority,
+}
+
+
+def resolve_policy(name):
+    """Look up a built-in policy or import one given as `module:function`"""
+    if name in POLICIES:
+        return POLICIES[name]
+    module_name, _, function_name = name.partition(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def mcb_columns(path):
+    """MCB numbers present in the CSV header, in ascending order"""
+    header = pd.read_csv(path, nrows=0).columns
+    numbers = [int(c.split("_")[1]) for c in header if c.startswith("MCB_") and c.endswith("_Power(kW)")]
+    return sorted(numbers)
+
+
+def iter_chunks(path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Yield (powers, priorities, available, grid_up) arrays for each chunk of rows"""
+    numbers = mcb_columns(path)
+    power_cols = [f"MCB_{i}_Power(kW)" for i in numbers]
+    priority_cols = [f"MCB_{i}_Priority" for i in numbers]
+    usecols = power_cols + priority_cols + SOURCE_COLUMNS + ["Grid_Power(kW)", "Grid_Status"]
+
+    for chunk in pd.read_csv(path, usecols=usecols, chunksize=chunk_rows):
+        grid_up = chunk["Grid_Status"].to_numpy() == 1
+        # Same supply rule as simulate_grid_failure: grid power when the grid
+        # is up, otherwise the sum of the local sources
+        available = np.where(grid_up, chunk["Grid_Power(kW)"].to_numpy(dtype=float),
+                             sequential_sum(chunk[SOURCE_COLUMNS].to_numpy(dtype=float)))
+        yield (chunk[power_cols].to_numpy(dtype=float), chunk[priority_cols].to_numpy(dtype=float),
+               available, grid_up)
+
+
+def evaluate_chunk(chunk, policy_names, interval_hours, critical):
+    """Metrics of every policy on one chunk, plus its edge statuses for switch counting"""
+    powers, priorities, available, grid_up = chunk
+    critical = np.broadcast_to(critical, powers.shape)
+    outage = ~grid_up[:, None]
+    results = {}
+    for name in policy_names:
+        statuses = resolve_policy(name)(powers, priorities, available)
+        served = np.where(statuses, powers, 0.0)
+        unserved = powers - served
+        results[name] = {
+            "rows": len(powers),
+            "served_kwh": served.sum() * interval_hours,
+            "served_critical_kwh": served[critical].sum() * interval_hours,
+            "unserved_kwh": unserved.sum() * interval_hours,
+            "unserved_critical_kwh": unserved[critical].sum() * interval_hours,
+            "outage_unserved_critical_kwh": unserved[critical & outage].sum() * interval_hours,
+            "switches": int((statuses[1:] != statuses[:-1]).sum()),
+            "first": statuses[0],
+            "last": statuses[-1],
+        }
+    return results
+
+
+def _merge(totals, chunk_results):
+    for name, result in chunk_results.items():
+        total = totals.setdefault(name, {"last": None, "switches": 0})
+        if total["last"] is not None:
+            total["switches"] += int((total["last"] != result["first"]).sum())
+        for key, value in result.items():
+            if key not in ("first", "last"):
+                total[key] = total.get(key, 0) + value
+        total["last"] = result["last"]
+
+
+def run_backtest(path, policy_names, workers=None, chunk_rows=DEFAULT_CHUNK_ROWS,
+                 interval_hours=INTERVAL_MINUTES / 60.0, inventory=None):
+    """
+    Replay a telemetry CSV through each policy
+
+    Rows are treated as one time-ordered stream. At most two chunks per
+    worker are in flight, and results are reduced in file order so switch
+    counts across chunk boundaries are exact. Critical MCBs are those
+    flagged in `inventory`, the default site's MCB inventory unless given.
+
+    Returns:
+    - Dictionary of policy name -> metrics
+    """
+    workers = workers or os.cpu_count() or 1
+    inventory = inventory or InventoryStore().for_site()
+    critical = inventory.critical_flags(mcb_columns(path))
+    totals = {}
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk in iter_chunks(path, chunk_rows):
+            pending.append(pool.submit(evaluate_chunk, chunk, policy_names, interval_hours, critical))
+            if len(pending) >= 2 * workers:
+                _merge(totals, pending.popleft().result())
+        while pending:
+            _merge(totals, pending.popleft().result())
+
+    report = {}
+    for name, total in totals.items():
+        report[name] = {key: round(float(value), 3) if isinstance(value, float) else value
+                        for key, value in total.items() if key != "last"}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="telemetry CSV with the energy_dataset.csv columns")
+    parser.add_argument("--policy", action="append", help="built-in name or module:function (repeatable)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--site", default=DEFAULT_SITE, help="MCB inventory site that marks critical circuits")
+    args = parser.parse_args()
+
+    policies = args.policy or list(POLICIES)
+    for name in policies:
+        resolve_policy(name)  # fail fast on a bad name before starting workers
+    inventory = InventoryStore().for_site(args.site)
+    print(json.dumps(run_backtest(args.path, policies, args.workers, args.chunk_rows, inventory=inventory),
+                     indent=2))
+
+
+if __name__ == "__main__":
+    main()
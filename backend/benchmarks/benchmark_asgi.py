@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Load test comparing the Flask app and the ASGI app under many connections
+
+Opens `--connections` concurrent client connections against each target and
+sends `--requests-per-connection` requests on each, reconnecting whenever the
+server closes the connection (the Flask dev server speaks HTTP/1.0). Reports
+throughput, latency percentiles, errors and rate-limited responses.
+
+Start both servers first, with rate limiting off for the ASGI app:
+    python app.py                                             # port 5000
+    RATE_LIMIT_PER_SECOND=0 hypercorn asgi_app:app --bind 0.0.0.0:5001
+
+Then, with `ulimit -n` above the connection count:
+    python benchmarks/benchmark_asgi.py --target flask=http://127.0.0.1:5000 \
+        --target asgi=http://127.0.0.1:5001 --connections 1000
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+PREDICT_BODY = {
+    "Solar_Power(kW)": 25, "Wind_Power(kW)": 15, "DG_Power(kW)": 10, "UPS_Power(kW)": 5,
+    "Battery_Percentage(%)": 75, "Grid_Status": 0,
+    **{f"MCB_{i}_Power(kW)": 4.0 for i in range(1, 9)},
+}
+
+
+def build_request(host, path, body):
+    if body is None:
+        return f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode()
+    payload = json.dumps(body).encode()
+    head = (f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n\r\n")
+    return head.encode() + payload
+
+
+async def read_response(reader):
+    """Return (status, keep_alive) after consuming one response"""
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    version, status = lines[0].split(" ")[:2]
+    headers = {k.strip().lower(): v.strip() for k, v in (line.split(":", 1) for line in lines[1:] if ":" in line)}
+    length = headers.get("content-length")
+    if length is not None:
+        await reader.readexactly(int(length))
+        keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+    else:
+        await reader.read()
+        keep_alive = False
+    return int(status), keep_alive
+
+
+async def client(host, port, request, count, stats):
+    reader = writer = None
+    for _ in range(count):
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            writer.write(request)
+            await writer.drain()
+            status, keep_alive = await read_response(reader)
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            stats["errors"] += 1
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            continue
+        stats["latencies"].append(time.perf_counter() - start)
+        if status == 429:
+            stats["rate_limited"] += 1
+        elif status >= 400:
+            stats["errors"] += 1
+        if not keep_alive:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def run_target(url, path, body, connections, per_connection):
+    parts = urlsplit(url)
+    request = build_request(parts.netloc, path, body)
+    stats = {"latencies": [], "errors": 0, "rate_limited": 0}
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        client(parts.hostname, parts.port or 80, request, per_connection, stats)
+        for _ in range(connections)
+    ])
+    elapsed = time.perf_counter() - start
+    latencies = np.array(stats["latencies"]) * 1000
+    return {
+        "requests": connections * per_connection,
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else float("nan"),
+        "p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else float("nan"),
+        "errors": stats["errors"],
+        "rate_limited": stats["rate_limited"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", action="append", required=True, help="name=url, may be repeated")
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--requests-per-connection", type=int, default=10)
+    parser.add_argument("--endpoint", choices=["status", "predict"], default="status")
+    args = parser.parse_args()
+
+    path, body = ("/predict", PREDICT_BODY) if args.endpoint == "predict" else ("/api/grid/status", None)
+
+    print(f"{'target':<10}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}{'429s':>8}")
+    for target in args.target:
+        name, url = target.split("=", 1)
+        result = asyncio.run(run_target(url, path, body, args.connections, args.requests_per_connection))
+        print(f"{name:<10}{result['requests']:>10}{result['throughput']:>10.1f}{result['p50_ms']:>10.1f}"
+              f"{result['p99_ms']:>10.1f}{result['errors']:>8}{result['rate_limited']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the process-pool inference layer
+
+Fires concurrent /predict-style inference calls from client threads and
+reports requests per second inline (request thread) and for pools of
+1, 2, 4, ... workers up to the core count.
+
+Usage (from the backend folder):
+    python benchmarks/benchmark_execution.py --requests 5000 --clients 64
+"""
+
+import argparse
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+from execution import InferenceExecutor
+from feature_pipeline import FeaturePipeline, model_input
+
+
+def sample_features(n, seed=42):
+    """Feature dicts for n random readings from one site"""
+    rng = np.random.default_rng(seed)
+    pipeline = FeaturePipeline()
+    rows = []
+    for _ in range(n):
+        reading = {
+            "Solar_Power(kW)": rng.uniform(0, 50), "Wind_Power(kW)": rng.uniform(0, 30),
+            "DG_Power(kW)": rng.uniform(0, 20), "UPS_Power(kW)": rng.uniform(0, 10),
+            "Battery_Percentage(%)": int(rng.integers(20, 100)),
+            **{f"MCB_{i}_Power(kW)": rng.uniform(2, 8) for i in range(1, 9)},
+        }
+        rows.append(pipeline.update("bench", reading))
+    return rows
+
+
+def run_clients(call, rows, clients):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(call, rows))
+    return len(rows) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--priority-model", default=os.path.join(BACKEND_DIR, "priority_reg.pkl"))
+    parser.add_argument("--source-model", default=os.path.join(BACKEND_DIR, "source_clf.pkl"))
+    args = parser.parse_args()
+
+    rows = sample_features(args.requests)
+
+    with open(args.priority_model, "rb") as f:
+        priority_reg = pickle.load(f)
+    with open(args.source_model, "rb") as f:
+        source_clf = pickle.load(f)
+
+    def inline(features):
+        return (priority_reg.predict(model_input(features, priority_reg))[0],
+                source_clf.predict(model_input(features, source_clf))[0])
+
+    print(f"{'mode':<12}{'workers':>8}{'req/s':>12}{'speedup':>10}")
+    baseline = run_clients(inline, rows, args.clients)
+    print(f"{'inline':<12}{1:>8}{baseline:>12.1f}{1.0:>10.2f}")
+
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        executor = InferenceExecutor(args.priority_model, args.source_model, workers).start()
+        try:
+            throughput = run_clients(executor.predict, rows, args.clients)
+        finally:
+            executor.shutdown()
+        print(f"{'pool':<12}{workers:>8}{throughput:>12.1f}{throughput / baseline:>10.2f}")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
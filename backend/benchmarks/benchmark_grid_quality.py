@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the grid-quality analytics
+
+Generates a synthetic voltage/current/frequency series with sags, swells
+and frequency excursions, then reports samples per second for bulk
+analysis and for incremental updates at several batch sizes.
+
+Usage (from the backend folder):
+    python benchmarks/benchmark_grid_quality.py --samples 10000000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+from grid_quality import GridQualityMonitor, analyze
+
+
+def synthetic_series(n, seed=42):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n, dtype=np.float64)
+    voltage = 225 + 30 * np.sin(t / 5000) + rng.normal(0, 4, n)
+    current = rng.uniform(0, 40, n)
+    frequency = 50 + 1.1 * np.sin(t / 20000) + rng.normal(0, 0.05, n)
+    return voltage, current, frequency, t * 0.02
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=10_000_000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[100, 10_000, 1_000_000])
+    args = parser.parse_args()
+
+    voltage, current, frequency, timestamps = synthetic_series(args.samples)
+
+    print(f"{'mode':<14}{'batch':>10}{'samples':>12}{'M samples/s':>14}{'events':>10}")
+    start = time.perf_counter()
+    result = analyze(voltage, current, frequency, timestamps)
+    rate = args.samples / (time.perf_counter() - start) / 1e6
+    events = sum(result["summary"]["events"].values())
+    print(f"{'bulk':<14}{'-':>10}{args.samples:>12}{rate:>14.2f}{events:>10}")
+
+    for batch in args.batch_sizes:
+        # Small batches are slow per sample, so time a bounded prefix of the series
+        n = min(args.samples, batch * 2000)
+        monitor = GridQualityMonitor()
+        start = time.perf_counter()
+        for i in range(0, n, batch):
+            monitor.update(voltage[i:i + batch], current[i:i + batch], frequency[i:i + batch],
+                           timestamps[i:i + batch])
+        monitor.flush()
+        rate = n / (time.perf_counter() - start) / 1e6
+        print(f"{'incremental':<14}{batch:>10}{n:>12}{rate:>14.2f}{sum(monitor.summary()['events'].values()):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark for the MCB inventory
+
+Builds synthetic inventories from 8 to 10k circuits and reports, per size,
+the time to load them from JSON and SQLite, to look up MCBs by ID,
+priority and critical flag, and to compute the /api/mcb/detailed statuses
+and summary, next to the per-MCB Python loop the endpoint used before.
+
+Usage (from the backend folder):
+    python benchmarks/benchmark_mcb_inventory.py --sizes 8 100 1000 10000
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+from mcb_inventory import InventoryStore, MCB_FIELDS
+
+
+def synthetic_mcbs(n, seed=42):
+    rng = np.random.default_rng(seed)
+    critical = rng.random(n) < 0.3
+    return [
+        {"id": i + 1, "name": f"{'Critical' if critical[i] else 'Non-Critical'} Load {i + 1}",
+         "power": round(float(rng.uniform(0.5, 8)), 2),
+         "priority": int(rng.integers(1, 5) if critical[i] else rng.integers(5, 100)),
+         "is_critical": bool(critical[i])}
+        for i in range(n)
+    ]
+
+
+def write_sources(mcbs, folder):
+    json_path = os.path.join(folder, f"inventory_{len(mcbs)}.json")
+    with open(json_path, "w") as f:
+        json.dump({"sites": {"default": mcbs}}, f)
+    db_path = os.path.join(folder, f"inventory_{len(mcbs)}.db")
+    connection = sqlite3.connect(db_path)
+    connection.execute("CREATE TABLE mcbs (site_id TEXT, id INTEGER, name TEXT, power REAL, priority INTEGER, "
+                       "is_critical INTEGER)")
+    connection.executemany("INSERT INTO mcbs VALUES (?, ?, ?, ?, ?, ?)",
+                           [("default", *[mcb[field] for field in MCB_FIELDS]) for mcb in mcbs])
+    connection.commit()
+    connection.close()
+    return json_path, db_path
+
+
+def legacy_detailed(mcbs, grid_online, available_power):
+    """The per-MCB loop get_mcb_detailed_response ran over its hardcoded list"""
+    power_available = available_power > 0.1
+    total_critical_power = sum(mcb["power"] for mcb in mcbs if mcb["is_critical"])
+    total_power_demand = sum(mcb["power"] for mcb in mcbs)
+    statuses = {}
+    for mcb in mcbs:
+        if not power_available:
+            status = 0
+        elif mcb["is_critical"]:
+            status = 1
+        elif grid_online and available_power >= total_power_demand:
+            status = 1
+        elif available_power >= total_critical_power + mcb["power"]:
+            status = 1
+        else:
+            status = 0
+        statuses[f"MCB_{mcb['id']}"] = (status, mcb["power"])
+    active = sum(power for status, power in statuses.values() if status == 1)
+    on = sum(1 for status, _ in statuses.values() if status == 1)
+    return on, active
+
+
+def per_call_us(fn, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[8, 100, 1000, 10_000])
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--lookups", type=int, default=1000, help="IDs per batch lookup")
+    args = parser.parse_args()
+
+    print(f"{'mcbs':>7}{'json ms':>9}{'sqlite ms':>11}{'ids us':>9}{'prio us':>9}{'crit us':>9}"
+          f"{'status us':>11}{'loop us':>10}{'speedup':>9}")
+    with tempfile.TemporaryDirectory() as folder:
+        for n in args.sizes:
+            mcbs = synthetic_mcbs(n)
+            json_path, db_path = write_sources(mcbs, folder)
+            repeats = max(1, args.repeats // max(1, n // 1000))
+
+            json_ms = per_call_us(lambda: InventoryStore(json_path), max(1, repeats // 10)) / 1000
+            sqlite_ms = per_call_us(lambda: InventoryStore(db_path), max(1, repeats // 10)) / 1000
+            inventory = InventoryStore(json_path).for_site()
+            assert len(inventory) == n
+
+            wanted = np.random.default_rng(0).integers(1, n + 1, args.lookups)
+            ids_us = per_call_us(lambda: inventory.positions(wanted), repeats)
+            priority_us = per_call_us(lambda: inventory.with_priority(1, 10), repeats)
+            critical_us = per_call_us(inventory.critical_ids, repeats)
+
+            # Enough for the critical load and roughly half of the rest
+            available = inventory.critical_power + (inventory.total_power - inventory.critical_power) / 2
+
+            def vectorized():
+                statuses = inventory.detailed_statuses(False, available)
+                return inventory.summary(statuses)
+
+            summary = vectorized()
+            legacy_on, legacy_active = legacy_detailed(mcbs, False, available)
+            assert summary["mcbs_on"] == legacy_on and np.isclose(summary["active_power_load"], legacy_active)
+            status_us = per_call_us(vectorized, repeats)
+            loop_us = per_call_us(lambda: legacy_detailed(mcbs, False, available), repeats)
+
+            print(f"{n:>7}{json_ms:>9.2f}{sqlite_ms:>11.2f}{ids_us:>9.1f}{priority_us:>9.1f}{critical_us:>9.1f}"
+                  f"{status_us:>11.1f}{loop_us:>10.1f}{loop_us / status_us:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
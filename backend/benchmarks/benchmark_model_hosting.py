@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark for per-worker pickled models versus shared hosting
+
+Starts 1, 2, 4, ... fresh worker processes that each load both forests,
+run a prediction so every page is touched, and then report how much
+proportional set size (PSS) loading added. In "pickle" mode the total grows
+with the worker count; in "shared" mode the mapped arrays are split between
+workers and the total stays flat. Linux only (reads /proc/self/smaps_rollup).
+
+Usage (from the backend folder):
+    python benchmarks/benchmark_model_hosting.py --max-workers 8
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+
+def memory_kb():
+    """(pss_kb, private_kb) of the calling process"""
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return fields["Pss"], fields["Private_Clean"] + fields["Private_Dirty"]
+
+
+def worker(hosting, cache_dir, model_paths, loaded, measured, results):
+    import numpy as np
+    from model_hosting import load_model
+
+    pss_before, _ = memory_kb()
+    models = [load_model(path, hosting, cache_dir) for path in model_paths]
+    for model in models:
+        model.predict(np.zeros((64, len(model.feature_names_in_)), dtype=np.float32))
+    # Measure only once every worker holds its models, so shared pages are
+    # split between all of them
+    loaded.wait()
+    pss_after, private = memory_kb()
+    results.put((pss_after - pss_before, private))
+    measured.wait()
+
+
+def run(hosting, workers, cache_dir, model_paths):
+    context = multiprocessing.get_context("spawn")
+    loaded, measured = context.Barrier(workers), context.Barrier(workers)
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(hosting, cache_dir, model_paths, loaded, measured, results))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    samples = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return sum(s[0] for s in samples) / 1024, sum(s[1] for s in samples) / workers / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-workers", type=int, default=8)
+    parser.add_argument("--priority-model", default=os.path.join(BACKEND_DIR, "priority_reg.pkl"))
+    parser.add_argument("--source-model", default=os.path.join(BACKEND_DIR, "source_clf.pkl"))
+    args = parser.parse_args()
+
+    from model_hosting import publish_model
+
+    model_paths = [args.priority_model, args.source_model]
+    with tempfile.TemporaryDirectory(dir="/dev/shm" if os.path.isdir("/dev/shm") else None) as cache_dir:
+        # Publish up front, as a deploy step would, so no worker pays for it
+        for path in model_paths:
+            publish_model(path, cache_dir)
+
+        print(f"{'hosting':<10}{'workers':>8}{'model PSS MB':>14}{'process private MB':>20}")
+        for hosting in ["pickle", "shared"]:
+            workers = 1
+            while workers <= args.max_workers:
+                total_pss, private = run(hosting, workers, cache_dir, model_paths)
+                print(f"{hosting:<10}{workers:>8}{total_pss:>14.2f}{private:>20.2f}")
+                workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import pandas as pd
+
+from app_logging import configure_logging
+from feature_pipeline import model_features
+from model_hosting import load_model
+
+# Requests arriving within this window are answered by one vectorized predict
+DEFAULT_BATCH_WINDOW_MS = 2.0
+DEFAULT_MAX_BATCH_SIZE = 256
+
+# Workers start from a fresh interpreter. A forked worker would inherit locks
+# held by the parent's threads, and app_logging's QueueHandler without the
+# listener thread that drains it, so its log records would be lost.
+WORKER_START_METHOD = "spawn"
+
+# Models loaded once per worker process by the pool initializer
+_worker_models = {}
+
+
+def _load_worker_models(priority_model_path, source_model_path):
+    configure_logging()
+    _worker_models["priority_reg"] = load_model(priority_model_path)
+    _worker_models["source_clf"] = load_model(source_model_path)
+
+
+def _worker_ready(delay):
+    # Holding each task briefly spreads the warm-up tasks across all workers
+    time.sleep(delay)
+    return os.getpid()
+
+
+def _predict_rows(rows):
+    """Run both models over a batch of feature dicts in one call each"""
+    priority_reg = _worker_models["priority_reg"]
+    source_clf = _worker_models["source_clf"]
+    priority_names = model_features(priority_reg)
+    source_names = model_features(source_clf)
+    priorities = priority_reg.predict(pd.DataFrame([[row[n] for n in priority_names] for row in rows], columns=priority_names))
+    sources = source_clf.predict(pd.DataFrame([[row[n] for n in source_names] for row in rows], columns=source_names))
+    return [(float(p), str(s)) for p, s in zip(priorities, sources)]
+
+
+class InferenceExecutor:
+    """
+    Runs model inference on a pre-warmed process pool
+
+    Requests are micro-batched: a dispatcher thread collects
+    requests that arrive within `batch_window_ms` (up to `max_batch_size`)
+    and sends them to a worker as a single vectorized predict. Workers are
+    spawned, not forked, and each loads the models once, in the pool
+    initializer, as set by MODEL_HOSTING.
+    """
+
+    def __init__(self, priority_model_path, source_model_path, workers=None,
+                 batch_window_ms=DEFAULT_BATCH_WINDOW_MS, max_batch_size=DEFAULT_MAX_BATCH_SIZE):
+        self.priority_model_path = priority_model_path
+        self.source_model_path = source_model_path
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_window = batch_window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.pool = None
+        self.requests = queue.Queue()
+        self.dispatcher = None
+
+    def start(self):
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context(WORKER_START_METHOD),
+            initializer=_load_worker_models,
+            initargs=(self.priority_model_path, self.source_model_path),
+        )
+        # Pre-warm: make every worker start and load its models up front
+        for future in [self.pool.submit(_worker_ready, 0.05) for _ in range(self.workers)]:
+            future.result()
+        self.dispatcher = threading.Thread(target=self._dispatch, name="inference-batcher", daemon=True)
+        self.dispatcher.start()
+        return self
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.requests.put(None)
+            self.dispatcher.join()
+            self.pool.shutdown()
+            self.pool = None
+
+    def predict(self, features, timeout=None):
+        """Return (priority, optimal_source) for one feature dict"""
+        return self.submit_predict(features).result(timeout)
+
+    def submit_predict(self, features):
+        future = Future()
+        self.requests.put((features, future))
+        return future
+
+    def _dispatch(self):
+        while True:
+            item = self.requests.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self.requests.put(None)
+                    break
+                batch.append(item)
+            self._send(batch)
+
+    def _send(self, batch):
+        futures = [future for _, future in batch]
+        try:
+            pool_future = self.pool.submit(_predict_rows, [features for features, _ in batch])
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+
+        def resolve(done):
+            try:
+                results = done.result()
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                return
+            for future, result in zip(futures, results):
+                future.set_result(result)
+
+        pool_future.add_done_callback(resolve)
@@ -0,0 +1,232 @@
+import math
+import threading
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from mcb_inventory import InventoryStore
+from telemetry import DEFAULT_SITE
+
+# Instantaneous features the models were originally trained on
+FEATURES = [
+    "Solar_Power(kW)", "Wind_Power(kW)", "DG_Power(kW)", "UPS_Power(kW)",
+    "Battery_Percentage(%)", "Total_Load_Demand(kW)", "Critical_Load(kW)", "Non_Critical_Load(kW)"
+]
+
+# Features the pipeline derives from MCB readings whenever a reading has them
+DERIVED_LOAD_FEATURES = ["Total_Load_Demand(kW)", "Critical_Load(kW)", "Non_Critical_Load(kW)"]
+
+# Series that get rolling aggregates, and the aggregate parameters
+AGGREGATE_SERIES = ["Solar_Power(kW)", "Wind_Power(kW)", "Total_Load_Demand(kW)", "Critical_Load(kW)"]
+EWMA_ALPHA = 0.3
+MIN_MAX_WINDOW = 4  # readings, i.e. one hour of 15-minute telemetry
+
+
+def aggregate_feature_names():
+    """Names of the rolling aggregate features, in a fixed order"""
+    names = []
+    for series in AGGREGATE_SERIES:
+        names += [
+            f"{series}_ewma",
+            f"{series}_min{MIN_MAX_WINDOW}",
+            f"{series}_max{MIN_MAX_WINDOW}",
+            f"{series}_ramp",
+        ]
+    return names
+
+
+MODEL_FEATURES = FEATURES + aggregate_feature_names()
+
+
+def model_features(model):
+    """Feature names a fitted model expects, falling back to the base features"""
+    names = getattr(model, "feature_names_in_", None)
+    return list(names) if names is not None else FEATURES
+
+
+def model_input(features, model):
+    """Single-row DataFrame with the columns `model` expects, taken from a feature dict"""
+    names = model_features(model)
+    return pd.DataFrame([[features[name] for name in names]], columns=names)
+
+
+def critical_mask(mcb_ids, inventory):
+    """
+    Decide which MCBs are critical
+
+    Uses the `is_critical` flag of the site's MCB inventory, the same one
+    /api/mcb/detailed keeps ON; MCBs the inventory doesn't list are
+    non-critical.
+    """
+    mcb_ids = list(mcb_ids)
+    flags = inventory.critical_flags([int(mcb_id.split('_')[1]) for mcb_id in mcb_ids])
+    return dict(zip(mcb_ids, flags.tolist()))
+
+
+def derive_load_features(mcb_powers, mask):
+    """Total, critical and non-critical load in kW from live MCB readings"""
+    critical = sum(power for mcb_id, power in mcb_powers.items() if mask[mcb_id])
+    total = sum(mcb_powers.values())
+    return {
+        "Total_Load_Demand(kW)": round(total, 4),
+        "Critical_Load(kW)": round(critical, 4),
+        "Non_Critical_Load(kW)": round(total - critical, 4),
+    }
+
+
+def reading_number(key, value):
+    """A reading field as a finite float; raises ValueError naming the field otherwise"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        number = math.nan
+    if not math.isfinite(number):
+        raise ValueError(f"{key} must be a number, got {value!r}")
+    return number
+
+
+def extract_mcb_readings(reading):
+    """
+    Split MCB_i_Power(kW) / MCB_i_Priority fields of a reading into two dicts
+
+    Values are converted to floats, so "9" and 9 order the same; a value
+    that isn't a finite number raises ValueError.
+    """
+    mcb_powers = {}
+    mcb_priorities = {}
+    for key, value in reading.items():
+        if key.startswith("MCB_") and key.endswith("_Power(kW)"):
+            mcb_powers[key.replace("_Power(kW)", "")] = reading_number(key, value)
+        elif key.startswith("MCB_") and key.endswith("_Priority"):
+            mcb_priorities[key.replace("_Priority", "")] = reading_number(key, value)
+    return mcb_powers, mcb_priorities
+
+
+def fill_load_features(reading, inventory):
+    """
+    Return a copy of the reading with its load features derived from its MCBs
+
+    Derived loads replace any the client sent, as in `fill_frame_load_features`
+    for training data, so the models see loads computed one way everywhere.
+    `inventory` is the reading's site inventory, which marks the critical
+    MCBs. Readings without MCB powers keep their own load features.
+    """
+    mcb_powers, _ = extract_mcb_readings(reading)
+    if not mcb_powers:
+        return dict(reading)
+    filled = dict(reading)
+    filled.update(derive_load_features(mcb_powers, critical_mask(mcb_powers, inventory)))
+    return filled
+
+
+def fill_frame_load_features(df, inventories, site_field=None):
+    """
+    Vectorized `fill_load_features` over a telemetry DataFrame
+
+    Each row's critical MCBs come from the inventory of its site (the
+    `site_field` column), or of the default site without one.
+    """
+    power_cols = [c for c in df.columns if c.startswith("MCB_") and c.endswith("_Power(kW)")]
+    if not power_cols:
+        return df
+
+    df = df.copy()
+    powers = df[power_cols]
+    mcb_ids = [col.replace("_Power(kW)", "") for col in power_cols]
+    sites = df[site_field] if site_field else pd.Series(DEFAULT_SITE, index=df.index)
+    codes, site_ids = pd.factorize(sites, use_na_sentinel=False)
+    flags = np.array([list(critical_mask(mcb_ids, inventories.for_site(site_id)).values())
+                      for site_id in site_ids], dtype=bool).reshape(len(site_ids), len(mcb_ids))
+    mask = pd.DataFrame(flags[codes], index=df.index, columns=power_cols)
+
+    total = powers.sum(axis=1)
+    critical = powers.where(mask, 0.0).sum(axis=1)
+    df["Total_Load_Demand(kW)"] = total.round(4)
+    df["Critical_Load(kW)"] = critical.round(4)
+    df["Non_Critical_Load(kW)"] = (total - critical).round(4)
+    return df
+
+
+class SeriesAggregates:
+    """EWMA, windowed min/max and ramp of one series, each updated in O(1)"""
+
+    def __init__(self, alpha=EWMA_ALPHA, window=MIN_MAX_WINDOW):
+        self.alpha = alpha
+        self.window = window
+        self.count = 0
+        self.ewma = None
+        self.last = None
+        # Monotonic deques of (index, value); the front is the window min/max
+        self.min_queue = deque()
+        self.max_queue = deque()
+
+    def update(self, value):
+        index = self.count
+        self.count += 1
+
+        self.ewma = value if self.ewma is None else self.alpha * value + (1 - self.alpha) * self.ewma
+        ramp = 0.0 if self.last is None else value - self.last
+        self.last = value
+
+        while self.min_queue and self.min_queue[-1][1] >= value:
+            self.min_queue.pop()
+        self.min_queue.append((index, value))
+        while self.max_queue and self.max_queue[-1][1] <= value:
+            self.max_queue.pop()
+        self.max_queue.append((index, value))
+        expired = index - self.window
+        if self.min_queue[0][0] <= expired:
+            self.min_queue.popleft()
+        if self.max_queue[0][0] <= expired:
+            self.max_queue.popleft()
+
+        return [self.ewma, self.min_queue[0][1], self.max_queue[0][1], ramp]
+
+
+class FeaturePipeline:
+    """
+    Turns raw readings into model features for training and serving alike
+
+    `transform_frame` computes the features over historical telemetry with
+    vectorized pandas operations; `update` produces the same values for one
+    live reading per site from incrementally maintained state. Critical
+    loads use each site's MCB inventory (see `critical_mask`).
+    """
+
+    def __init__(self, inventories=None):
+        self.inventories = inventories or InventoryStore()
+        self.sites = {}
+        self.lock = threading.Lock()
+
+    def update(self, site_id, reading):
+        """Derive missing loads, advance the site's aggregates and return all features"""
+        features = fill_load_features(reading, self.inventories.for_site(site_id))
+        with self.lock:
+            aggregates = self.sites.setdefault(site_id, {series: SeriesAggregates() for series in AGGREGATE_SERIES})
+            values = []
+            for series in AGGREGATE_SERIES:
+                values += aggregates[series].update(float(features[series]))
+        features.update(zip(aggregate_feature_names(), values))
+        return features
+
+    @staticmethod
+    def transform_frame(df, site_field=None, inventories=None):
+        """
+        Add derived loads and rolling aggregates to historical telemetry
+
+        Rows are processed per site (when `site_field` is given) in their
+        existing order, matching successive `update` calls.
+        """
+        df = fill_frame_load_features(df, inventories or InventoryStore(), site_field)
+        site_key = df[site_field] if site_field else pd.Series(0, index=df.index)
+        groups = df.groupby(site_key, sort=False)
+
+        aggregates = {}
+        for series in AGGREGATE_SERIES:
+            values = groups[series]
+            aggregates[f"{series}_ewma"] = values.transform(lambda s: s.ewm(alpha=EWMA_ALPHA, adjust=False).mean())
+            aggregates[f"{series}_min{MIN_MAX_WINDOW}"] = values.transform(lambda s: s.rolling(MIN_MAX_WINDOW, min_periods=1).min())
+            aggregates[f"{series}_max{MIN_MAX_WINDOW}"] = values.transform(lambda s: s.rolling(MIN_MAX_WINDOW, min_periods=1).max())
+            aggregates[f"{series}_ramp"] = values.diff().fillna(0.0)
+        return df.assign(**aggregates)
@@ -0,0 +1,257 @@
+import pickle
+import threading
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+from telemetry import SITE_FIELD, DEFAULT_SITE, INTERVAL_MINUTES
+
+# Series we forecast, in the order they appear in the model output
+FORECAST_TARGETS = ["Solar_Power(kW)", "Wind_Power(kW)", "Total_Load_Demand(kW)"]
+
+# Lag features: the current reading (lag 0) plus the three before it
+LAGS = [0, 1, 2, 3]
+
+# Rolling mean windows in 15-minute intervals (1 hour and 2 hours)
+ROLLING_WINDOWS = [4, 8]
+
+# Maximum number of 15-minute intervals the model predicts ahead
+FORECAST_HORIZON = 8
+
+HISTORY_LENGTH = max(max(LAGS) + 1, max(ROLLING_WINDOWS))
+
+# Missed intervals up to this many are filled with the last reading; after a
+# longer gap the site's history restarts
+MAX_GAP_INTERVALS = HISTORY_LENGTH
+
+
+def forecast_feature_names():
+    """Names of the lag/rolling features, in model input order"""
+    names = []
+    for target in FORECAST_TARGETS:
+        names += [f"{target}_lag{lag}" for lag in LAGS]
+        names += [f"{target}_mean{window}" for window in ROLLING_WINDOWS]
+    return names + ["Hour_Sin", "Hour_Cos"]
+
+
+def _hour_features(timestamps):
+    """Encode time of day on the unit circle so 23:45 sits next to 00:00"""
+    hours = timestamps.dt.hour + timestamps.dt.minute / 60.0
+    angle = 2 * np.pi * hours / 24.0
+    return np.sin(angle), np.cos(angle)
+
+
+def build_training_frame(df, horizon=FORECAST_HORIZON):
+    """
+    Build lag features and multi-step targets from historical telemetry
+
+    Rows are grouped per site and ordered by timestamp; all lags and rolling
+    means are computed with vectorized shift/rolling operations.
+
+    Returns:
+    - (X, y) DataFrames, with rows lacking full history or future dropped
+    """
+    df = df.copy()
+    if SITE_FIELD not in df.columns:
+        df[SITE_FIELD] = DEFAULT_SITE
+    df["Timestamp"] = pd.to_datetime(df["Timestamp"])
+    df = df.sort_values([SITE_FIELD, "Timestamp"]).reset_index(drop=True)
+    by_site = df.groupby(SITE_FIELD, sort=False)
+
+    features = {}
+    targets = {}
+    for target in FORECAST_TARGETS:
+        series = by_site[target]
+        for lag in LAGS:
+            features[f"{target}_lag{lag}"] = series.shift(lag)
+        for window in ROLLING_WINDOWS:
+            features[f"{target}_mean{window}"] = series.rolling(window).mean().reset_index(level=0, drop=True)
+        for step in range(1, horizon + 1):
+            targets[f"{target}_t+{step}"] = series.shift(-step)
+
+    features["Hour_Sin"], features["Hour_Cos"] = _hour_features(df["Timestamp"])
+
+    X = pd.DataFrame(features)[forecast_feature_names()]
+    y = pd.DataFrame(targets)
+    valid = X.notna().all(axis=1) & y.notna().all(axis=1)
+    return X[valid], y[valid]
+
+
+def train_forecaster(df, horizon=FORECAST_HORIZON):
+    """Train a multi-output forest predicting the next `horizon` intervals"""
+    X, y = build_training_frame(df, horizon)
+    model = RandomForestRegressor(random_state=42)
+    model.fit(X, y)
+    return LoadForecaster(model, horizon)
+
+
+class SiteFeatureState:
+    """
+    Rolling per-site history that yields forecast features in O(1) per reading
+
+    History holds one value per 15-minute interval, as in training. A reading
+    in the same interval as the last one replaces it, missed intervals are
+    filled with the last reading, and readings older than the current
+    interval are dropped.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.history = {target: deque(maxlen=HISTORY_LENGTH) for target in FORECAST_TARGETS}
+        self.window_sums = {target: {window: 0.0 for window in ROLLING_WINDOWS} for target in FORECAST_TARGETS}
+        self.last_timestamp = None
+        self.last_interval = None
+
+    def update(self, reading, timestamp):
+        """
+        Apply one reading at `timestamp`
+
+        Returns:
+        - False if the reading was older than the current interval and dropped
+        """
+        interval = timestamp.floor(f"{INTERVAL_MINUTES}min")
+        values = {target: float(reading[target]) for target in FORECAST_TARGETS}
+        if self.last_interval is not None:
+            if interval < self.last_interval:
+                return False
+            if interval == self.last_interval:
+                self._replace_last(values)
+                self.last_timestamp = timestamp
+                return True
+            missed = (interval - self.last_interval) // pd.Timedelta(minutes=INTERVAL_MINUTES) - 1
+            if missed > MAX_GAP_INTERVALS:
+                self.reset()
+            else:
+                last = {target: self.history[target][-1] for target in FORECAST_TARGETS}
+                for _ in range(missed):
+                    self._push(last)
+        self._push(values)
+        self.last_timestamp = timestamp
+        self.last_interval = interval
+        return True
+
+    def _push(self, values):
+        """Append one interval, adjusting the running window sums instead of re-summing"""
+        for target, value in values.items():
+            buffer = self.history[target]
+            sums = self.window_sums[target]
+            for window in ROLLING_WINDOWS:
+                if len(buffer) >= window:
+                    sums[window] -= buffer[-window]
+                sums[window] += value
+            buffer.append(value)
+
+    def _replace_last(self, values):
+        for target, value in values.items():
+            buffer = self.history[target]
+            sums = self.window_sums[target]
+            for window in ROLLING_WINDOWS:
+                sums[window] += value - buffer[-1]
+            buffer[-1] = value
+
+    def is_ready(self):
+        return all(len(buffer) >= HISTORY_LENGTH for buffer in self.history.values())
+
+    def feature_vector(self):
+        """Current features in `forecast_feature_names()` order"""
+        row = []
+        for target in FORECAST_TARGETS:
+            buffer = self.history[target]
+            row += [buffer[-1 - lag] for lag in LAGS]
+            row += [self.window_sums[target][window] / window for window in ROLLING_WINDOWS]
+        sin, cos = _hour_features(pd.Series([self.last_timestamp]))
+        return row + [float(sin.iloc[0]), float(cos.iloc[0])]
+
+
+class LoadForecaster:
+    """Serves multi-step solar, wind and load forecasts for many sites"""
+
+    def __init__(self, model, horizon=FORECAST_HORIZON):
+        self.model = model
+        self.horizon = horizon
+        self.sites = {}
+        self.lock = threading.Lock()
+
+    def observe(self, site_id, reading, timestamp=None):
+        """
+        Feed a new telemetry reading for a site
+
+        Returns:
+        - False if the reading was ignored (missing a target, or older than
+          the site's current interval)
+        """
+        if any(target not in reading for target in FORECAST_TARGETS):
+            return False
+        if timestamp is None:
+            timestamp = reading.get("Timestamp") or datetime.now()
+        timestamp = pd.Timestamp(timestamp)
+        with self.lock:
+            state = self.sites.setdefault(site_id, SiteFeatureState())
+            return state.update(reading, timestamp)
+
+    def warm_start(self, df):
+        """Replay historical telemetry so sites are ready to forecast immediately"""
+        df = df.copy()
+        if SITE_FIELD not in df.columns:
+            df[SITE_FIELD] = DEFAULT_SITE
+        df["Timestamp"] = pd.to_datetime(df["Timestamp"])
+        tail = df.sort_values("Timestamp").groupby(SITE_FIELD, sort=False).tail(HISTORY_LENGTH)
+        for row in tail.to_dict("records"):
+            self.observe(row[SITE_FIELD], row, row["Timestamp"])
+
+    def forecast(self, site_ids=None, steps=None):
+        """
+        Forecast the next `steps` intervals for each site in one batched predict call
+
+        Returns:
+        - (forecasts, pending) where forecasts maps site -> target -> list of
+          values and pending lists sites without enough history yet
+        """
+        steps = self.horizon if steps is None else steps
+        if not 1 <= steps <= self.horizon:
+            raise ValueError(f"steps must be between 1 and {self.horizon}")
+
+        with self.lock:
+            if site_ids is None:
+                site_ids = list(self.sites)
+            ready, rows, pending = [], [], []
+            for site_id in site_ids:
+                state = self.sites.get(site_id)
+                if state is not None and state.is_ready():
+                    ready.append(site_id)
+                    rows.append(state.feature_vector())
+                else:
+                    pending.append(site_id)
+
+        forecasts = {}
+        if rows:
+            X = pd.DataFrame(rows, columns=forecast_feature_names())
+            # Output columns are grouped per target: [target][step 1..horizon]
+            predictions = self.model.predict(X).reshape(len(rows), len(FORECAST_TARGETS), self.horizon)
+            for site_id, site_prediction in zip(ready, predictions):
+                forecasts[site_id] = {
+                    target: [round(float(v), 3) for v in site_prediction[i, :steps]]
+                    for i, target in enumerate(FORECAST_TARGETS)
+                }
+        return forecasts, pending
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            pickle.dump({"model": self.model, "horizon": self.horizon}, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            saved = pickle.load(f)
+        return cls(saved["model"], saved["horizon"])
+
+
+if __name__ == "__main__":
+    forecaster = train_forecaster(pd.read_csv("../dataset/energy_dataset.csv"))
+    forecaster.save("forecast_model.pkl")
+    print("Forecast model saved to forecast_model.pkl")
@@ -0,0 +1,288 @@
+import threading
+from collections import deque
+
+import numpy as np
+
+from telemetry import DEFAULT_SITE
+
+# Same limits get_grid_status applies to the latest reading
+VOLTAGE_MIN = 200.0
+VOLTAGE_MAX = 250.0
+FREQUENCY_MIN = 49.0
+FREQUENCY_MAX = 51.0
+
+# Samples per RMS window, and events kept for the quality endpoint
+RMS_WINDOW = 60
+RECENT_EVENTS = 100
+# Samples processed per step by analyze(); bounds temporary arrays
+ANALYZE_CHUNK = 1 << 20
+
+# (event kind, signal, out-of-band test, reduction giving the worst value)
+EVENT_KINDS = [
+    ("sag", "voltage", lambda v: v < VOLTAGE_MIN, np.minimum),
+    ("swell", "voltage", lambda v: v > VOLTAGE_MAX, np.maximum),
+    ("under_frequency", "frequency", lambda f: f < FREQUENCY_MIN, np.minimum),
+    ("over_frequency", "frequency", lambda f: f > FREQUENCY_MAX, np.maximum),
+]
+WINDOW_FIELDS = ["rms_voltage", "rms_current", "mean_power_kw", "min_frequency", "max_frequency"]
+
+
+def power_kw(voltage, current):
+    """Power from voltage (V) and current (A) samples, in kW"""
+    return np.multiply(voltage, current) / 1000.0
+
+
+def find_runs(mask):
+    """(starts, ends) of every run of True values; ends are exclusive"""
+    edges = np.diff(mask.view(np.int8), prepend=np.int8(0), append=np.int8(0))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def reduce_runs(ufunc, values, starts, ends):
+    """Apply `ufunc.reduce` to values[start:end] for every run at once"""
+    if len(starts) == 0:
+        return np.empty(0, dtype=values.dtype)
+    bounds = np.empty(2 * len(starts), dtype=np.intp)
+    bounds[0::2] = starts
+    bounds[1::2] = ends
+    if bounds[-1] == len(values):
+        return ufunc.reduceat(values, bounds[:-1])[0::2]
+    return ufunc.reduceat(values, bounds)[0::2]
+
+
+def window_stats(voltage, current, power, frequency, window):
+    """RMS voltage/current, mean power and frequency range of consecutive full windows"""
+    count = len(voltage) // window
+    shape = (count, window)
+    v = voltage[:count * window].reshape(shape)
+    i = current[:count * window].reshape(shape)
+    f = frequency[:count * window].reshape(shape)
+    return {
+        "rms_voltage": np.sqrt(np.einsum("ij,ij->i", v, v) / window),
+        "rms_current": np.sqrt(np.einsum("ij,ij->i", i, i) / window),
+        "mean_power_kw": power[:count * window].reshape(shape).mean(axis=1),
+        "min_frequency": f.min(axis=1),
+        "max_frequency": f.max(axis=1),
+    }
+
+
+def _empty_events(with_times):
+    empty = np.empty(0)
+    return {
+        "start_sample": np.empty(0, dtype=np.int64), "end_sample": np.empty(0, dtype=np.int64),
+        "extreme": empty, "start_time": empty if with_times else None, "end_time": empty if with_times else None,
+    }
+
+
+class GridQualityMonitor:
+    """
+    Streaming power-quality analytics for one site
+
+    `update` takes a batch of voltage, current and frequency samples (a
+    single live reading or millions of historical ones) and processes it
+    with whole-array NumPy operations. Events and partial RMS windows that
+    run past the end of a batch carry over to the next one, so splitting a
+    series into batches gives the same result as processing it at once.
+    """
+
+    def __init__(self, window=RMS_WINDOW):
+        self.window = window
+        self.samples = 0
+        self.event_counts = {kind: 0 for kind, _, _, _ in EVENT_KINDS}
+        self.out_of_band = {kind: 0 for kind, _, _, _ in EVENT_KINDS}
+        # kind -> (start_sample, start_time, extreme) of an event still in progress
+        self.open_events = {}
+        self.last_time = None
+        self.last_window = None
+        self.recent_events = deque(maxlen=RECENT_EVENTS)
+        self._carry = {name: np.empty(0) for name in ["voltage", "current", "power", "frequency"]}
+
+    def update(self, voltage, current, frequency, timestamps=None):
+        """
+        Process a batch of samples
+
+        Parameters:
+        - voltage, current, frequency: Equal-length sample arrays (V, A, Hz)
+        - timestamps: Optional sample times in seconds, used for event times
+
+        Returns:
+        - Dictionary with per-sample "power_kw", the completed "windows"
+          and the "events" that ended in this batch, per kind
+        """
+        signals = {
+            "voltage": np.asarray(voltage, dtype=np.float64).ravel(),
+            "current": np.asarray(current, dtype=np.float64).ravel(),
+            "frequency": np.asarray(frequency, dtype=np.float64).ravel(),
+        }
+        times = np.asarray(timestamps, dtype=np.float64).ravel() if timestamps is not None else None
+        n = len(signals["voltage"])
+        power = power_kw(signals["voltage"], signals["current"])
+
+        events = {}
+        for kind, signal, out_of_band, worst in EVENT_KINDS:
+            events[kind] = self._events(kind, signals[signal], out_of_band(signals[signal]), worst, times)
+
+        windows = self._windows(signals, power)
+        self.samples += n
+        if n and times is not None:
+            self.last_time = float(times[-1])
+        return {"power_kw": power, "windows": windows, "events": events}
+
+    def flush(self):
+        """Close events still in progress, e.g. at the end of a historical series"""
+        with_times = self.last_time is not None
+        events = {kind: _empty_events(with_times) for kind, _, _, _ in EVENT_KINDS}
+        for kind, (start, start_time, extreme) in self.open_events.items():
+            closed = {
+                "start_sample": np.array([start]), "end_sample": np.array([self.samples]),
+                "extreme": np.array([extreme]),
+                "start_time": np.array([start_time]) if with_times else None,
+                "end_time": np.array([self.last_time]) if with_times else None,
+            }
+            events[kind] = closed
+            self._record(kind, closed)
+        self.open_events = {}
+        return events
+
+    def summary(self):
+        return {
+            "samples": self.samples,
+            "events": dict(self.event_counts),
+            "out_of_band_samples": dict(self.out_of_band),
+            "events_in_progress": sorted(self.open_events),
+            "last_window": self.last_window,
+            "recent_events": list(self.recent_events),
+        }
+
+    def _events(self, kind, values, mask, worst, times):
+        n = len(values)
+        if n == 0:
+            return _empty_events(times is not None)
+        starts, ends = find_runs(mask)
+        extremes = reduce_runs(worst, values, starts, ends)
+        self.out_of_band[kind] += int(np.count_nonzero(mask))
+        start_times = times[starts] if times is not None else None
+        end_times = times[ends - 1] if times is not None else None
+        start_samples = starts + self.samples
+        end_samples = ends + self.samples
+
+        open_event = self.open_events.pop(kind, None)
+        if open_event is not None:
+            start, start_time, extreme = open_event
+            if len(starts) and starts[0] == 0:
+                # The event from the previous batch continues into this one
+                start_samples[0] = start
+                extremes[0] = worst(extremes[0], extreme)
+                if start_times is not None:
+                    start_times[0] = start_time if start_time is not None else start_times[0]
+            else:
+                # It ended exactly at the batch boundary
+                start_samples = np.concatenate([[start], start_samples])
+                end_samples = np.concatenate([[self.samples], end_samples])
+                extremes = np.concatenate([[extreme], extremes])
+                if start_times is not None:
+                    start_times = np.concatenate([[start_time if start_time is not None else np.nan], start_times])
+                    end_times = np.concatenate([[self.last_time if self.last_time is not None else np.nan],
+                                                end_times])
+
+        if n and len(end_samples) and end_samples[-1] == self.samples + n:
+            # Still in progress at the end of the batch
+            self.open_events[kind] = (int(start_samples[-1]), float(start_times[-1]) if start_times is not None else None,
+                                      float(extremes[-1]))
+            start_samples, end_samples, extremes = start_samples[:-1], end_samples[:-1], extremes[:-1]
+            if start_times is not None:
+                start_times, end_times = start_times[:-1], end_times[:-1]
+
+        closed = {"start_sample": start_samples, "end_sample": end_samples, "extreme": extremes,
+                  "start_time": start_times, "end_time": end_times}
+        self._record(kind, closed)
+        return closed
+
+    def _record(self, kind, closed):
+        count = len(closed["start_sample"])
+        self.event_counts[kind] += count
+        for j in range(max(0, count - RECENT_EVENTS), count):
+            self.recent_events.append({
+                "kind": kind,
+                "start_sample": int(closed["start_sample"][j]),
+                "end_sample": int(closed["end_sample"][j]),
+                "extreme": float(closed["extreme"][j]),
+                "start_time": float(closed["start_time"][j]) if closed["start_time"] is not None else None,
+                "end_time": float(closed["end_time"][j]) if closed["end_time"] is not None else None,
+            })
+
+    def _windows(self, signals, power):
+        batch = {"voltage": signals["voltage"], "current": signals["current"], "power": power,
+                 "frequency": signals["frequency"]}
+        if len(self._carry["voltage"]):
+            batch = {name: np.concatenate([self._carry[name], values]) for name, values in batch.items()}
+        windows = window_stats(batch["voltage"], batch["current"], batch["power"], batch["frequency"], self.window)
+        used = len(windows["rms_voltage"]) * self.window
+        self._carry = {name: values[used:].copy() for name, values in batch.items()}
+        if used:
+            self.last_window = {field: float(windows[field][-1]) for field in WINDOW_FIELDS}
+        return windows
+
+
+def analyze(voltage, current, frequency, timestamps=None, window=RMS_WINDOW, chunk_size=ANALYZE_CHUNK):
+    """
+    Bulk analysis of a historical series, chunk by chunk through a monitor
+
+    Returns:
+    - Dictionary with "power_kw", "windows", "events" (all kinds closed at
+      the end of the series) and the monitor "summary"
+    """
+    monitor = GridQualityMonitor(window)
+    results = []
+    for start in range(0, len(voltage), chunk_size):
+        stop = start + chunk_size
+        results.append(monitor.update(voltage[start:stop], current[start:stop], frequency[start:stop],
+                                      timestamps[start:stop] if timestamps is not None else None))
+    results.append({"power_kw": np.empty(0), "windows": None, "events": monitor.flush()})
+
+    def concat(parts):
+        parts = list(parts)
+        return np.concatenate(parts) if parts and parts[0] is not None else None
+
+    return {
+        "power_kw": concat(r["power_kw"] for r in results),
+        "windows": {field: concat(r["windows"][field] for r in results if r["windows"] is not None)
+                    for field in WINDOW_FIELDS},
+        "events": {kind: {key: concat(r["events"][kind][key] for r in results) for key in _empty_events(True)}
+                   for kind, _, _, _ in EVENT_KINDS},
+        "summary": monitor.summary(),
+    }
+
+
+class SiteQualityMonitors:
+    """One GridQualityMonitor per site, safe to feed from concurrent requests"""
+
+    def __init__(self, window=RMS_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._monitors = {}
+        self._versions = {}
+
+    def update(self, site_id, voltage, current, frequency, timestamps=None, version=None):
+        """
+        Feed samples to the site's monitor
+
+        `version` is the grid-state snapshot version the samples come from.
+        Requests can reach this after the store has released its lock, in
+        either order, so a snapshot no newer than the last one fed for the
+        site is skipped (returns None) rather than fed out of order.
+        """
+        with self._lock:
+            if version is not None:
+                if version <= self._versions.get(site_id, 0):
+                    return None
+                self._versions[site_id] = version
+            monitor = self._monitors.get(site_id)
+            if monitor is None:
+                monitor = self._monitors[site_id] = GridQualityMonitor(self.window)
+            return monitor.update(voltage, current, frequency, timestamps)
+
+    def summary(self, site_id=DEFAULT_SITE):
+        with self._lock:
+            monitor = self._monitors.get(site_id)
+            return monitor.summary() if monitor is not None else GridQualityMonitor(self.window).summary()
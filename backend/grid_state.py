@@ -0,0 +1,126 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from types import MappingProxyType
+
+from telemetry import DEFAULT_SITE
+
+# Grid values before any reading arrives for a site
+DEFAULT_GRID_STATE = {
+    "power": 0.0,          # Grid power in kW
+    "voltage": 220.0,      # Grid voltage in V
+    "current": 0.0,        # Grid current in A
+    "status": 0,           # 0 = offline/failed, 1 = online/active
+    "frequency": 50.0,     # Grid frequency in Hz
+    "last_updated": None,  # Timestamp of last update
+    "version": 0,          # Bumped on every applied update
+    "last_sequence": None  # Highest sequence number accepted from controllers
+}
+
+READING_FIELDS = {"power": float, "voltage": float, "current": float, "status": int, "frequency": float}
+
+# Idempotency keys remembered for duplicate detection, per site (oldest forgotten first)
+MAX_IDEMPOTENCY_KEYS = 10000
+
+APPLIED = "applied"
+STALE = "stale"
+DUPLICATE = "duplicate"
+
+
+def parse_reading(data):
+    """Convert the grid fields present in a request; raises ValueError before any state changes"""
+    return {field: cast(data[field]) for field, cast in READING_FIELDS.items() if field in data}
+
+
+class GridStateStore:
+    """
+    Versioned grid state per site
+
+    Every update builds a complete new snapshot and publishes it by
+    swapping a single reference, so readers get an immutable, consistent
+    mapping without taking a lock. Writers are serialized by a lock.
+    Readings carrying a `sequence` no newer than the last accepted one are
+    dropped, and a repeated `idempotency_key` for the same site returns the
+    original result.
+    """
+
+    def __init__(self, max_idempotency_keys=MAX_IDEMPOTENCY_KEYS):
+        self._lock = threading.Lock()
+        self._snapshots = {}
+        self._results = OrderedDict()
+        self.max_idempotency_keys = max_idempotency_keys
+
+    def snapshot(self, site_id=DEFAULT_SITE):
+        """Latest snapshot for a site (read-only mapping)"""
+        snapshot = self._snapshots.get(site_id)
+        return snapshot if snapshot is not None else MappingProxyType(DEFAULT_GRID_STATE)
+
+    def apply(self, reading, site_id=DEFAULT_SITE, sequence=None, idempotency_key=None):
+        """
+        Apply a reading of grid fields as one atomic update
+
+        Parameters:
+        - reading: Dictionary with any of power, voltage, current, status, frequency
+        - site_id: Site the reading belongs to
+        - sequence: Controller sequence number; late or out-of-order readings are dropped
+        - idempotency_key: Retries with the same key for the same site are not applied twice
+
+        Returns:
+        - (outcome, snapshot) where outcome is "applied", "stale" or "duplicate"
+        """
+        values = parse_reading(reading)
+        sequence = int(sequence) if sequence is not None else None
+
+        # Controllers at different sites may pick the same keys
+        result_key = (site_id, idempotency_key)
+        with self._lock:
+            if idempotency_key is not None and result_key in self._results:
+                self._results.move_to_end(result_key)
+                return DUPLICATE, self._results[result_key]
+
+            current = self.snapshot(site_id)
+            last_sequence = current["last_sequence"]
+            if sequence is not None and last_sequence is not None and sequence <= last_sequence:
+                return STALE, current
+
+            state = dict(current)
+            state.update(values)
+            # Calculate power if not provided but voltage and current are
+            if "power" not in values and "voltage" in values and "current" in values:
+                state["power"] = (state["voltage"] * state["current"]) / 1000.0
+            state["last_updated"] = datetime.now().isoformat()
+            state["version"] = current["version"] + 1
+            if sequence is not None:
+                state["last_sequence"] = sequence
+
+            snapshot = self._publish(site_id, state)
+            if idempotency_key is not None:
+                self._results[result_key] = snapshot
+                if len(self._results) > self.max_idempotency_keys:
+                    self._results.popitem(last=False)
+            return APPLIED, snapshot
+
+    def reset(self, site_id=DEFAULT_SITE):
+        """
+        Back to the default values; the version keeps counting so readers see the change
+
+        The site's remembered idempotency keys are forgotten too, so a retry
+        after the reset is applied instead of returning a pre-reset snapshot.
+        """
+        with self._lock:
+            for result_key in [key for key in self._results if key[0] == site_id]:
+                del self._results[result_key]
+            state = dict(DEFAULT_GRID_STATE)
+            state["version"] = self.snapshot(site_id)["version"] + 1
+            return self._publish(site_id, state)
+
+    def sites(self):
+        return list(self._snapshots)
+
+    def _publish(self, site_id, state):
+        snapshot = MappingProxyType(state)
+        # Copy-on-write: readers holding the old dict never see it change
+        snapshots = dict(self._snapshots)
+        snapshots[site_id] = snapshot
+        self._snapshots = snapshots
+        return snapshot
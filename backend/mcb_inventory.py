@@ -0,0 +1,188 @@
+import json
+import os
+import sqlite3
+
+import numpy as np
+
+from telemetry import DEFAULT_SITE
+
+# JSON file ({"sites": {site_id: [mcb, ...]}}) or SQLite database with an
+# `mcbs` table of the same fields plus site_id
+MCB_INVENTORY_PATH = os.environ.get(
+    "MCB_INVENTORY", os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcb_inventory.json"))
+MCB_FIELDS = ["id", "name", "power", "priority", "is_critical"]
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+
+
+class MCBInventory:
+    """
+    The MCB circuits of one site, held as parallel NumPy arrays
+
+    Rows are sorted by MCB number, so lookup by ID is a binary search.
+    A stable priority ordering and the critical / non-critical positions
+    are precomputed, and summaries are array reductions, so thousands of
+    circuits cost about as much as eight.
+    """
+
+    def __init__(self, mcbs):
+        mcbs = sorted(mcbs, key=lambda mcb: int(mcb["id"]))
+        missing = [field for field in MCB_FIELDS if mcbs and field not in mcbs[0]]
+        if missing:
+            raise ValueError(f"MCB entries need fields {', '.join(missing)}")
+        self.ids = np.array([int(mcb["id"]) for mcb in mcbs], dtype=np.int64)
+        if len(np.unique(self.ids)) != len(self.ids):
+            raise ValueError("Duplicate MCB IDs in inventory")
+        self.names = [str(mcb["name"]) for mcb in mcbs]
+        self.power = np.array([float(mcb["power"]) for mcb in mcbs], dtype=np.float64)
+        self.priority = np.array([int(mcb["priority"]) for mcb in mcbs], dtype=np.int64)
+        self.critical = np.array([bool(mcb["is_critical"]) for mcb in mcbs], dtype=bool)
+
+        # Most important first; ties keep MCB number order
+        self.priority_order = np.argsort(self.priority, kind="stable")
+        self._sorted_priority = self.priority[self.priority_order]
+        self.critical_index = np.flatnonzero(self.critical)
+        self.non_critical_index = np.flatnonzero(~self.critical)
+
+        self.total_power = float(self.power.sum())
+        self.critical_power = float(self.power[self.critical_index].sum())
+
+    def __len__(self):
+        return len(self.ids)
+
+    def mcb_keys(self, positions=None):
+        """"MCB_<id>" keys, as used in requests and allocation results"""
+        ids = self.ids if positions is None else self.ids[positions]
+        return [f"MCB_{mcb_id}" for mcb_id in ids.tolist()]
+
+    def positions(self, mcb_ids):
+        """Array positions of the given MCB numbers; raises KeyError for unknown ones"""
+        mcb_ids = np.asarray(mcb_ids, dtype=np.int64)
+        positions = np.searchsorted(self.ids, mcb_ids)
+        if len(self.ids):
+            found = (positions < len(self.ids)) & (self.ids[np.minimum(positions, len(self.ids) - 1)] == mcb_ids)
+        else:
+            found = np.zeros(len(mcb_ids), dtype=bool)
+        if not found.all():
+            raise KeyError(f"Unknown MCB IDs: {mcb_ids[~found].tolist()[:10]}")
+        return positions
+
+    def get(self, mcb_id):
+        """One MCB as a dictionary"""
+        position = int(self.positions([mcb_id])[0])
+        return {
+            "id": int(self.ids[position]),
+            "name": self.names[position],
+            "power": float(self.power[position]),
+            "priority": int(self.priority[position]),
+            "is_critical": bool(self.critical[position]),
+        }
+
+    def with_priority(self, low, high=None):
+        """MCB numbers with priority in [low, high] (just `low` when high is omitted), most important first"""
+        high = low if high is None else high
+        start = np.searchsorted(self._sorted_priority, low, side="left")
+        stop = np.searchsorted(self._sorted_priority, high, side="right")
+        return self.ids[self.priority_order[start:stop]]
+
+    def critical_ids(self):
+        return self.ids[self.critical_index]
+
+    def critical_flags(self, mcb_ids):
+        """is_critical for each MCB number; numbers the inventory doesn't list are non-critical"""
+        mcb_ids = np.asarray(mcb_ids, dtype=np.int64)
+        if not len(self.ids):
+            return np.zeros(len(mcb_ids), dtype=bool)
+        positions = np.minimum(np.searchsorted(self.ids, mcb_ids), len(self.ids) - 1)
+        return (self.ids[positions] == mcb_ids) & self.critical[positions]
+
+    def mcb_powers(self):
+        """{"MCB_<id>": kW} for simulate_grid_failure and the shedding planner"""
+        return dict(zip(self.mcb_keys(), self.power.tolist()))
+
+    def mcb_priorities(self):
+        return dict(zip(self.mcb_keys(), self.priority.tolist()))
+
+    def detailed_statuses(self, grid_online, available_power):
+        """
+        ON/OFF for every MCB under the /api/mcb/detailed rules
+
+        With power available, critical MCBs stay ON; the rest are ON when an
+        online grid covers the whole load or when the supply covers all
+        critical load plus that MCB.
+        """
+        if available_power <= 0.1:
+            return np.zeros(len(self), dtype=bool)
+        if grid_online and available_power >= self.total_power:
+            return np.ones(len(self), dtype=bool)
+        return self.critical | (available_power >= self.critical_power + self.power)
+
+    def relay_statuses(self, grid_online, power_available):
+        """ON/OFF for every MCB under the /api/mcb/status rules"""
+        if not power_available:
+            return np.zeros(len(self), dtype=bool)
+        if grid_online:
+            return np.ones(len(self), dtype=bool)
+        return self.critical.copy()
+
+    def summary(self, statuses=None):
+        """Counts and loads by array reductions; ON/OFF figures when statuses are given"""
+        summary = {
+            "total_mcbs": len(self),
+            "critical_mcbs": int(len(self.critical_index)),
+            "total_power_demand": self.total_power,
+            "critical_power_demand": self.critical_power,
+            "non_critical_power_demand": self.total_power - self.critical_power,
+        }
+        if statuses is not None:
+            on = int(np.count_nonzero(statuses))
+            summary.update({
+                "mcbs_on": on,
+                "mcbs_off": len(self) - on,
+                "active_power_load": float(self.power @ statuses),
+                "critical_mcbs_off": int(np.count_nonzero(~statuses[self.critical_index])),
+            })
+        return summary
+
+
+class InventoryStore:
+    """MCB inventories for every site, loaded from a JSON file or SQLite database"""
+
+    def __init__(self, path=MCB_INVENTORY_PATH):
+        self.path = path
+        self.sites = {}
+        self.reload()
+
+    def reload(self):
+        """Re-read the inventory source; the old inventories stay in use if it fails"""
+        if self.path.endswith(SQLITE_EXTENSIONS):
+            rows = load_sqlite(self.path)
+        else:
+            rows = load_json(self.path)
+        # Unlisted sites fall back to the default one, so it must exist
+        if DEFAULT_SITE not in rows:
+            raise ValueError(f"MCB inventory {self.path} has no \"{DEFAULT_SITE}\" site")
+        self.sites = {site_id: MCBInventory(mcbs) for site_id, mcbs in rows.items()}
+
+    def for_site(self, site_id=DEFAULT_SITE):
+        """The site's inventory, falling back to the default site's"""
+        inventory = self.sites.get(site_id)
+        if inventory is None:
+            inventory = self.sites[DEFAULT_SITE]
+        return inventory
+
+
+def load_json(path):
+    with open(path) as f:
+        return json.load(f)["sites"]
+
+
+def load_sqlite(path):
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        cursor = connection.execute(f"SELECT site_id, {', '.join(MCB_FIELDS)} FROM mcbs")
+        sites = {}
+        for site_id, *values in cursor:
+            sites.setdefault(site_id, []).append(dict(zip(MCB_FIELDS, values)))
+        return sites
+    finally:
+        connection.close()
@@ -0,0 +1,321 @@
+"""
+Model compaction: depth-limited, quantized and pruned random forests
+
+Flattens a fitted RandomForestRegressor/RandomForestClassifier into a few
+NumPy arrays (float32 thresholds, float16/int8 leaf values), drops
+redundant trees while the held-out score stays within a tolerance of the
+full forest, and reports artifact size, load time, memory, latency and
+accuracy for every setting.
+
+Usage (from the backend folder):
+    python model_compaction.py --tolerance 0.01 --save
+"""
+
+import argparse
+import json
+import pickle
+import time
+import tracemalloc
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.metrics import accuracy_score, r2_score
+from sklearn.model_selection import train_test_split
+
+LEAF_DTYPES = ["float32", "float16", "int8"]
+DEFAULT_DEPTHS = [None, 16, 10, 6]
+DEFAULT_TOLERANCE = 0.01
+
+# Rows per traversal batch; bounds the (rows, trees) index arrays
+PREDICT_BATCH_ROWS = 8192
+# Validation rows used when choosing which trees to keep, and the fewest
+# trees a pruned forest may keep
+MAX_SELECTION_ROWS = 20000
+MIN_TREES = 10
+
+
+def floor_to_float32(thresholds):
+    """
+    Largest float32 not above each float64 threshold
+
+    sklearn compares float32 inputs against float64 thresholds; rounding
+    down keeps `x <= threshold` decisions identical for every float32 x.
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    rounded = thresholds.astype(np.float32)
+    above = rounded.astype(np.float64) > thresholds
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+def quantize_leaves(values, leaf_dtype):
+    """Return (stored_values, scale, offset) with value = (stored + 127) * scale + offset for int8"""
+    if leaf_dtype == "int8":
+        low, high = float(values.min()), float(values.max())
+        scale = (high - low) / 254 or 1.0
+        stored = np.round((values - low) / scale) - 127
+        return stored.astype(np.int8), scale, low
+    return values.astype(leaf_dtype), 1.0, 0.0
+
+
+class CompactForest:
+    """Random forest flattened into arrays, with the predict API the backend uses"""
+
+    def __init__(self, arrays, kind, classes=None, feature_names=None, leaf_scale=1.0, leaf_offset=0.0):
+        self.features = arrays["features"]
+        self.thresholds = arrays["thresholds"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.values = arrays["values"]
+        self.roots = arrays["roots"]
+        self.depth = int(arrays["depth"])
+        self.kind = kind
+        self.classes_ = classes
+        self.feature_names_in_ = feature_names
+        self.n_features_in_ = len(feature_names) if feature_names is not None else None
+        self.leaf_scale = leaf_scale
+        self.leaf_offset = leaf_offset
+
+    @classmethod
+    def from_forest(cls, forest, leaf_dtype="float32", trees=None):
+        """Flatten the given trees (all by default) of a fitted sklearn forest"""
+        is_classifier = hasattr(forest, "classes_")
+        estimators = forest.estimators_ if trees is None else [forest.estimators_[i] for i in trees]
+        features, thresholds, left, right, values, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in estimators:
+            tree = estimator.tree_
+            is_leaf = tree.children_left < 0
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int16))
+            thresholds.append(floor_to_float32(tree.threshold))
+            left.append(np.where(is_leaf, -1, tree.children_left + offset).astype(np.int32))
+            right.append(np.where(is_leaf, -1, tree.children_right + offset).astype(np.int32))
+            if is_classifier:
+                counts = tree.value[:, 0, :]
+                values.append(counts / counts.sum(axis=1, keepdims=True))
+            else:
+                values.append(tree.value[:, 0, 0])
+            roots.append(offset)
+            offset += tree.node_count
+
+        stored, scale, low = quantize_leaves(np.concatenate(values), leaf_dtype)
+        arrays = {
+            "features": np.concatenate(features),
+            "thresholds": np.concatenate(thresholds),
+            "left": np.concatenate(left),
+            "right": np.concatenate(right),
+            "values": stored,
+            "roots": np.array(roots, dtype=np.int32),
+            "depth": max(estimator.tree_.max_depth for estimator in estimators),
+        }
+        feature_names = getattr(forest, "feature_names_in_", None)
+        return cls(arrays, "classifier" if is_classifier else "regressor",
+                   getattr(forest, "classes_", None), feature_names, scale, low)
+
+    def arrays(self):
+        return {
+            "features": self.features, "thresholds": self.thresholds, "left": self.left,
+            "right": self.right, "values": self.values, "roots": self.roots,
+            "depth": np.array(self.depth),
+        }
+
+    def _as_matrix(self, X):
+        if hasattr(X, "columns") and self.feature_names_in_ is not None:
+            X = X[list(self.feature_names_in_)]
+        return np.asarray(X, dtype=np.float32)
+
+    def leaf_values(self, X):
+        """Dequantized leaf value reached in every tree: (rows, trees[, classes])"""
+        X = self._as_matrix(X)
+        nodes = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        rows = np.arange(len(X))[:, None]
+        for _ in range(self.depth):
+            left = self.left[nodes]
+            internal = left >= 0
+            if not internal.any():
+                break
+            go_left = X[rows, self.features[nodes]] <= self.thresholds[nodes]
+            nodes = np.where(internal, np.where(go_left, left, self.right[nodes]), nodes)
+        values = self.values[nodes].astype(np.float32)
+        if self.values.dtype == np.int8:
+            values = (values + 127) * self.leaf_scale + self.leaf_offset
+        return values
+
+    def _mean_prediction(self, X):
+        X = self._as_matrix(X)
+        parts = [self.leaf_values(X[i:i + PREDICT_BATCH_ROWS]).mean(axis=1)
+                 for i in range(0, len(X), PREDICT_BATCH_ROWS)]
+        return np.concatenate(parts) if parts else np.empty(0)
+
+    def predict_proba(self, X):
+        return self._mean_prediction(X)
+
+    def predict(self, X):
+        mean = self._mean_prediction(X)
+        if self.kind == "classifier":
+            return self.classes_[np.argmax(mean, axis=1)]
+        return mean
+
+
+def score(kind, y_true, prediction):
+    """R^2 for regressors, accuracy for classifiers; higher is better for both"""
+    if kind == "classifier":
+        return accuracy_score(y_true, prediction)
+    return r2_score(y_true, prediction)
+
+
+def select_trees(compact, X_val, y_val, tolerance=DEFAULT_TOLERANCE, min_trees=MIN_TREES):
+    """
+    Smallest prefix of trees that scores within `tolerance` of the whole forest
+
+    Forest trees are exchangeable bootstrap fits, so trimming a prefix
+    rather than hand-picking trees avoids overfitting the selection rows.
+    Returns the kept tree indices.
+    """
+    X_val, y_val = X_val[:MAX_SELECTION_ROWS], np.asarray(y_val)[:MAX_SELECTION_ROWS]
+    per_tree = np.moveaxis(compact.leaf_values(X_val), 1, 0)  # (trees, rows[, classes])
+    counts = np.arange(1, len(per_tree) + 1).reshape((-1,) + (1,) * (per_tree.ndim - 1))
+    prefix_means = np.cumsum(per_tree, axis=0) / counts
+
+    def ensemble_score(mean):
+        if compact.kind == "classifier":
+            return score("classifier", y_val, compact.classes_[np.argmax(mean, axis=1)])
+        return score("regressor", y_val, mean)
+
+    target = ensemble_score(prefix_means[-1]) - tolerance
+    for n_trees in range(min(min_trees, len(per_tree)), len(per_tree) + 1):
+        if ensemble_score(prefix_means[n_trees - 1]) >= target:
+            return list(range(n_trees))
+    return list(range(len(per_tree)))
+
+
+def measure(model, X_val, y_val, kind, repeats=5):
+    """Artifact size, load time, load memory, latency and score of a picklable model"""
+    blob = pickle.dumps(model)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        pickle.loads(blob)
+    load_ms = (time.perf_counter() - start) / repeats * 1000
+
+    tracemalloc.start()
+    pickle.loads(blob)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    prediction = model.predict(X_val)
+    batch_us = (time.perf_counter() - start) / len(X_val) * 1e6
+
+    row = X_val.iloc[:1] if hasattr(X_val, "iloc") else X_val[:1]
+    start = time.perf_counter()
+    for _ in range(repeats):
+        model.predict(row)
+    single_us = (time.perf_counter() - start) / repeats * 1e6
+
+    return {
+        "size_bytes": len(blob),
+        "load_ms": round(load_ms, 3),
+        "memory_bytes": peak,
+        "batch_us_per_row": round(batch_us, 3),
+        "single_row_us": round(single_us, 1),
+        "score": round(float(score(kind, y_val, prediction)), 5),
+    }
+
+
+def compaction_report(estimator_class, X_train, y_train, X_val, y_val, depths=DEFAULT_DEPTHS,
+                      leaf_dtypes=LEAF_DTYPES, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compare the unbounded sklearn forest with every depth / leaf dtype setting
+
+    A quarter of the training rows is held back to choose which trees to
+    keep, so pruning is never judged on the rows used for the report.
+    Every forest, the baseline included, is fitted on the remaining rows.
+
+    Returns:
+    - (rows, compact_models) where rows are report dicts and compact_models
+      maps (max_depth, leaf_dtype) to the pruned CompactForest
+    """
+    kind = "classifier" if issubclass(estimator_class, RandomForestClassifier) else "regressor"
+    X_fit, X_select, y_fit, y_select = train_test_split(X_train, y_train, test_size=0.25, random_state=42)
+    rows, compact_models = [], {}
+    baseline_score = None
+    for depth in depths:
+        forest = estimator_class(random_state=42, max_depth=depth).fit(X_fit, y_fit)
+        if depth is None:
+            baseline = measure(forest, X_val, y_val, kind)
+            baseline_score = baseline["score"]
+            rows.append({"format": "sklearn", "max_depth": None, "leaf_dtype": "float64",
+                         "trees": len(forest.estimators_), **baseline})
+        for leaf_dtype in leaf_dtypes:
+            full = CompactForest.from_forest(forest, leaf_dtype)
+            trees = select_trees(full, full._as_matrix(X_select), y_select, tolerance)
+            compact = CompactForest.from_forest(forest, leaf_dtype, trees)
+            compact_models[(depth, leaf_dtype)] = compact
+            rows.append({"format": "compact", "max_depth": depth, "leaf_dtype": leaf_dtype,
+                         "trees": len(trees), **measure(compact, X_val, y_val, kind)})
+
+    for row in rows:
+        row["score_delta"] = round(row["score"] - baseline_score, 5)
+        row["within_tolerance"] = row["score_delta"] >= -tolerance
+    return rows, compact_models
+
+
+def smallest_within_tolerance(rows, compact_models):
+    candidates = [row for row in rows if row["format"] == "compact" and row["within_tolerance"]]
+    if not candidates:
+        return None, None
+    best = min(candidates, key=lambda row: row["size_bytes"])
+    return best, compact_models[(best["max_depth"], best["leaf_dtype"])]
+
+
+def print_report(name, rows):
+    print(f"\n{name}")
+    print(f"{'format':<9}{'depth':>6}{'leaves':>9}{'trees':>6}{'size KB':>10}{'load ms':>9}"
+          f"{'mem KB':>9}{'us/row':>9}{'1-row us':>10}{'score':>9}{'delta':>9}")
+    for row in rows:
+        print(f"{row['format']:<9}{str(row['max_depth']):>6}{row['leaf_dtype']:>9}{row['trees']:>6}"
+              f"{row['size_bytes'] / 1024:>10.1f}{row['load_ms']:>9.2f}{row['memory_bytes'] / 1024:>9.1f}"
+              f"{row['batch_us_per_row']:>9.2f}{row['single_row_us']:>10.1f}{row['score']:>9.4f}"
+              f"{row['score_delta']:>9.4f}")
+
+
+def main():
+    from train_and_save_models import load_training_data
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--report", default="compaction_report.json")
+    parser.add_argument("--save", action="store_true",
+                        help="write the smallest in-tolerance models to *_compact.pkl")
+    args = parser.parse_args()
+
+    _, X, y_priority, y_source = load_training_data()
+    X_train, X_val, y_priority_train, y_priority_val, y_source_train, y_source_val = train_test_split(
+        X, y_priority, y_source, test_size=0.2, random_state=42
+    )
+
+    report = {}
+    for name, estimator_class, y_train, y_val in [
+        ("priority_reg", RandomForestRegressor, y_priority_train, y_priority_val),
+        ("source_clf", RandomForestClassifier, y_source_train, y_source_val),
+    ]:
+        rows, compact_models = compaction_report(estimator_class, X_train, y_train, X_val, y_val,
+                                                 tolerance=args.tolerance)
+        print_report(name, rows)
+        report[name] = rows
+        best, model = smallest_within_tolerance(rows, compact_models)
+        if args.save and model is not None:
+            with open(f"{name}_compact.pkl", "wb") as f:
+                pickle.dump(model, f)
+            print(f"Saved {name}_compact.pkl (max_depth={best['max_depth']}, leaves={best['leaf_dtype']}, "
+                  f"trees={best['trees']})")
+
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=4)
+
+
+if __name__ == "__main__":
+    # Run through the importable module so saved pickles reference
+    # model_compaction.CompactForest rather than __main__.CompactForest
+    import model_compaction
+    model_compaction.main()
@@ -0,0 +1,168 @@
+"""
+Shared, read-only hosting of the forest models across worker processes
+
+With MODEL_HOSTING=shared each model pickle is flattened once into .npy
+files under MODEL_CACHE_DIR and every process memory-maps them, so the
+tree arrays exist once in RAM however many workers attach. Publishing
+ahead of time (e.g. before starting gunicorn) means no worker has to
+unpickle a forest at all.
+
+Usage (from the backend folder):
+    python model_hosting.py priority_reg.pkl source_clf.pkl
+    MODEL_HOSTING=shared gunicorn -w 8 app:app
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+
+import numpy as np
+
+from model_compaction import CompactForest
+
+try:
+    import fcntl
+except ImportError:  # Windows: publishing falls back to atomic renames only
+    fcntl = None
+
+# "pickle" gives every process its own unpickled copy of each forest,
+# "shared" maps one flattened copy from MODEL_CACHE_DIR (tmpfs by default)
+MODEL_HOSTING = os.environ.get("MODEL_HOSTING", "pickle")
+DEFAULT_CACHE_DIR = os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+                                 "grid_ems_models")
+MODEL_CACHE_DIR = os.environ.get("MODEL_CACHE_DIR", DEFAULT_CACHE_DIR)
+
+ARRAY_NAMES = ["features", "thresholds", "left", "right", "values", "roots"]
+META_FILE = "meta.json"
+
+
+def source_stamp(model_path):
+    """Identifies one version of a model pickle; a retrained file gets a new stamp"""
+    stat = os.stat(model_path)
+    return {"path": os.path.abspath(model_path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def cache_path(model_path, cache_dir=MODEL_CACHE_DIR):
+    """Cache folder for a model, unique per absolute pickle path"""
+    path = os.path.abspath(model_path)
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f"{name}-{hashlib.sha1(path.encode()).hexdigest()[:10]}")
+
+
+def _read_meta(target):
+    try:
+        with open(os.path.join(target, META_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_arrays(compact, target, stamp):
+    os.makedirs(target)
+    arrays = compact.arrays()
+    for name in ARRAY_NAMES:
+        np.save(os.path.join(target, f"{name}.npy"), arrays[name])
+    meta = {
+        "source": stamp,
+        "kind": compact.kind,
+        "depth": compact.depth,
+        "classes": compact.classes_.tolist() if compact.classes_ is not None else None,
+        "feature_names": list(compact.feature_names_in_) if compact.feature_names_in_ is not None else None,
+        "leaf_scale": compact.leaf_scale,
+        "leaf_offset": compact.leaf_offset,
+    }
+    # meta.json is written last and marks the folder as complete
+    with open(os.path.join(target, META_FILE), "w") as f:
+        json.dump(meta, f)
+
+
+def publish_model(model_path, cache_dir=MODEL_CACHE_DIR):
+    """
+    Flatten a model pickle into the shared cache unless an up-to-date copy exists
+
+    Safe to call from every worker at once: an exclusive lock makes one of
+    them do the work and the rest reuse its output. A new folder is swapped
+    in with renames, so processes still mapping an old version keep reading
+    consistent (unlinked) files.
+
+    Returns:
+    - Path of the cache folder
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    target = cache_path(model_path, cache_dir)
+    stamp = source_stamp(model_path)
+
+    with open(target + ".lock", "w") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        meta = _read_meta(target)
+        if meta is not None and meta["source"] == stamp:
+            return target
+
+        with open(model_path, "rb") as f:
+            model = pickle.load(f)
+        # Pickles written by `model_compaction.py --save` are already flat
+        compact = model if isinstance(model, CompactForest) else CompactForest.from_forest(model)
+
+        staging = tempfile.mkdtemp(prefix=os.path.basename(target) + ".", dir=cache_dir)
+        os.rmdir(staging)
+        _write_arrays(compact, staging, stamp)
+        if os.path.exists(target):
+            retired = staging + ".old"
+            os.rename(target, retired)
+            os.rename(staging, target)
+            shutil.rmtree(retired, ignore_errors=True)
+        else:
+            os.rename(staging, target)
+    return target
+
+
+def attach_model(target):
+    """CompactForest whose arrays are read-only memory maps of a cache folder"""
+    meta = _read_meta(target)
+    if meta is None:
+        raise FileNotFoundError(f"No published model in {target}")
+    arrays = {name: np.load(os.path.join(target, f"{name}.npy"), mmap_mode="r") for name in ARRAY_NAMES}
+    arrays["depth"] = meta["depth"]
+    classes = np.array(meta["classes"]) if meta["classes"] is not None else None
+    feature_names = np.array(meta["feature_names"], dtype=object) if meta["feature_names"] is not None else None
+    return CompactForest(arrays, meta["kind"], classes, feature_names, meta["leaf_scale"], meta["leaf_offset"])
+
+
+def load_model(model_path, hosting=None, cache_dir=None):
+    """
+    Load a model pickle the way MODEL_HOSTING asks for
+
+    Parameters:
+    - model_path: Pickled sklearn forest (or CompactForest)
+    - hosting: "pickle" or "shared"; defaults to MODEL_HOSTING
+    - cache_dir: Shared cache folder; defaults to MODEL_CACHE_DIR
+
+    Returns:
+    - Model with the sklearn predict API
+    """
+    hosting = hosting or MODEL_HOSTING
+    if hosting == "shared":
+        return attach_model(publish_model(model_path, cache_dir or MODEL_CACHE_DIR))
+    if hosting != "pickle":
+        raise ValueError(f"Unknown MODEL_HOSTING {hosting!r}, expected 'pickle' or 'shared'")
+    with open(model_path, "rb") as f:
+        return pickle.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("models", nargs="+", help="model pickles to publish")
+    parser.add_argument("--cache-dir", default=MODEL_CACHE_DIR)
+    args = parser.parse_args()
+
+    for model_path in args.models:
+        print(f"{model_path} -> {publish_model(model_path, args.cache_dir)}")
+
+
+if __name__ == "__main__":
+    main()
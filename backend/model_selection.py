@@ -0,0 +1,289 @@
+"""
+Hyperparameter search for the priority and source models
+
+Runs a parallel successive-halving (or plain randomized) search over
+random-forest parameters, and over xgboost when it is installed, with
+time-ordered cross-validation. The best candidates are refit and scored
+on the most recent rows together with their single-row latency and
+memory. The accurate-enough candidate that is cheapest to serve is refit
+on all rows and saved as a versioned artifact with a metrics manifest;
+the holdout score in the manifest is the pre-refit one:
+
+    models/<name>/v<N>/model.pkl
+    models/<name>/v<N>/manifest.json
+
+Usage (from the backend folder):
+    python model_selection.py --candidates 40 --xgboost
+    python model_selection.py --target source_clf --strategy random --promote
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import shutil
+from datetime import datetime
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import HalvingRandomSearchCV, RandomizedSearchCV, TimeSeriesSplit
+from sklearn.preprocessing import LabelEncoder
+
+from model_compaction import measure
+
+try:
+    from xgboost import XGBClassifier, XGBRegressor
+except ImportError:
+    XGBClassifier = XGBRegressor = None
+
+MODEL_REGISTRY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+
+DEFAULT_CANDIDATES = 30
+DEFAULT_SPLITS = 5
+DEFAULT_TOP_K = 5
+# Holdout score a candidate may give up against the most accurate one
+DEFAULT_TOLERANCE = 0.01
+# Most recent share of rows kept out of the search for the final comparison
+HOLDOUT_FRACTION = 0.2
+
+FOREST_SPACE = {
+    "n_estimators": [50, 100, 200, 400],
+    "max_depth": [None, 6, 10, 16, 24],
+    "min_samples_leaf": [1, 2, 4, 8],
+    "max_features": ["sqrt", 0.5, 1.0],
+    "bootstrap": [True, False],
+}
+XGBOOST_SPACE = {
+    "n_estimators": [50, 100, 200, 400],
+    "max_depth": [3, 4, 6, 8],
+    "learning_rate": [0.03, 0.1, 0.3],
+    "subsample": [0.7, 0.85, 1.0],
+    "colsample_bytree": [0.6, 0.8, 1.0],
+}
+
+# name -> (kind, target column returned by load_training_data, forest class, xgboost class)
+TARGETS = {
+    "priority_reg": ("regressor", "y_priority", RandomForestRegressor, XGBRegressor),
+    "source_clf": ("classifier", "y_source", RandomForestClassifier, XGBClassifier),
+}
+
+
+class DecodedClassifier:
+    """Classifier trained on encoded labels that predicts the original ones (xgboost needs 0..n-1)"""
+
+    def __init__(self, model, classes):
+        self.model = model
+        self.classes_ = np.asarray(classes)
+        self.feature_names_in_ = getattr(model, "feature_names_in_", None)
+
+    def predict(self, X):
+        return self.classes_[np.asarray(self.model.predict(X), dtype=int)]
+
+    def predict_proba(self, X):
+        return self.model.predict_proba(X)
+
+
+def time_ordered(df, X, y):
+    """Sort rows by Timestamp so every split trains on the past and validates on the future"""
+    if "Timestamp" not in df.columns:
+        return X, y
+    order = np.argsort(df["Timestamp"].to_numpy(), kind="stable")
+    return X.iloc[order], y.iloc[order]
+
+
+def search_family(estimator, space, X, y, kind, strategy, candidates, splits, seed):
+    """
+    Run one search and return its candidates as (params, cv_mean, cv_std), best first
+    """
+    cv = TimeSeriesSplit(n_splits=splits)
+    scoring = "accuracy" if kind == "classifier" else "r2"
+    if strategy == "halving":
+        search = HalvingRandomSearchCV(estimator, space, n_candidates=candidates, cv=cv, scoring=scoring,
+                                       random_state=seed, n_jobs=-1)
+    else:
+        search = RandomizedSearchCV(estimator, space, n_iter=candidates, cv=cv, scoring=scoring,
+                                    random_state=seed, n_jobs=-1)
+    search.fit(X, y)
+
+    results = search.cv_results_
+    # Successive halving scores early rounds on fewer rows; only compare the last round
+    if "iter" in results:
+        final_round = np.flatnonzero(results["iter"] == results["iter"].max())
+    else:
+        final_round = range(len(results["params"]))
+    ranked = []
+    for i in final_round:
+        if np.isfinite(results["mean_test_score"][i]):
+            ranked.append((results["params"][i], float(results["mean_test_score"][i]),
+                           float(results["std_test_score"][i])))
+    ranked.sort(key=lambda candidate: candidate[1], reverse=True)
+    return ranked
+
+
+def choose(candidates, tolerance):
+    """
+    Cheapest candidate to serve among those within `tolerance` of the best holdout score
+
+    Cost is the geometric mean of single-row latency and load memory, each
+    relative to the smallest value among the accurate-enough candidates.
+    """
+    best_score = max(c["metrics"]["score"] for c in candidates)
+    eligible = [c for c in candidates if c["metrics"]["score"] >= best_score - tolerance]
+    min_latency = min(c["metrics"]["single_row_us"] for c in eligible)
+    min_memory = min(c["metrics"]["memory_bytes"] for c in eligible)
+    for c in candidates:
+        c["eligible"] = c in eligible
+        c["serving_cost"] = round(float(np.sqrt(c["metrics"]["single_row_us"] / min_latency
+                                               * c["metrics"]["memory_bytes"] / min_memory)), 4)
+    return min(eligible, key=lambda c: (c["serving_cost"], -c["metrics"]["score"]))
+
+
+def fit_candidate(estimator, params, encoder, X, y):
+    """Fit a fresh copy of `estimator` with `params`, decoding labels if they were encoded"""
+    model = estimator.__class__(**{**estimator.get_params(), **params})
+    if encoder is None:
+        return model.fit(X, y)
+    return DecodedClassifier(model.fit(X, encoder.transform(y)), encoder.classes_)
+
+
+def select_model(name, df, X, y, strategy="halving", candidates=DEFAULT_CANDIDATES, splits=DEFAULT_SPLITS,
+                 top_k=DEFAULT_TOP_K, tolerance=DEFAULT_TOLERANCE, use_xgboost=False, seed=42):
+    """
+    Search, refit the top candidates and pick the winner for one target
+
+    Candidates are compared after fitting on the searched rows; the winner
+    is then refit on all rows, holdout included, before it is returned.
+    The refit model's size, load memory and latency are measured again and
+    stored as winner["refit_metrics"]; its holdout score is left out, since
+    it has now seen the holdout.
+
+    Returns:
+    - (model, winner, candidates, holdout_rows) where candidates are report dicts
+    """
+    kind, _, forest_class, xgboost_class = TARGETS[name]
+    X, y = time_ordered(df, X, y)
+    split = int(len(X) * (1 - HOLDOUT_FRACTION))
+    X_search, X_holdout, y_search, y_holdout = X.iloc[:split], X.iloc[split:], y.iloc[:split], y.iloc[split:]
+
+    families = [("random_forest", forest_class(random_state=seed), FOREST_SPACE, None)]
+    if use_xgboost:
+        if xgboost_class is None:
+            print("xgboost is not installed; searching random forests only")
+        else:
+            encoder = LabelEncoder().fit(y) if kind == "classifier" else None
+            families.append(("xgboost", xgboost_class(random_state=seed, n_jobs=1), XGBOOST_SPACE, encoder))
+
+    reports = []
+    fitters = []
+    for family, estimator, space, encoder in families:
+        y_fit = encoder.transform(y_search) if encoder is not None else y_search
+        ranked = search_family(estimator, space, X_search, y_fit, kind, strategy, candidates, splits, seed)
+        for params, cv_mean, cv_std in ranked[:top_k]:
+            model = fit_candidate(estimator, params, encoder, X_search, y_search)
+            reports.append({
+                "family": family,
+                "estimator": type(estimator).__name__,
+                "params": params,
+                "cv_score": round(cv_mean, 5),
+                "cv_std": round(cv_std, 5),
+                "metrics": measure(model, X_holdout, y_holdout, kind),
+            })
+            fitters.append((estimator, params, encoder))
+
+    winner = choose(reports, tolerance)
+    model = fit_candidate(*fitters[reports.index(winner)], X, y)
+    refit_metrics = measure(model, X_holdout, y_holdout, kind)
+    del refit_metrics["score"]
+    winner["refit_metrics"] = refit_metrics
+    return model, winner, reports, len(X_holdout)
+
+
+def next_version(name, registry=MODEL_REGISTRY_DIR):
+    folder = os.path.join(registry, name)
+    versions = [int(entry[1:]) for entry in os.listdir(folder)
+                if entry.startswith("v") and entry[1:].isdigit()] if os.path.isdir(folder) else []
+    return max(versions, default=0) + 1
+
+
+def save_artifact(name, model, manifest, registry=MODEL_REGISTRY_DIR):
+    """Write models/<name>/v<N>/model.pkl and manifest.json; returns the folder"""
+    version = next_version(name, registry)
+    folder = os.path.join(registry, name, f"v{version}")
+    os.makedirs(folder)
+    blob = pickle.dumps(model)
+    with open(os.path.join(folder, "model.pkl"), "wb") as f:
+        f.write(blob)
+    manifest = {"name": name, "version": version, "sha256": hashlib.sha256(blob).hexdigest(), **manifest}
+    with open(os.path.join(folder, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=4, default=str)
+    return folder
+
+
+def print_candidates(name, candidates):
+    print(f"\n{name}")
+    print(f"{'family':<15}{'cv':>9}{'holdout':>9}{'1-row us':>10}{'mem KB':>9}{'size KB':>9}{'cost':>7}  params")
+    for c in candidates:
+        marker = "*" if c.get("winner") else " " if c["eligible"] else "-"
+        print(f"{c['family']:<15}{c['cv_score']:>9.4f}{c['metrics']['score']:>9.4f}"
+              f"{c['metrics']['single_row_us']:>10.1f}{c['metrics']['memory_bytes'] / 1024:>9.1f}"
+              f"{c['metrics']['size_bytes'] / 1024:>9.1f}{c['serving_cost']:>7.2f} {marker} {c['params']}")
+
+
+def main():
+    from train_and_save_models import load_training_data
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", action="append", choices=list(TARGETS), help="default: all targets")
+    parser.add_argument("--strategy", choices=["halving", "random"], default="halving")
+    parser.add_argument("--candidates", type=int, default=DEFAULT_CANDIDATES)
+    parser.add_argument("--splits", type=int, default=DEFAULT_SPLITS)
+    parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--xgboost", action="store_true", help="also search xgboost models")
+    parser.add_argument("--dataset", default="../dataset/energy_dataset.csv")
+    parser.add_argument("--registry", default=MODEL_REGISTRY_DIR)
+    parser.add_argument("--promote", action="store_true",
+                        help="also copy each winner to <name>.pkl, the file app.py loads")
+    args = parser.parse_args()
+
+    df, X, y_priority, y_source = load_training_data(args.dataset)
+    targets = {"y_priority": y_priority, "y_source": y_source}
+
+    for name in args.target or list(TARGETS):
+        kind, target, _, _ = TARGETS[name]
+        model, winner, candidates, holdout_rows = select_model(
+            name, df, X, targets[target], args.strategy, args.candidates, args.splits, args.top_k,
+            args.tolerance, args.xgboost)
+        winner["winner"] = True
+        print_candidates(name, candidates)
+
+        folder = save_artifact(name, model, {
+            "created": datetime.now().isoformat(),
+            "kind": kind,
+            "estimator": winner["estimator"],
+            "params": winner["params"],
+            "features": list(X.columns),
+            # Size, memory and latency of the saved (refit) model
+            "metrics": {"cv_score": winner["cv_score"], "cv_std": winner["cv_std"], **winner["refit_metrics"]},
+            # The same candidate fitted on the searched rows only, before the refit
+            "pre_refit_holdout_metrics": winner["metrics"],
+            "selection": {
+                "strategy": args.strategy, "candidates": args.candidates, "cv": f"TimeSeriesSplit({args.splits})",
+                "top_k": args.top_k, "tolerance": args.tolerance, "holdout_rows": holdout_rows,
+                "dataset": os.path.abspath(args.dataset), "dataset_rows": len(X),
+            },
+            "candidates": candidates,
+        }, args.registry)
+        print(f"Saved {folder}")
+        if args.promote:
+            shutil.copyfile(os.path.join(folder, "model.pkl"), f"{name}.pkl")
+            print(f"Promoted to {name}.pkl")
+
+
+if __name__ == "__main__":
+    # Run through the importable module so saved pickles reference
+    # model_selection.DecodedClassifier rather than __main__.DecodedClassifier
+    import model_selection
+    model_selection.main()
@@ -1,6 +1,9 @@
 import json
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 class PriorityManager:
     def __init__(self):
         self.default_config_path = "default_priorities.json"
@@ -36,7 +39,7 @@ class PriorityManager:
             self.current_priorities = self.user_priorities
             
         except Exception as e:
-            print(f"Error loading priorities: {e}")
+            logger.error(f"Error loading priorities: {e}")
             # Set default values in case of error
             self.ai_metadata = {"source": "AI Analysis", "description": "Default priorities", "version": "1.0"}
             self.default_priorities = {
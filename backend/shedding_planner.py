@@ -0,0 +1,201 @@
+import logging
+import os
+import sys
+import threading
+
+import numpy as np
+
+# grid_failure_handler lives in the project root, next to the backend folder
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from grid_failure_handler import mcb_priority_order, allocate_mcb_power
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on distinct allocations stored per site; sites with more fall
+# back to the plain greedy allocation
+MAX_PLAN_LEVELS = 2048
+
+# A plan serves readings whose MCB loads are each within this many kW of the
+# loads it was built for; larger drift rebuilds it
+PLAN_LOAD_TOLERANCE = 0.2
+
+
+def loads_match(planned_powers, planned_priorities, mcb_powers, mcb_priorities, tolerance=PLAN_LOAD_TOLERANCE):
+    """Same MCBs and priorities, and every load within `tolerance` kW of the planned one"""
+    if planned_priorities != (mcb_priorities or None) or planned_powers.keys() != mcb_powers.keys():
+        return False
+    return all(abs(mcb_powers[mcb_id] - power) <= tolerance for mcb_id, power in planned_powers.items())
+
+
+def greedy_segments(powers, max_segments=MAX_PLAN_LEVELS):
+    """
+    Split the supply axis into the intervals where the greedy result is constant
+
+    Parameters:
+    - powers: MCB loads in priority order
+
+    Returns:
+    - (starts, served, statuses) sorted by interval start, where an interval
+      runs up to the next start, served is the load kept ON and statuses is a
+      boolean (intervals, mcbs) array; None if there are more than
+      `max_segments` intervals
+    """
+    powers = np.asarray(powers, dtype=float)
+    starts = np.array([-np.inf])
+    ends = np.array([np.inf])
+    served = np.zeros(1)
+    statuses = np.zeros((1, len(powers)), dtype=bool)
+
+    # MCB k stays ON exactly when supply >= (load already ON) + its own load,
+    # so each interval either keeps it, sheds it, or splits at that threshold
+    for k, power in enumerate(powers):
+        threshold = served + power
+        kept = threshold <= starts
+        split = np.flatnonzero(~kept & (threshold < ends))
+        if len(starts) + len(split) > max_segments:
+            return None
+
+        if len(split):
+            upper_starts = threshold[split]
+            upper_ends = ends[split]
+            upper_statuses = statuses[split]
+            upper_statuses[:, k] = True
+            ends[split] = upper_starts
+
+        statuses[kept, k] = True
+        served[kept] += power
+
+        if len(split):
+            starts = np.concatenate([starts, upper_starts])
+            ends = np.concatenate([ends, upper_ends])
+            served = np.concatenate([served, upper_starts])
+            statuses = np.concatenate([statuses, upper_statuses])
+
+    order = np.argsort(starts, kind="stable")
+    return starts[order], served[order], statuses[order]
+
+
+class SheddingPlan:
+    """
+    The greedy allocation of one site's MCB loads, precomputed for every supply
+
+    Instead of sampling the supply at fixed steps, the plan stores the supply
+    breakpoints where `allocate_mcb_power` changes its answer, so a lookup is
+    a binary search that returns exactly what the greedy pass would.
+
+    Lookups may pass the live loads, which can drift from the planned ones.
+    Each greedy decision compares the supply with a sum of loads, so a drift
+    of D kW in total moves every breakpoint by at most D: a supply farther
+    than D from both ends of its interval gets the same statuses. A supply
+    closer than that (or within float rounding), or a site with too many
+    distinct allocations, is handed to `allocate_mcb_power` itself.
+    """
+
+    def __init__(self, mcb_powers, mcb_priorities=None, max_levels=MAX_PLAN_LEVELS):
+        self.mcb_powers = dict(mcb_powers)
+        self.mcb_priorities = dict(mcb_priorities) if mcb_priorities else None
+
+        self.order = mcb_priority_order(self.mcb_powers, self.mcb_priorities)
+        powers = self.powers = np.array([self.mcb_powers[mcb_id] for mcb_id in self.order], dtype=float)
+        segments = greedy_segments(powers, max_levels)
+        if segments is None:
+            self.starts = None
+            logger.info(f"Shedding plan for {len(powers)} MCBs exceeds {max_levels} levels; using direct allocation")
+        else:
+            self.starts, self.served_power, self.statuses = segments
+        # The greedy pass subtracts loads one at a time, so its threshold can
+        # sit a few ulps away from the summed breakpoint
+        self.tolerance = 4 * (len(powers) + 1) * np.finfo(float).eps * max(1.0, float(np.abs(powers).sum()))
+        # Status dicts are built on first use and shared by later lookups
+        self._tables = {}
+
+    def matches(self, mcb_powers, mcb_priorities=None, tolerance=PLAN_LOAD_TOLERANCE):
+        """Whether this plan covers these loads (within `tolerance` kW each) and priorities"""
+        return loads_match(self.mcb_powers, self.mcb_priorities, mcb_powers, mcb_priorities, tolerance)
+
+    def lookup(self, available_power, mcb_powers=None):
+        """
+        Return (mcb_statuses, remaining_power) for the given supply in kW, as allocate_mcb_power would
+
+        `mcb_powers` are the live loads, with the plan's MCBs; the planned
+        loads are used when omitted.
+        """
+        if mcb_powers is None:
+            mcb_powers, powers, drift = self.mcb_powers, self.powers, 0.0
+        else:
+            powers = np.array([mcb_powers[mcb_id] for mcb_id in self.order], dtype=float)
+            drift = float(np.abs(powers - self.powers).sum())
+        if self.starts is None or not np.isfinite(available_power):
+            return allocate_mcb_power(mcb_powers, available_power, self.mcb_priorities)
+        level = int(np.searchsorted(self.starts, available_power, side="right")) - 1
+        next_start = self.starts[level + 1] if level + 1 < len(self.starts) else np.inf
+        margin = self.tolerance + drift
+        if available_power - self.starts[level] <= margin or next_start - available_power <= margin:
+            return allocate_mcb_power(mcb_powers, available_power, self.mcb_priorities)
+
+        table = self._tables.get(level)
+        if table is None:
+            table = self._tables[level] = dict(zip(self.order, self.statuses[level].astype(int).tolist()))
+        served = self.served_power[level] if not drift else float(powers[self.statuses[level]].sum())
+        return dict(table), available_power - served
+
+
+class SheddingPlanner:
+    """
+    Keeps per-site shedding plans up to date on a background thread
+
+    Plans start from each site's configured MCB loads and priorities and
+    follow the loads observed while the grid is up. Loads that drift past
+    `load_tolerance` only mark the site dirty; the worker rebuilds its plan
+    (once for any number of updates in between) and swaps it in, so readers
+    never wait on a computation.
+    """
+
+    def __init__(self, max_levels=MAX_PLAN_LEVELS, load_tolerance=PLAN_LOAD_TOLERANCE):
+        self.max_levels = max_levels
+        self.load_tolerance = load_tolerance
+        self.plans = {}
+        self.inputs = {}
+        self.dirty = set()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="shedding-planner", daemon=True)
+            self.thread.start()
+
+    def update_loads(self, site_id, mcb_powers, mcb_priorities=None):
+        """Record a site's latest MCB loads and priorities; the plan is rebuilt only if they moved past the tolerance"""
+        with self.lock:
+            current = self.inputs.get(site_id)
+            if current is not None and loads_match(*current, mcb_powers, mcb_priorities, self.load_tolerance):
+                return
+            self.inputs[site_id] = (dict(mcb_powers), dict(mcb_priorities) if mcb_priorities else None)
+            self.dirty.add(site_id)
+        self.wakeup.set()
+
+    def get_plan(self, site_id, mcb_powers, mcb_priorities=None):
+        """Return the site's plan if it covers these loads, otherwise None"""
+        plan = self.plans.get(site_id)
+        if plan is not None and plan.matches(mcb_powers, mcb_priorities, self.load_tolerance):
+            return plan
+        return None
+
+    def rebuild_pending(self):
+        """Rebuild plans for all dirty sites; runs on the worker or inline when not started"""
+        with self.lock:
+            pending = {site_id: self.inputs[site_id] for site_id in self.dirty}
+            self.dirty.clear()
+        for site_id, (mcb_powers, mcb_priorities) in pending.items():
+            try:
+                self.plans[site_id] = SheddingPlan(mcb_powers, mcb_priorities, self.max_levels)
+            except Exception as e:
+                logger.error(f"Error building shedding plan for site {site_id}: {e}")
+
+    def _run(self):
+        while True:
+            self.wakeup.wait()
+            self.wakeup.clear()
+            self.rebuild_pending()
@@ -0,0 +1,10 @@
+# Shared by every module that handles telemetry. Kept free of imports so the
+# lightweight modules (grid state, quality monitor, inventory) can use these
+# without pulling in pandas or sklearn through the forecaster.
+
+# Telemetry rows and requests carry an optional site identifier
+SITE_FIELD = "Site_ID"
+DEFAULT_SITE = "default"
+
+# Telemetry arrives in 15-minute intervals
+INTERVAL_MINUTES = 15
@@ -4,6 +4,8 @@ import numpy as np
 import json
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
+from forecasting import train_forecaster
+from feature_pipeline import FeaturePipeline, MODEL_FEATURES
 
 # Default MCB priorities configuration - AI-determined based on critical analysis
 default_mcb_priorities = {
@@ -51,21 +53,6 @@ default_mcb_priorities = {
     }
 }
 
-# Save default priorities configuration
-with open("default_priorities.json", "w") as f:
-    json.dump(default_mcb_priorities, f, indent=4)
-
-# Load the dataset from the dataset folder
-df = pd.read_csv("../dataset/energy_dataset.csv")
-features = [
-    "Solar_Power(kW)", "Wind_Power(kW)", "DG_Power(kW)", "UPS_Power(kW)",
-    "Battery_Percentage(%)", "Total_Load_Demand(kW)", "Critical_Load(kW)", "Non_Critical_Load(kW)"
-]
-X = df[features]
-
-# Calculate base priority based on critical load ratio
-df["Base_Priority"] = (df["Critical_Load(kW)"] / df["Total_Load_Demand(kW)"]).round(2)
-
 # Enhance priority calculation with MCB weighting
 def calculate_mcb_priority(row):
     critical_weight = 0.7  # Give 70% weight to critical loads
@@ -77,28 +64,50 @@ def calculate_mcb_priority(row):
     else:
         return base_priority * critical_weight
 
-df["Priority"] = df.apply(calculate_mcb_priority, axis=1)
-y_priority = df["Priority"]
-source_cols = ["Solar_Power(kW)", "Wind_Power(kW)", "DG_Power(kW)", "UPS_Power(kW)"]
-df["Optimal_Source"] = df[source_cols].idxmax(axis=1)
-y_source = df["Optimal_Source"]
-X_train, X_test, y_priority_train, y_priority_test, y_source_train, y_source_test = train_test_split(
-    X, y_priority, y_source, test_size=0.2, random_state=42
-)
-priority_reg = RandomForestRegressor(random_state=42)
-priority_reg.fit(X_train, y_priority_train)
-source_clf = RandomForestClassifier(random_state=42)
-source_clf.fit(X_train, y_source_train)
-# Flatten the priorities for saving with models
-flattened_priorities = {
-    "critical": {k: v["priority"] for k, v in default_mcb_priorities["critical"].items()},
-    "non_critical": {k: v["priority"] for k, v in default_mcb_priorities["non_critical"].items()}
-}
+def load_training_data(path="../dataset/energy_dataset.csv"):
+    """Load the dataset and return (df, X, y_priority, y_source) in time order"""
+    df = pd.read_csv(path)
+    
+    # Derived loads and rolling aggregates come from the same pipeline the API
+    # uses at serving time, so training and inference see identical features
+    df = FeaturePipeline.transform_frame(df)
+    X = df[MODEL_FEATURES]
+    
+    # Calculate base priority based on critical load ratio
+    df["Base_Priority"] = (df["Critical_Load(kW)"] / df["Total_Load_Demand(kW)"]).round(2)
+    df["Priority"] = df.apply(calculate_mcb_priority, axis=1)
+    y_priority = df["Priority"]
+    source_cols = ["Solar_Power(kW)", "Wind_Power(kW)", "DG_Power(kW)", "UPS_Power(kW)"]
+    df["Optimal_Source"] = df[source_cols].idxmax(axis=1)
+    y_source = df["Optimal_Source"]
+    return df, X, y_priority, y_source
+
+def main():
+    # Save default priorities configuration
+    with open("default_priorities.json", "w") as f:
+        json.dump(default_mcb_priorities, f, indent=4)
+    
+    # Load the dataset from the dataset folder
+    df, X, y_priority, y_source = load_training_data()
+    X_train, X_test, y_priority_train, y_priority_test, y_source_train, y_source_test = train_test_split(
+        X, y_priority, y_source, test_size=0.2, random_state=42
+    )
+    priority_reg = RandomForestRegressor(random_state=42)
+    priority_reg.fit(X_train, y_priority_train)
+    source_clf = RandomForestClassifier(random_state=42)
+    source_clf.fit(X_train, y_source_train)
+    
+    # Save models and priorities
+    with open("priority_reg.pkl", "wb") as f:
+        pickle.dump(priority_reg, f)
+    with open("source_clf.pkl", "wb") as f:
+        pickle.dump(source_clf, f)
+    with open("default_priorities.json", "w") as f:
+        json.dump(default_mcb_priorities, f, indent=4)
+    
+    # Train the short-term solar/wind/load forecaster on the same history
+    forecaster = train_forecaster(df)
+    forecaster.save("forecast_model.pkl")
 
-# Save models and priorities
-with open("priority_reg.pkl", "wb") as f:
-    pickle.dump(priority_reg, f)
-with open("source_clf.pkl", "wb") as f:
-    pickle.dump(source_clf, f)
-with open("default_priorities.json", "w") as f:
-    json.dump(default_mcb_priorities, f, indent=4)
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,68 @@
-def simulate_grid_failure(solar, wind, dg, ups, battery, total_demand, mcb_powers, grid_status=0, grid_power=0):
+import numpy as np
+
+
+def mcb_priority_order(mcb_powers, mcb_priorities=None):
+    """
+    Order MCB IDs from most to least important
+
+    Lower priority number = higher priority. Without explicit priorities the
+    MCB number is used, so MCB_1 is served first.
+    """
+    def priority(mcb_id):
+        if mcb_priorities and mcb_id in mcb_priorities:
+            return mcb_priorities[mcb_id]
+        return int(mcb_id.split('_')[1])
+    return sorted(mcb_powers, key=priority)
+
+
+def allocate_mcb_power(mcb_powers, available_power, mcb_priorities=None):
+    """
+    Greedily keep MCBs ON in priority order while power remains
+
+    Returns:
+    - (mcb_statuses, remaining_power) with 1 = ON and 0 = OFF
+    """
+    mcb_statuses = {}
+    remaining_power = available_power
+    
+    for mcb_id in mcb_priority_order(mcb_powers, mcb_priorities):
+        power = mcb_powers[mcb_id]
+        if remaining_power >= power:
+            mcb_statuses[mcb_id] = 1  # Keep ON
+            remaining_power -= power
+        else:
+            mcb_statuses[mcb_id] = 0  # Turn OFF
+    
+    return mcb_statuses, remaining_power
+
+
+def allocate_mcb_power_batch(power_matrix, available_power):
+    """
+    Vectorized `allocate_mcb_power` over many scenarios at once
+    
+    Parameters:
+    - power_matrix: (scenarios, mcbs) array with columns already in priority order
+    - available_power: (scenarios,) array of available power in kW
+    
+    Returns:
+    - (statuses, remaining_power) as a boolean (scenarios, mcbs) array and a
+      (scenarios,) array, matching the scalar greedy allocation row by row
+    """
+    power_matrix = np.asarray(power_matrix, dtype=float)
+    remaining_power = np.array(available_power, dtype=float)
+    statuses = np.zeros(power_matrix.shape, dtype=bool)
+    
+    for col in range(power_matrix.shape[1]):
+        power = power_matrix[:, col]
+        fits = remaining_power >= power
+        statuses[:, col] = fits
+        remaining_power -= np.where(fits, power, 0.0)
+    
+    return statuses, remaining_power
+
+
+def simulate_grid_failure(solar, wind, dg, ups, battery, total_demand, mcb_powers, grid_status=0, grid_power=0,
+                          shedding_plan=None, mcb_priorities=None):
     """
     Simulates grid failure scenario and recommends power source and MCB statuses
     
@@ -9,6 +73,11 @@ def simulate_grid_failure(solar, wind, dg, ups, battery, total_demand, mcb_power
     - mcb_powers: Dictionary of MCB IDs and their power consumption
     - grid_status: 1 if grid is active, 0 if grid has failed
     - grid_power: Available power from the grid in kW
+    - shedding_plan: Optional precomputed SheddingPlan covering these MCB loads
+      and priorities (see SheddingPlan.matches), looked up instead of running
+      a fresh allocation
+    - mcb_priorities: Optional dictionary of MCB IDs and their priority
+      (lower = more important); MCBs without one are ordered by MCB number
     
     Returns:
     - Dictionary with recommended source, MCB statuses, and power calculations
@@ -30,26 +99,10 @@ def simulate_grid_failure(solar, wind, dg, ups, battery, total_demand, mcb_power
         if total_mcb_load > grid_power:
             # Need to prioritize MCBs based on their priority values
             # Lower priority number = higher priority (more important)
-            mcb_priorities = []
-            for mcb_id, power in mcb_powers.items():
-                # Extract MCB number and priority
-                mcb_num = int(mcb_id.split('_')[1])
-                priority = mcb_num  # Default priority is the MCB number
-                mcb_priorities.append((mcb_id, power, priority, mcb_num))
-            
-            # Sort by priority (lower number = higher priority)
-            mcb_priorities.sort(key=lambda x: x[2])
-            
-            # Allocate power to MCBs based on priority until we run out
-            mcb_statuses = {}
-            remaining_power = grid_power
-            
-            for mcb_id, power, priority, mcb_num in mcb_priorities:
-                if remaining_power >= power:
-                    mcb_statuses[mcb_id] = 1  # Keep ON
-                    remaining_power -= power
-                else:
-                    mcb_statuses[mcb_id] = 0  # Turn OFF
+            if shedding_plan is not None:
+                mcb_statuses, remaining_power = shedding_plan.lookup(grid_power, mcb_powers)
+            else:
+                mcb_statuses, remaining_power = allocate_mcb_power(mcb_powers, grid_power, mcb_priorities)
             
             return {
                 "optimal_source": "Grid_Power(kW)",
@@ -105,28 +158,17 @@ def simulate_grid_failure(solar, wind, dg, ups, battery, total_demand, mcb_power
     total_mcb_load = sum(mcb_powers.values())
     demand_exceeds_supply = total_mcb_load > total_available_power
     
-    # If not enough power for all loads, prioritize MCBs
-    mcb_statuses = {}
-    remaining_power = total_available_power
-    
-    # Prepare MCB priorities - use MCB numbers for sorting
-    # Lower MCB numbers are considered higher priority
-    mcb_priorities = []
-    for mcb_id, power in mcb_powers.items():
-        mcb_num = int(mcb_id.split('_')[1])
-        # Use MCB number directly for priority - lower numbers are higher priority
-        mcb_priorities.append((mcb_id, power, mcb_num))
-    
-    # Sort by priority (lower number = higher priority)
-    mcb_priorities.sort(key=lambda x: x[2])
-    
-    # Allocate power to MCBs based on priority until we run out
-    for mcb_id, power, priority in mcb_priorities:
-        if remaining_power >= power:
-            mcb_statuses[mcb_id] = 1  # Keep ON
-            remaining_power -= power
-        else:
-            mcb_statuses[mcb_id] = 0  # Turn OFF
+    # If not enough power for all loads, prioritize MCBs. A precomputed
+    # shedding plan turns this into a binary search over the supply. When
+    # everything fits all MCBs stay ON, as with an active grid, so float
+    # error in the running subtraction cannot drop the last MCB.
+    if not demand_exceeds_supply:
+        mcb_statuses = {mcb_id: 1 for mcb_id in mcb_powers.keys()}
+        remaining_power = total_available_power - total_mcb_load
+    elif shedding_plan is not None:
+        mcb_statuses, remaining_power = shedding_plan.lookup(total_available_power, mcb_powers)
+    else:
+        mcb_statuses, remaining_power = allocate_mcb_power(mcb_powers, total_available_power, mcb_priorities)
     
     return {
         "optimal_source": best_source[0],
@@ -1,8 +1,14 @@
 import pandas as pd
 import numpy as np
 import random
+import os
+import sys
 from datetime import datetime, timedelta
 
+# Add the backend directory to the path so we can import the MCB inventory
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+from mcb_inventory import InventoryStore
+
 
 n_rows = 100
 
@@ -31,15 +37,16 @@ data["Non_Critical_Load(kW)"] = (data["Total_Load_Demand(kW)"] - pd.Series(data[
 # Convert to DataFrame
 df = pd.DataFrame(data)
 
-# Add load priorities (simulated MCBs)
-num_mcbs = 8  # Number of MCB circuits
-for i in range(1, num_mcbs+1):
-    is_critical = i <= 3  # First 3 MCBs are considered critical (e.g., emergency lighting, servers)
-    priority_level = i if is_critical else i + 3  # Critical loads have higher priority (lower number)
+# Add load priorities (simulated MCBs) for the circuits in the MCB inventory
+inventory = InventoryStore().for_site()
+mcb_columns = {}
+for i, priority_level in zip(inventory.ids.tolist(), inventory.priority.tolist()):
     power_usage = np.random.uniform(2, 8, n_rows).round(2)  # Power usage of each MCB
-    df[f"MCB_{i}_Priority"] = priority_level
-    df[f"MCB_{i}_Power(kW)"] = power_usage
-    df[f"MCB_{i}_Status"] = 1  # 1 = ON, 0 = OFF
+    mcb_columns[f"MCB_{i}_Priority"] = priority_level
+    mcb_columns[f"MCB_{i}_Power(kW)"] = power_usage
+    mcb_columns[f"MCB_{i}_Status"] = 1  # 1 = ON, 0 = OFF
+# Added in one step; thousands of single-column inserts fragment the frame
+df = pd.concat([df, pd.DataFrame(mcb_columns, index=df.index)], axis=1)
 
 # Save as CSV
 df.to_csv("energy_dataset.csv", index=False)
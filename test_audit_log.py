@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Round-trip test for the decision audit log
+Records decisions through the background writer, including ones with
+missing, oversized or malformed values and a batch with a record that
+fails to encode, then queries them back and checks every field
+"""
+
+import math
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+from audit_log import (AuditLog, GRID_STATUS_UNKNOWN, INPUT_FIELDS, KIND_MCB_DETAILED, KIND_PREDICT,
+                       MAX_TEXT_BYTES, query, stats)
+
+DECISIONS = 300
+
+
+def decision(i):
+    """Arguments for AuditLog.record, varied by `i`"""
+    mcb_ids = [f"MCB_{n}" for n in range(1, 2 + i % 12)] + ["MCB_70000"]
+    return {
+        "kind": KIND_PREDICT if i % 3 else KIND_MCB_DETAILED,
+        "site_id": f"site-{i % 4}",
+        "grid_status": i % 2,
+        "data": {field: float(i + k) for k, field in enumerate(INPUT_FIELDS) if (i + k) % 5},
+        "version": "3f9a0c1b2d4e+9b8c7d6e5f4a" if i % 3 else "",
+        "mcb_statuses": {mcb_id: (i >> k) & 1 for k, mcb_id in enumerate(mcb_ids)},
+        "mcb_powers": {mcb_id: 0.5 * (k + 1) for k, mcb_id in enumerate(mcb_ids)},
+        "remaining_power": i - 100.25,
+        "priority": float(i % 6) if i % 3 else math.nan,
+        "source": "Solar" if i % 3 else "",
+    }
+
+
+def check(decoded, expected):
+    """Return the fields of one decoded record that differ from what was recorded"""
+    problems = []
+    if decoded["kind"] != ("predict" if expected["kind"] == KIND_PREDICT else "mcb_detailed"):
+        problems.append("kind")
+    for field in ["site_id", "grid_status", "mcb_statuses", "mcb_powers", "remaining_power"]:
+        if decoded[field] != expected[field]:
+            problems.append(field)
+    if decoded["model_version"] != expected["version"]:
+        problems.append("model_version")
+    if decoded["optimal_source"] != (expected["source"] or None):
+        problems.append("optimal_source")
+    if decoded["inputs"] != expected["data"]:
+        problems.append("inputs")
+    if (decoded["priority"] is None) != math.isnan(expected["priority"]) or \
+            (decoded["priority"] is not None and decoded["priority"] != expected["priority"]):
+        problems.append("priority")
+    return problems
+
+
+def test_decisions_round_trip():
+    with tempfile.TemporaryDirectory() as folder:
+        # Small segments, so offsets restart several times
+        log = AuditLog(folder, segment_bytes=4096).start()
+        expected = [decision(i) for i in range(DECISIONS)]
+        for args in expected:
+            log.record(**args)
+        log.close()
+
+        assert log.written == DECISIONS and log.rejected == 0
+        assert len([name for name in os.listdir(folder) if name.endswith(".log")]) > 1
+        decisions = query(folder)
+        assert len(decisions) == DECISIONS
+        for decoded, args in zip(decisions, expected):
+            assert not check(decoded, args), (check(decoded, args), decoded)
+
+        site = query(folder, site_id="site-1", kind="predict", limit=10, newest_first=True)
+        assert [d["remaining_power"] for d in site] == \
+            [args["remaining_power"] for args in reversed(expected)
+             if args["site_id"] == "site-1" and args["kind"] == KIND_PREDICT][:10]
+        assert stats(folder)["decisions"] == DECISIONS
+
+
+def test_bad_record_mid_batch_keeps_offsets():
+    with tempfile.TemporaryDirectory() as folder:
+        log = AuditLog(folder)
+        good = [decision(i) for i in range(3)]
+        for args in good:
+            log.record(**args)
+        entries = [log.pending.get_nowait() for _ in good]
+        bad = entries[1][:6] + ({"MCB_x": 1},) + entries[1][7:]
+        log._write([entries[0], bad, entries[1], entries[2]])
+        log._close_segment()
+
+        assert log.written == 3 and log.rejected == 1
+        decisions = query(folder)
+        assert len(decisions) == 3
+        for decoded, args in zip(decisions, good):
+            assert not check(decoded, args), (check(decoded, args), decoded)
+
+
+def test_malformed_values_never_raise():
+    with tempfile.TemporaryDirectory() as folder:
+        log = AuditLog(folder).start()
+        log.record(KIND_PREDICT, "é" * MAX_TEXT_BYTES, None,
+                   {"Solar_Power(kW)": None, "Wind_Power(kW)": "n/a", "DG_Power(kW)": 1e39},
+                   "v1", {"MCB_1": 1, "MCB_2": 0}, {"MCB_1": "2.5", "MCB_2": None}, None, "high", 42)
+        log.record(KIND_PREDICT, "default", 300, {}, "v1", {"MCB_1": 1}, {"MCB_1": 1.0}, 0.0)
+        log.record(KIND_PREDICT, "default", 1, {}, "v1", {"MCB_-1": 1}, {"MCB_-1": 1.0}, 0.0)
+        log.record(KIND_PREDICT, "default", 1, {}, "v1", {f"MCB_{2 ** 32}": 1}, {}, 0.0)
+        log.close()
+
+        assert log.written == 2 and log.rejected == 2
+        first, second = query(folder)
+        assert first["site_id"] == "é" * (MAX_TEXT_BYTES // 2)
+        assert first["grid_status"] == second["grid_status"] == GRID_STATUS_UNKNOWN
+        assert first["inputs"] == {"DG_Power(kW)": math.inf}
+        assert first["mcb_statuses"] == {"MCB_1": 1, "MCB_2": 0}
+        assert first["mcb_powers"]["MCB_1"] == 2.5 and math.isnan(first["mcb_powers"]["MCB_2"])
+        assert math.isnan(first["remaining_power"]) and first["priority"] is None
+        assert first["optimal_source"] == "42"
+
+
+def main():
+    print("🧪 Audit log round-trip test")
+    print("=" * 50)
+    try:
+        test_decisions_round_trip()
+        test_bad_record_mid_batch_keeps_offsets()
+        test_malformed_values_never_raise()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print(f"✅ {DECISIONS} decisions, a bad record mid-batch and malformed values round-trip")
+
+
+if __name__ == "__main__":
+    main()
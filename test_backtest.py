@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Parity test for the backtest engine
+Replays the dataset, plus rows whose supply sits exactly on the total MCB
+load, through the backtest's live policy on a process pool with small
+chunks, and checks its statuses and metrics against simulate_grid_failure
+row by row
+"""
+
+import math
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+from backtest import greedy_by_priority, iter_chunks, run_backtest
+from grid_failure_handler import simulate_grid_failure
+from mcb_inventory import InventoryStore
+from telemetry import INTERVAL_MINUTES
+
+DATASET_PATH = os.path.join(ROOT, "dataset", "energy_dataset.csv")
+LIVE_POLICY = "greedy_by_priority"
+
+
+def replay_rows():
+    """The dataset plus grid-failure rows where supply equals, or just misses, the total load"""
+    df = pd.read_csv(DATASET_PATH)
+    rng = np.random.default_rng(3)
+    power_cols = [c for c in df.columns if c.startswith("MCB_") and c.endswith("_Power(kW)")]
+    edge_rows = []
+    for i in range(40):
+        row = df.iloc[i % len(df)].copy()
+        powers = rng.choice([0.1, 0.2, 0.3, 0.7, 1.1, 2.05], size=len(power_cols))
+        row[power_cols] = powers
+        total = sum(powers.tolist())
+        row["Solar_Power(kW)"] = total if i % 2 else math.nextafter(total, -math.inf)
+        row[["Wind_Power(kW)", "DG_Power(kW)", "UPS_Power(kW)"]] = 0.0
+        row["Grid_Status"] = 0
+        edge_rows.append(row)
+    return pd.concat([df, pd.DataFrame(edge_rows)], ignore_index=True)
+
+
+def live_statuses(df):
+    """(rows, mcbs) ON/OFF array from simulate_grid_failure, the way /predict calls it"""
+    numbers = sorted(int(c.split("_")[1]) for c in df.columns if c.startswith("MCB_") and c.endswith("_Power(kW)"))
+    statuses = np.zeros((len(df), len(numbers)), dtype=bool)
+    for r, row in enumerate(df.to_dict("records")):
+        mcb_powers = {f"MCB_{i}": row[f"MCB_{i}_Power(kW)"] for i in numbers}
+        mcb_priorities = {f"MCB_{i}": row[f"MCB_{i}_Priority"] for i in numbers}
+        result = simulate_grid_failure(row["Solar_Power(kW)"], row["Wind_Power(kW)"], row["DG_Power(kW)"],
+                                       row["UPS_Power(kW)"], row["Battery_Percentage(%)"],
+                                       row["Total_Load_Demand(kW)"], mcb_powers, row["Grid_Status"],
+                                       row["Grid_Power(kW)"], None, mcb_priorities)
+        statuses[r] = [result["mcb_statuses"][f"MCB_{i}"] == 1 for i in numbers]
+    return statuses
+
+
+def expected_metrics(df, statuses):
+    numbers = sorted(int(c.split("_")[1]) for c in df.columns if c.startswith("MCB_") and c.endswith("_Power(kW)"))
+    powers = df[[f"MCB_{i}_Power(kW)" for i in numbers]].to_numpy(dtype=float)
+    critical = np.broadcast_to(InventoryStore().for_site().critical_flags(numbers), powers.shape)
+    hours = INTERVAL_MINUTES / 60.0
+    served = np.where(statuses, powers, 0.0)
+    return {
+        "rows": len(df),
+        "served_kwh": served.sum() * hours,
+        "served_critical_kwh": served[critical].sum() * hours,
+        "unserved_kwh": (powers - served).sum() * hours,
+        "unserved_critical_kwh": (powers - served)[critical].sum() * hours,
+        "switches": int((statuses[1:] != statuses[:-1]).sum()),
+    }
+
+
+def compare(path, df):
+    """Return a list of differences between the backtest and the live allocation"""
+    problems = []
+    live = live_statuses(df)
+    replayed = np.concatenate([greedy_by_priority(powers, priorities, available)
+                               for powers, priorities, available, _ in iter_chunks(path, chunk_rows=13)])
+    for r in np.flatnonzero((replayed != live).any(axis=1)):
+        problems.append(f"row {r}: backtest {replayed[r].astype(int)} live {live[r].astype(int)}")
+
+    report = run_backtest(path, [LIVE_POLICY], workers=2, chunk_rows=7)[LIVE_POLICY]
+    for key, value in expected_metrics(df, live).items():
+        if not math.isclose(report[key], value, abs_tol=1e-3):
+            problems.append(f"{key}: backtest {report[key]} live {value}")
+    return problems
+
+
+def run():
+    df = replay_rows()
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "telemetry.csv")
+        # Round-trip exactly, so both paths read the same floats
+        df.to_csv(path, index=False, float_format="%.17g")
+        df = pd.read_csv(path)
+        return df, compare(path, df)
+
+
+def test_backtest_matches_simulate_grid_failure():
+    _, problems = run()
+    assert not problems, problems[:5]
+
+
+def main():
+    print("🧪 Backtest vs simulate_grid_failure parity test")
+    print("=" * 50)
+    df, problems = run()
+    if problems:
+        print(f"❌ {len(problems)} differences, first few:")
+        for problem in problems[:10]:
+            print(f"   {problem}")
+        sys.exit(1)
+    print(f"✅ Statuses and metrics match on all {len(df)} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test for the micro-batched inference pool
+Sends concurrent requests through InferenceExecutor and checks that each
+caller gets the prediction for its own features, that requests really are
+batched, and that a failing batch fails every caller in it
+"""
+
+import os
+import pickle
+import sys
+import tempfile
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+from execution import InferenceExecutor
+from test_model_compaction import fitted_forests
+
+REQUESTS = 200
+
+
+class RecordingExecutor(InferenceExecutor):
+    """InferenceExecutor that remembers the size of every batch it sends"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batch_sizes = []
+
+    def _send(self, batch):
+        self.batch_sizes.append(len(batch))
+        super()._send(batch)
+
+
+def start_executor(folder, **kwargs):
+    regressor, classifier, X_val, _, _ = fitted_forests(n_estimators=10)
+    paths = []
+    for name, model in [("priority_reg", regressor), ("source_clf", classifier)]:
+        paths.append(os.path.join(folder, f"{name}.pkl"))
+        with open(paths[-1], "wb") as f:
+            pickle.dump(model, f)
+    executor = RecordingExecutor(*paths, workers=2, **kwargs).start()
+    return executor, regressor, classifier, X_val
+
+
+def test_batched_results_reach_their_callers():
+    with tempfile.TemporaryDirectory() as folder:
+        executor, regressor, classifier, X_val = start_executor(folder, batch_window_ms=20, max_batch_size=64)
+        try:
+            rows = X_val[:REQUESTS].to_dict("records")
+            futures = [executor.submit_predict(row) for row in rows]
+            results = [future.result(timeout=30) for future in futures]
+        finally:
+            executor.shutdown()
+
+    priorities = regressor.predict(X_val[:REQUESTS])
+    sources = classifier.predict(X_val[:REQUESTS])
+    assert np.allclose([priority for priority, _ in results], priorities)
+    assert [source for _, source in results] == sources.tolist()
+    assert sum(executor.batch_sizes) == REQUESTS
+    assert len(executor.batch_sizes) < REQUESTS and max(executor.batch_sizes) <= 64
+
+
+def test_worker_exception_reaches_every_caller_in_batch():
+    with tempfile.TemporaryDirectory() as folder:
+        executor, _, _, X_val = start_executor(folder, batch_window_ms=500)
+        try:
+            rows = X_val[:5].to_dict("records")
+            del rows[2]["Wind_Power(kW)"]
+            futures = [executor.submit_predict(row) for row in rows]
+            for future in futures:
+                with pytest.raises(KeyError):
+                    future.result(timeout=30)
+            assert executor.batch_sizes == [len(rows)]
+
+            # The pool keeps serving after a failed batch
+            assert executor.predict(X_val[:1].to_dict("records")[0], timeout=30)
+        finally:
+            executor.shutdown()
+
+
+def main():
+    print("🧪 Micro-batched inference test")
+    print("=" * 50)
+    try:
+        test_batched_results_reach_their_callers()
+        test_worker_exception_reaches_every_caller_in_batch()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print(f"✅ {REQUESTS} batched requests reach their callers and a worker error fails its whole batch")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Train/serve parity test for the feature pipeline
+Runs the dataset through the vectorized training transform and through
+successive per-reading updates, as /predict sees it, and checks that both
+produce the same model features row by row
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+from feature_pipeline import FeaturePipeline, MODEL_FEATURES, DERIVED_LOAD_FEATURES
+
+DATASET_PATH = os.path.join(ROOT, "dataset", "energy_dataset.csv")
+
+
+def telemetry():
+    """The dataset split over two sites, with client load totals that disagree with the MCBs"""
+    df = pd.read_csv(DATASET_PATH)
+    df["Site_ID"] = np.where(np.arange(len(df)) % 3 == 0, "site-b", "default")
+    df["Total_Load_Demand(kW)"] = df["Total_Load_Demand(kW)"] + 17.0
+    return df
+
+
+def compare(df):
+    """Return (feature, row, training value, serving value) for every mismatch"""
+    trained = FeaturePipeline.transform_frame(df, "Site_ID")
+    pipeline = FeaturePipeline()
+    mismatches = []
+    for index, row in enumerate(df.to_dict("records")):
+        # Serving gets the reading without the totals a client may leave out
+        if index % 2:
+            row = {key: value for key, value in row.items() if key not in DERIVED_LOAD_FEATURES}
+        served = pipeline.update(row["Site_ID"], row)
+        for feature in MODEL_FEATURES:
+            expected = trained[feature].iloc[index]
+            if not np.isclose(served[feature], expected, rtol=0, atol=1e-9):
+                mismatches.append((feature, index, expected, served[feature]))
+    return mismatches
+
+
+def test_training_and_serving_features_match():
+    mismatches = compare(telemetry())
+    assert not mismatches, mismatches[:5]
+
+
+def test_derived_loads_ignore_client_totals():
+    df = telemetry()
+    trained = FeaturePipeline.transform_frame(df, "Site_ID")
+    mcb_total = df[[c for c in df.columns if c.startswith("MCB_") and c.endswith("_Power(kW)")]].sum(axis=1)
+    assert np.allclose(trained["Total_Load_Demand(kW)"], mcb_total.round(4))
+
+
+def main():
+    print("🧪 Feature pipeline train/serve parity test")
+    print("=" * 50)
+    df = telemetry()
+    mismatches = compare(df)
+    if mismatches:
+        print(f"❌ {len(mismatches)} mismatches, first few:")
+        for feature, index, expected, served in mismatches[:10]:
+            print(f"   row {index} {feature}: training={expected} serving={served}")
+        sys.exit(1)
+    print(f"✅ {len(MODEL_FEATURES)} features match on all {len(df)} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Train/serve parity test for the forecaster's features
+Feeds an irregular reading stream (repeated intervals, short and long gaps,
+late readings) through SiteFeatureState, as /predict and /forecast do, and
+checks each interval's features against build_training_frame run on the same
+stream regularized to one row per 15-minute interval
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+from forecasting import (FORECAST_TARGETS, HISTORY_LENGTH, MAX_GAP_INTERVALS, SiteFeatureState,
+                         build_training_frame, forecast_feature_names)
+from telemetry import INTERVAL_MINUTES, SITE_FIELD
+
+READINGS = 400
+INTERVAL = pd.Timedelta(minutes=INTERVAL_MINUTES)
+
+
+def reading_stream(readings=READINGS, seed=7):
+    """
+    Timestamped readings, mostly one per interval, with every kind of irregularity
+
+    Returns:
+    - List of (timestamp, reading dict)
+    """
+    rng = np.random.default_rng(seed)
+    interval = pd.Timestamp("2024-03-01 22:00")
+    stream = []
+    for i in range(readings):
+        step = rng.choice(["next", "same", "short_gap", "late"], p=[0.7, 0.1, 0.1, 0.1])
+        if i in (150, 300):
+            interval += (MAX_GAP_INTERVALS + 2) * INTERVAL
+        elif i == 220:
+            # The longest gap that is still filled
+            interval += (MAX_GAP_INTERVALS + 1) * INTERVAL
+        elif step == "next":
+            interval += INTERVAL
+        elif step == "short_gap":
+            interval += int(rng.integers(2, MAX_GAP_INTERVALS + 1)) * INTERVAL
+        timestamp = interval + pd.Timedelta(seconds=int(rng.integers(0, INTERVAL_MINUTES * 60)))
+        if step == "late" and i not in (150, 220, 300):
+            timestamp -= int(rng.integers(1, 4)) * INTERVAL
+        stream.append((timestamp, {target: float(rng.uniform(0, 50)) for target in FORECAST_TARGETS}))
+    return stream
+
+
+def regularized_frame(stream):
+    """
+    The stream the way SiteFeatureState should see it, one row per interval
+
+    Late readings are dropped, the last reading in an interval wins, missed
+    intervals repeat the last reading, and each longer gap starts a new
+    segment (a separate site, so no lag crosses it).
+    """
+    df = pd.DataFrame([{"Timestamp": timestamp, **reading} for timestamp, reading in stream])
+    df["Interval"] = df["Timestamp"].dt.floor(f"{INTERVAL_MINUTES}min")
+    df = df[df["Interval"] >= df["Interval"].cummax()]
+    df = df.groupby("Interval").last().reset_index()
+    missed = df["Interval"].diff() // INTERVAL - 1
+    df[SITE_FIELD] = (missed > MAX_GAP_INTERVALS).cumsum()
+
+    frames = []
+    for _, segment in df.groupby(SITE_FIELD):
+        intervals = pd.date_range(segment["Interval"].iloc[0], segment["Interval"].iloc[-1], freq=INTERVAL)
+        segment = segment.set_index("Interval").reindex(intervals)
+        segment["Real"] = segment["Timestamp"].notna()
+        segment = segment.ffill()
+        # Filled intervals keep the interval start as their timestamp
+        segment.loc[~segment["Real"], "Timestamp"] = intervals[~segment["Real"].to_numpy()]
+        # One padding interval so every real interval has a t+1 target
+        padding = segment.iloc[[-1]].copy()
+        padding.index = padding.index + INTERVAL
+        padding["Real"] = False
+        frames.append(pd.concat([segment, padding]).rename_axis("Interval").reset_index())
+    return pd.concat(frames, ignore_index=True)
+
+
+def compare(stream):
+    """
+    Return (interval, feature, training value, serving value) for every mismatch,
+    and the intervals that only one side had features for
+    """
+    frame = regularized_frame(stream)
+    X, _ = build_training_frame(frame, horizon=1)
+    trained = frame.sort_values([SITE_FIELD, "Timestamp"]).reset_index(drop=True).loc[X.index]
+    expected = {interval: row for interval, row, real in zip(trained["Interval"], X.to_numpy(), trained["Real"]) if real}
+
+    state = SiteFeatureState()
+    served = {}
+    for timestamp, reading in stream:
+        if state.update(reading, timestamp) and state.is_ready():
+            # A later reading in the same interval overwrites this one
+            served[state.last_interval] = state.feature_vector()
+
+    mismatches = []
+    for interval in sorted(set(expected) & set(served)):
+        for name, trained_value, served_value in zip(forecast_feature_names(), expected[interval], served[interval]):
+            if not np.isclose(served_value, trained_value, rtol=0, atol=1e-9):
+                mismatches.append((interval, name, trained_value, served_value))
+    return mismatches, set(expected) ^ set(served)
+
+
+def test_incremental_features_match_training_frame():
+    mismatches, unmatched = compare(reading_stream())
+    assert not mismatches, mismatches[:5]
+    assert not unmatched, sorted(unmatched)[:5]
+
+
+def test_edge_cases():
+    start = pd.Timestamp("2024-03-01 00:00")
+    reading = {target: 1.0 for target in FORECAST_TARGETS}
+    state = SiteFeatureState()
+    for i in range(HISTORY_LENGTH):
+        assert state.update(reading, start + i * INTERVAL)
+    assert state.is_ready()
+    last = start + (HISTORY_LENGTH - 1) * INTERVAL
+
+    # Same interval replaces the last value
+    assert state.update({target: 9.0 for target in FORECAST_TARGETS}, last + pd.Timedelta(minutes=5))
+    assert [len(buffer) for buffer in state.history.values()] == [HISTORY_LENGTH] * len(FORECAST_TARGETS)
+    assert state.feature_vector()[0] == 9.0
+
+    # Older than the current interval: dropped, state untouched
+    before = state.feature_vector()
+    assert not state.update(reading, last - INTERVAL)
+    assert state.feature_vector() == before
+
+    # A gap of MAX_GAP_INTERVALS is filled with the last reading
+    last += (MAX_GAP_INTERVALS + 1) * INTERVAL
+    assert state.update(reading, last)
+    assert state.is_ready() and state.feature_vector()[1:4] == [9.0, 9.0, 9.0]
+
+    # One interval more restarts the history
+    assert state.update(reading, last + (MAX_GAP_INTERVALS + 2) * INTERVAL)
+    assert not state.is_ready() and len(state.history[FORECAST_TARGETS[0]]) == 1
+
+
+def main():
+    print("🧪 Forecast feature train/serve parity test")
+    print("=" * 50)
+    stream = reading_stream()
+    mismatches, unmatched = compare(stream)
+    if mismatches or unmatched:
+        print(f"❌ {len(mismatches)} mismatches, {len(unmatched)} intervals with features on one side only")
+        for interval, name, trained_value, served_value in mismatches[:10]:
+            print(f"   {interval} {name}: training={trained_value} serving={served_value}")
+        sys.exit(1)
+    print(f"✅ {len(forecast_feature_names())} features match on every interval of {len(stream)} irregular readings")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Parity test for the grid-quality analytics
+Feeds one synthetic series through the monitor in batches of random size
+(down to single samples) and through bulk analyze(), and checks both against
+a plain-Python reference for events and RMS windows. Also checks that grid
+state snapshots reach the per-site monitors in version order when requests
+race
+"""
+
+import math
+import os
+import random
+import sys
+import threading
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+from grid_quality import EVENT_KINDS, RMS_WINDOW, GridQualityMonitor, SiteQualityMonitors, analyze
+from grid_state import APPLIED, GridStateStore
+
+SAMPLES = 20000
+
+
+def synthetic_series(n, seed=11):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n, dtype=np.float64)
+    voltage = 225 + 32 * np.sin(t / 300) + rng.normal(0, 4, n)
+    current = rng.uniform(0, 40, n)
+    frequency = 50 + 1.05 * np.sin(t / 700) + rng.normal(0, 0.05, n)
+    return voltage, current, frequency, t * 0.02
+
+
+def reference_events(voltage, frequency, timestamps):
+    """Events per kind as (start, end, extreme, start_time, end_time), one sample at a time"""
+    signals = {"voltage": voltage.tolist(), "frequency": frequency.tolist()}
+    times = timestamps.tolist()
+    events = {}
+    for kind, signal, out_of_band, worst in EVENT_KINDS:
+        found = []
+        start = None
+        for i, value in enumerate(signals[signal]):
+            if out_of_band(value):
+                if start is None:
+                    start, extreme = i, value
+                else:
+                    extreme = min(extreme, value) if worst is np.minimum else max(extreme, value)
+            elif start is not None:
+                found.append((start, i, extreme, times[start], times[i - 1]))
+                start = None
+        if start is not None:
+            found.append((start, len(times), extreme, times[start], times[-1]))
+        events[kind] = found
+    return events
+
+
+def reference_windows(voltage, current, window=RMS_WINDOW):
+    rms = []
+    for start in range(0, len(voltage) - window + 1, window):
+        v = voltage[start:start + window].tolist()
+        rms.append(math.sqrt(sum(x * x for x in v) / window))
+    return rms
+
+
+def as_tuples(events):
+    return list(zip(events["start_sample"].tolist(), events["end_sample"].tolist(), events["extreme"].tolist(),
+                    events["start_time"].tolist(), events["end_time"].tolist()))
+
+
+def batched(voltage, current, frequency, timestamps, seed=5):
+    """Events and RMS voltage from monitor updates with random batch sizes"""
+    rng = random.Random(seed)
+    monitor = GridQualityMonitor()
+    events = {kind: [] for kind, _, _, _ in EVENT_KINDS}
+    rms = []
+    i = 0
+    while i < len(voltage):
+        size = rng.choice([1, 1, 2, 7, 59, 60, 61, 500, 3000])
+        result = monitor.update(voltage[i:i + size], current[i:i + size], frequency[i:i + size],
+                                timestamps[i:i + size])
+        for kind in events:
+            events[kind] += as_tuples(result["events"][kind])
+        rms += result["windows"]["rms_voltage"].tolist()
+        i += size
+    for kind, closed in monitor.flush().items():
+        events[kind] += as_tuples(closed)
+    return events, rms, monitor.summary()
+
+
+def compare():
+    """Return a list of differences between batched, bulk and reference results"""
+    voltage, current, frequency, timestamps = synthetic_series(SAMPLES)
+    expected = reference_events(voltage, frequency, timestamps)
+    expected_rms = reference_windows(voltage, current)
+    problems = []
+
+    bulk = analyze(voltage, current, frequency, timestamps, chunk_size=4096)
+    events, rms, summary = batched(voltage, current, frequency, timestamps)
+    for kind, _, _, _ in EVENT_KINDS:
+        if not expected[kind]:
+            problems.append(f"{kind}: synthetic series has no events")
+        if len(events[kind]) != len(expected[kind]) or not np.allclose(events[kind], expected[kind]):
+            problems.append(f"{kind}: batched events differ from reference")
+        if as_tuples(bulk["events"][kind]) != events[kind]:
+            problems.append(f"{kind}: bulk events differ from batched")
+        if summary["events"][kind] != len(expected[kind]):
+            problems.append(f"{kind}: summary counts {summary['events'][kind]}, reference {len(expected[kind])}")
+    if not np.allclose(rms, expected_rms) or not np.allclose(bulk["windows"]["rms_voltage"], expected_rms):
+        problems.append("RMS voltage windows differ from reference")
+    return problems
+
+
+def test_batched_and_bulk_match_reference():
+    problems = compare()
+    assert not problems, problems
+
+
+def test_snapshots_reach_monitor_in_version_order():
+    store = GridStateStore()
+    quality = SiteQualityMonitors()
+    _, older = store.apply({"voltage": 230.0, "current": 10.0, "frequency": 50.0})
+    _, newer = store.apply({"voltage": 190.0, "current": 10.0, "frequency": 50.0})
+    assert quality.update("default", [newer["voltage"]], [10.0], [50.0], version=newer["version"]) is not None
+    assert quality.update("default", [older["voltage"]], [10.0], [50.0], version=older["version"]) is None
+    assert quality.summary()["samples"] == 1
+
+    # Racing writers: whatever each one feeds, the monitor sees increasing versions
+    class Recorder:
+        def __init__(self):
+            self.versions = []
+
+        def update(self, voltage, current, frequency, timestamps=None):
+            self.versions.append(int(voltage[0]))
+
+    quality = SiteQualityMonitors()
+    recorder = quality._monitors["default"] = Recorder()
+
+    def writer():
+        for _ in range(2000):
+            outcome, state = store.apply({"voltage": 1.0})
+            if outcome == APPLIED:
+                quality.update("default", [state["version"]], [0.0], [50.0], version=state["version"])
+
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=writer) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+    assert recorder.versions and recorder.versions == sorted(set(recorder.versions))
+
+
+def main():
+    print("🧪 Grid quality batched vs bulk parity test")
+    print("=" * 50)
+    problems = compare()
+    if problems:
+        print(f"❌ {len(problems)} differences:")
+        for problem in problems:
+            print(f"   {problem}")
+        sys.exit(1)
+    print(f"✅ Events and RMS windows match the reference on {SAMPLES} samples")
+
+
+if __name__ == "__main__":
+    main()
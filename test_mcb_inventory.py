@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Test for the per-site MCB inventory
+Checks the default site's statuses and summaries against the eight circuits
+that used to be hardcoded in /api/mcb/detailed, that derived critical loads
+follow the inventory's is_critical flags, and that an inventory without a
+default site is refused
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+from feature_pipeline import critical_mask, fill_frame_load_features, fill_load_features
+from mcb_inventory import InventoryStore
+
+# The circuits /api/mcb/detailed hardcoded before the inventory existed
+DEFAULT_MCBS = [
+    {"id": 1, "name": "Critical Load 1", "power": 8.0, "priority": 1, "is_critical": True},
+    {"id": 2, "name": "Critical Load 2", "power": 7.0, "priority": 2, "is_critical": True},
+    {"id": 3, "name": "Critical Load 3", "power": 6.0, "priority": 3, "is_critical": True},
+    {"id": 4, "name": "Non-Critical Load 1", "power": 5.0, "priority": 7, "is_critical": False},
+    {"id": 5, "name": "Non-Critical Load 2", "power": 5.0, "priority": 8, "is_critical": False},
+    {"id": 6, "name": "Non-Critical Load 3", "power": 4.0, "priority": 9, "is_critical": False},
+    {"id": 7, "name": "Non-Critical Load 4", "power": 3.0, "priority": 10, "is_critical": False},
+    {"id": 8, "name": "Non-Critical Load 5", "power": 2.0, "priority": 11, "is_critical": False},
+]
+
+
+def hardcoded_detailed(grid_online, available_power):
+    """MCB data and summary the way /api/mcb/detailed built them from DEFAULT_MCBS"""
+    power_available = available_power > 0.1
+    total_critical_power = sum(mcb["power"] for mcb in DEFAULT_MCBS if mcb["is_critical"])
+    total_power_demand = sum(mcb["power"] for mcb in DEFAULT_MCBS)
+    mcb_data = {}
+    for mcb in DEFAULT_MCBS:
+        if not power_available:
+            status = 0
+        elif mcb["is_critical"]:
+            status = 1
+        elif grid_online and available_power >= total_power_demand:
+            status = 1
+        elif available_power >= total_critical_power + mcb["power"]:
+            status = 1
+        else:
+            status = 0
+        mcb_data[f"MCB_{mcb['id']}"] = {"status": status, "name": mcb["name"], "power_kw": mcb["power"],
+                                        "priority": mcb["priority"], "is_critical": mcb["is_critical"]}
+    summary = {
+        "total_mcbs": len(DEFAULT_MCBS),
+        "mcbs_on": sum(1 for mcb in mcb_data.values() if mcb["status"] == 1),
+        "mcbs_off": sum(1 for mcb in mcb_data.values() if mcb["status"] == 0),
+        "total_power_demand": total_power_demand,
+        "active_power_load": sum(mcb["power_kw"] for mcb in mcb_data.values() if mcb["status"] == 1),
+    }
+    return mcb_data, summary
+
+
+def inventory_detailed(inventory, grid_online, available_power):
+    """The same MCB data and summary from the inventory, as app.py builds them"""
+    statuses = inventory.detailed_statuses(grid_online, available_power)
+    mcb_data = {
+        mcb_id: {"status": status, "name": name, "power_kw": power, "priority": priority, "is_critical": critical}
+        for mcb_id, status, name, power, priority, critical in zip(
+            inventory.mcb_keys(), statuses.astype(int).tolist(), inventory.names, inventory.power.tolist(),
+            inventory.priority.tolist(), inventory.critical.tolist())
+    }
+    summary = inventory.summary(statuses)
+    return mcb_data, {key: summary[key] for key in
+                      ["total_mcbs", "mcbs_on", "mcbs_off", "total_power_demand", "active_power_load"]}
+
+
+def compare():
+    """Return the (grid_online, available_power) cases where the inventory and the old code differ"""
+    inventory = InventoryStore().for_site()
+    supplies = [0.0, 0.1, 0.11, 5.0, 21.0, 22.9, 23.0, 25.0, 26.0, 27.0, 28.9, 29.0, 39.9, 40.0, 100.0]
+    return [(grid_online, supply) for grid_online in (False, True) for supply in supplies
+            if inventory_detailed(inventory, grid_online, supply) != hardcoded_detailed(grid_online, supply)]
+
+
+def write_inventory(folder, sites):
+    path = os.path.join(folder, "inventory.json")
+    with open(path, "w") as f:
+        json.dump({"sites": sites}, f)
+    return path
+
+
+def test_default_site_matches_hardcoded_mcbs():
+    assert not compare()
+    inventory = InventoryStore().for_site("unlisted-site")
+    assert [inventory.get(mcb["id"]) for mcb in DEFAULT_MCBS] == DEFAULT_MCBS
+
+
+def test_inventory_without_default_site_is_refused():
+    with tempfile.TemporaryDirectory() as folder:
+        store = InventoryStore(write_inventory(folder, {"default": DEFAULT_MCBS}))
+        write_inventory(folder, {"site-a": DEFAULT_MCBS})
+        with pytest.raises(ValueError):
+            store.reload()
+        # The loaded inventories stay in use
+        assert len(store.for_site("site-a")) == len(DEFAULT_MCBS)
+        with pytest.raises(ValueError):
+            InventoryStore(store.path)
+
+
+def test_critical_loads_follow_inventory_flags():
+    # Site b marks a priority-6 circuit critical and a priority-2 one not
+    site_b = [dict(mcb) for mcb in DEFAULT_MCBS[:6]]
+    site_b[1].update(priority=2, is_critical=False)
+    site_b[5].update(priority=6, is_critical=True)
+    with tempfile.TemporaryDirectory() as folder:
+        store = InventoryStore(write_inventory(folder, {"default": DEFAULT_MCBS, "site-b": site_b}))
+
+    for site_id in ["default", "site-b", "unlisted-site"]:
+        inventory = store.for_site(site_id)
+        reading = {f"MCB_{i}_Power(kW)": power for i, power in zip(inventory.ids.tolist(), inventory.power.tolist())}
+        reading.update({f"MCB_{i}_Priority": 1 for i in inventory.ids.tolist()})
+        filled = fill_load_features(reading, inventory)
+        assert filled["Critical_Load(kW)"] == inventory.summary()["critical_power_demand"]
+        mask = critical_mask([f"MCB_{i}" for i in inventory.ids.tolist()], inventory)
+        assert [f"MCB_{i}" for i in inventory.critical_ids().tolist()] == [k for k, v in mask.items() if v]
+
+    # MCBs the inventory doesn't list are not critical
+    assert critical_mask(["MCB_3", "MCB_99"], store.for_site()) == {"MCB_3": True, "MCB_99": False}
+
+    # Training derives the same critical loads per site
+    rows = [{"Site_ID": site_id, **{f"MCB_{i}_Power(kW)": float(i) for i in range(1, 9)}}
+            for site_id in ["default", "site-b", "unlisted-site", "site-b"]]
+    trained = fill_frame_load_features(pd.DataFrame(rows), store, "Site_ID")
+    served = [fill_load_features(row, store.for_site(row["Site_ID"]))["Critical_Load(kW)"] for row in rows]
+    assert np.allclose(trained["Critical_Load(kW)"], served)
+    assert served == [6.0, 10.0, 6.0, 10.0]
+
+
+def main():
+    print("🧪 MCB inventory test")
+    print("=" * 50)
+    differences = compare()
+    if differences:
+        print(f"❌ Inventory differs from the hardcoded MCBs for {differences}")
+        sys.exit(1)
+    print("✅ Default site matches the hardcoded MCBs for every grid state and supply")
+
+
+if __name__ == "__main__":
+    main()
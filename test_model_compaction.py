@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Parity test for compacted forests
+Checks that flattened forests with float32 thresholds predict what the
+sklearn forest predicts, that float16 / int8 leaf values dequantize within
+their rounding bounds, and that tree pruning keeps at least MIN_TREES trees
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+from model_compaction import MIN_TREES, CompactForest, floor_to_float32, select_trees
+
+ROWS = 3000
+
+
+def synthetic_data(rows=ROWS, seed=4):
+    """Features on the scale of the telemetry, a regression target and class labels"""
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({
+        "Solar_Power(kW)": rng.uniform(0, 30, rows),
+        "Wind_Power(kW)": rng.uniform(0, 20, rows),
+        "Battery_Percentage(%)": rng.uniform(0, 100, rows),
+        "Total_Load_Demand(kW)": rng.uniform(5, 60, rows),
+    })
+    y = (X["Solar_Power(kW)"] + X["Wind_Power(kW)"]) / X["Total_Load_Demand(kW)"] + rng.normal(0, 0.05, rows)
+    labels = np.where(X["Solar_Power(kW)"] > X["Wind_Power(kW)"], "Solar_Power(kW)", "Wind_Power(kW)")
+    labels = np.where(X["Battery_Percentage(%)"] < 20, "DG_Power(kW)", labels)
+    return X, y, labels
+
+
+def fitted_forests(n_estimators=40):
+    X, y, labels = synthetic_data()
+    half = ROWS // 2
+    regressor = RandomForestRegressor(n_estimators=n_estimators, random_state=0).fit(X[:half], y[:half])
+    classifier = RandomForestClassifier(n_estimators=n_estimators, random_state=0).fit(X[:half], labels[:half])
+    return regressor, classifier, X[half:], y[half:], labels[half:]
+
+
+def test_floor_to_float32_keeps_decisions():
+    rng = np.random.default_rng(1)
+    thresholds = rng.uniform(-100, 100, 100000)
+    floored = floor_to_float32(thresholds)
+    assert (floored.astype(np.float64) <= thresholds).all()
+    assert (np.nextafter(floored, np.float32(np.inf)).astype(np.float64) > thresholds).all()
+    x = np.concatenate([thresholds.astype(np.float32), floored, np.nextafter(floored, np.float32(np.inf))])
+    t = np.tile(thresholds, 3)
+    assert ((x.astype(np.float64) <= t) == (x <= np.tile(floored, 3))).all()
+
+
+def test_float32_forest_matches_sklearn():
+    regressor, classifier, X_val, _, _ = fitted_forests()
+    compact = CompactForest.from_forest(regressor, "float32")
+    assert np.abs(compact.predict(X_val) - regressor.predict(X_val)).max() < 1e-5
+    compact = CompactForest.from_forest(classifier, "float32")
+    assert (compact.predict(X_val) == classifier.predict(X_val)).all()
+    assert np.abs(compact.predict_proba(X_val) - classifier.predict_proba(X_val)).max() < 1e-5
+
+
+def test_quantized_leaves_dequantize_within_rounding():
+    regressor, classifier, X_val, _, _ = fitted_forests()
+    for forest in [regressor, classifier]:
+        exact = CompactForest.from_forest(forest, "float32")
+        reference = exact.leaf_values(X_val).astype(np.float64)
+        magnitude = np.abs(exact.values).max()
+
+        half = CompactForest.from_forest(forest, "float16")
+        # float16 keeps 11 significant bits
+        assert np.abs(half.leaf_values(X_val) - reference).max() <= magnitude * 2.0 ** -11 + 1e-6
+
+        small = CompactForest.from_forest(forest, "int8")
+        assert small.values.dtype == np.int8
+        assert np.abs(small.leaf_values(X_val) - reference).max() <= small.leaf_scale / 2 + 1e-5
+
+
+def test_select_trees_keeps_min_trees():
+    regressor, classifier, X_val, y_val, labels_val = fitted_forests()
+    for forest, target in [(regressor, y_val), (classifier, labels_val)]:
+        compact = CompactForest.from_forest(forest)
+        # Any prefix is good enough with this tolerance, so only the floor applies
+        assert select_trees(compact, X_val, target, tolerance=1.0) == list(range(MIN_TREES))
+        kept = select_trees(compact, X_val, target, tolerance=0.0)
+        assert MIN_TREES <= len(kept) <= len(forest.estimators_) and kept == list(range(len(kept)))
+
+    regressor, _, X_val, y_val, _ = fitted_forests(n_estimators=MIN_TREES - 3)
+    assert select_trees(CompactForest.from_forest(regressor), X_val, y_val) == list(range(MIN_TREES - 3))
+
+
+def main():
+    print("🧪 Compacted forest parity test")
+    print("=" * 50)
+    try:
+        test_floor_to_float32_keeps_decisions()
+        test_float32_forest_matches_sklearn()
+        test_quantized_leaves_dequantize_within_rounding()
+        test_select_trees_keeps_min_trees()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print("✅ Compacted forests match sklearn, quantized leaves within rounding, pruning keeps MIN_TREES")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test for shared model hosting (MODEL_HOSTING=shared)
+Checks that a published, memory-mapped model predicts what the pickled
+forest predicts, that a retrained pickle is republished, and that several
+processes publishing at once all attach the same complete copy
+"""
+
+import multiprocessing
+import os
+import pickle
+import sys
+import tempfile
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+from model_hosting import META_FILE, attach_model, load_model, publish_model
+from test_model_compaction import fitted_forests
+
+PUBLISHERS = 6
+
+
+def save(model, path):
+    with open(path, "wb") as f:
+        pickle.dump(model, f)
+
+
+def test_attached_models_predict_like_pickles():
+    regressor, classifier, X_val, _, _ = fitted_forests()
+    with tempfile.TemporaryDirectory() as folder:
+        for name, model in [("priority_reg", regressor), ("source_clf", classifier)]:
+            path = os.path.join(folder, f"{name}.pkl")
+            save(model, path)
+            pickled = load_model(path, "pickle")
+            shared = attach_model(publish_model(path, os.path.join(folder, "cache")))
+            assert list(shared.feature_names_in_) == list(pickled.feature_names_in_)
+            # Whole frame, and one row at a time the way /predict calls it
+            for X in [X_val, X_val[:1]]:
+                if name == "source_clf":
+                    assert (shared.predict(X) == pickled.predict(X)).all()
+                else:
+                    assert np.abs(shared.predict(X) - pickled.predict(X)).max() < 1e-5
+
+
+def test_changed_pickle_is_republished():
+    regressor, _, X_val, _, _ = fitted_forests()
+    retrained, _, _, _, _ = fitted_forests(n_estimators=15)
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "priority_reg.pkl")
+        cache = os.path.join(folder, "cache")
+        save(regressor, path)
+        target = publish_model(path, cache)
+        first = attach_model(target)
+        assert publish_model(path, cache) == target
+        with open(os.path.join(target, META_FILE)) as f:
+            meta = f.read()
+
+        save(retrained, path)
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        assert publish_model(path, cache) == target
+        with open(os.path.join(target, META_FILE)) as f:
+            assert f.read() != meta
+        second = attach_model(target)
+        assert len(second.roots) == 15
+        assert np.abs(second.predict(X_val) - retrained.predict(X_val)).max() < 1e-5
+        # A process still mapping the old copy keeps reading it
+        assert np.abs(first.predict(X_val) - regressor.predict(X_val)).max() < 1e-5
+        assert sorted(os.listdir(cache)) == sorted([os.path.basename(target), os.path.basename(target) + ".lock"])
+
+
+def test_concurrent_publishers_share_one_copy():
+    _, classifier, X_val, _, _ = fitted_forests()
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "source_clf.pkl")
+        cache = os.path.join(folder, "cache")
+        save(classifier, path)
+        with multiprocessing.get_context("spawn").Pool(PUBLISHERS) as pool:
+            targets = pool.starmap(publish_model, [(path, cache)] * PUBLISHERS * 2)
+        assert len(set(targets)) == 1
+        assert (attach_model(targets[0]).predict(X_val) == classifier.predict(X_val)).all()
+        # No staging or retired folders are left behind
+        assert len(os.listdir(cache)) == 2
+
+
+def main():
+    print("🧪 Shared model hosting test")
+    print("=" * 50)
+    try:
+        test_attached_models_predict_like_pickles()
+        test_changed_pickle_is_republished()
+        test_concurrent_publishers_share_one_copy()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print("✅ Shared models match the pickles, republish on change and publish safely in parallel")
+
+
+if __name__ == "__main__":
+    main()
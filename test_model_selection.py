@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test for hyperparameter search and the model registry
+Runs select_model on small synthetic, time-ordered data for both targets,
+checks the cost-based choice among accurate-enough candidates, and that
+saved artifacts match their manifests and get increasing versions
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+from model_selection import HOLDOUT_FRACTION, choose, save_artifact, select_model, time_ordered
+from test_model_compaction import synthetic_data
+
+ROWS = 400
+# Small enough that a search takes a few seconds
+SEARCH = {"strategy": "random", "candidates": 3, "splits": 3, "top_k": 2}
+
+
+def telemetry(rows=ROWS):
+    """Synthetic readings every 15 minutes, shuffled so select_model has to order them"""
+    X, y, labels = synthetic_data(rows)
+    df = X.copy()
+    df["Timestamp"] = pd.date_range("2024-01-01", periods=rows, freq="15min")
+    order = np.random.default_rng(3).permutation(rows)
+    return df.iloc[order], X.iloc[order], y.iloc[order], pd.Series(labels, index=X.index).iloc[order]
+
+
+def candidate(score, single_row_us, memory_bytes):
+    return {"metrics": {"score": score, "single_row_us": single_row_us, "memory_bytes": memory_bytes}}
+
+
+def test_time_ordered_sorts_by_timestamp():
+    df, X, y, _ = telemetry()
+    X_sorted, y_sorted = time_ordered(df, X, y)
+    assert (df.loc[X_sorted.index, "Timestamp"].diff().dropna() > pd.Timedelta(0)).all()
+    assert (y_sorted.index == X_sorted.index).all()
+
+
+def test_select_model_for_both_targets():
+    df, X, y, labels = telemetry()
+    for name, target in [("priority_reg", y), ("source_clf", labels)]:
+        model, winner, candidates, holdout_rows = select_model(name, df, X, target, **SEARCH)
+        assert holdout_rows == ROWS - int(ROWS * (1 - HOLDOUT_FRACTION))
+        assert 1 <= len(candidates) <= SEARCH["top_k"] and winner in candidates
+        assert winner["eligible"] and winner is choose(candidates, 0.01)
+        # The refit model has seen the holdout, so it carries no holdout score
+        assert "score" not in winner["refit_metrics"] and "score" in winner["metrics"]
+        prediction = model.predict(X)
+        assert len(prediction) == ROWS
+        if name == "source_clf":
+            assert set(prediction) <= set(labels)
+
+
+def test_choose_filters_by_tolerance_then_ranks_by_cost():
+    candidates = [
+        candidate(0.95, 200.0, 4000),  # most accurate, most expensive
+        candidate(0.945, 100.0, 2000),  # within tolerance, cheapest
+        candidate(0.94, 100.0, 2000),  # same cost, slightly less accurate
+        candidate(0.80, 10.0, 100),  # cheapest overall, not accurate enough
+    ]
+    winner = choose(candidates, 0.01)
+    assert winner is candidates[1]
+    assert [c["eligible"] for c in candidates] == [True, True, True, False]
+    assert [c["serving_cost"] for c in candidates[:3]] == [2.0, 1.0, 1.0]
+    assert candidates[3]["serving_cost"] < 1.0
+
+    # With no tolerance only the most accurate candidate is eligible
+    assert choose(candidates, 0.0) is candidates[0]
+
+
+def test_save_artifact_matches_manifest():
+    df, X, y, _ = telemetry()
+    model, winner, _, _ = select_model("priority_reg", df, X, y, **SEARCH)
+    with tempfile.TemporaryDirectory() as registry:
+        folders = [save_artifact("priority_reg", model, {"metrics": winner["refit_metrics"]}, registry)
+                   for _ in range(3)]
+        assert [os.path.basename(folder) for folder in folders] == ["v1", "v2", "v3"]
+        for version, folder in enumerate(folders, 1):
+            with open(os.path.join(folder, "manifest.json")) as f:
+                manifest = json.load(f)
+            with open(os.path.join(folder, "model.pkl"), "rb") as f:
+                blob = f.read()
+            assert manifest["name"] == "priority_reg" and manifest["version"] == version
+            assert manifest["sha256"] == hashlib.sha256(blob).hexdigest()
+            assert manifest["metrics"]["size_bytes"] == len(blob)
+            assert np.allclose(pickle.loads(blob).predict(X), model.predict(X))
+
+
+def main():
+    print("🧪 Model selection test")
+    print("=" * 50)
+    try:
+        test_time_ordered_sorts_by_timestamp()
+        test_select_model_for_both_targets()
+        test_choose_filters_by_tolerance_then_ranks_by_cost()
+        test_save_artifact_matches_manifest()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print("✅ Search, cost-based choice and versioned artifacts behave as documented")
+
+
+if __name__ == "__main__":
+    main()
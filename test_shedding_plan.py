@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Parity test for precomputed shedding plans
+Checks that a plan lookup returns exactly the MCB statuses of the greedy
+allocation for random loads, priorities and supplies, including supplies
+that land on the breakpoints where the allocation changes, and for live
+loads that drift from the planned ones within the planner's tolerance
+"""
+
+import math
+import os
+import random
+import sys
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+from grid_failure_handler import allocate_mcb_power, simulate_grid_failure
+from shedding_planner import PLAN_LOAD_TOLERANCE, SheddingPlan, SheddingPlanner
+
+CASES = 300
+SUPPLIES_PER_CASE = 200
+
+
+def random_loads(rng):
+    count = rng.randint(1, 12)
+    mcb_powers = {f"MCB_{i}": round(rng.uniform(0.1, 10.0), rng.choice([0, 1, 2, 3])) for i in range(1, count + 1)}
+    mcb_priorities = None
+    if rng.random() < 0.5:
+        mcb_priorities = {mcb_id: rng.randint(1, 6) for mcb_id in mcb_powers if rng.random() < 0.8}
+    return mcb_powers, mcb_priorities
+
+
+def supplies_for(rng, mcb_powers):
+    """Random supplies plus every partial sum of loads, the spots where float rounding bites"""
+    total = sum(mcb_powers.values())
+    supplies = [rng.uniform(-1.0, total * 1.2) for _ in range(SUPPLIES_PER_CASE)]
+    loads = list(mcb_powers.values())
+    for _ in range(20):
+        rng.shuffle(loads)
+        running = 0.0
+        for power in loads:
+            running += power
+            supplies += [running, math.nextafter(running, -math.inf), math.nextafter(running, math.inf)]
+    return supplies + [0.0, total]
+
+
+def check_parity(cases=CASES, seed=7):
+    """Return a list of mismatches between plan lookups and the greedy allocation"""
+    rng = random.Random(seed)
+    mismatches = []
+    for _ in range(cases):
+        mcb_powers, mcb_priorities = random_loads(rng)
+        plan = SheddingPlan(mcb_powers, mcb_priorities)
+        for supply in supplies_for(rng, mcb_powers):
+            expected, expected_remaining = allocate_mcb_power(mcb_powers, supply, mcb_priorities)
+            statuses, remaining = plan.lookup(supply)
+            if statuses != expected or not math.isclose(remaining, expected_remaining, abs_tol=1e-9):
+                mismatches.append((mcb_powers, mcb_priorities, supply, statuses, expected))
+    return mismatches
+
+
+def drifted(rng, mcb_powers, tolerance=PLAN_LOAD_TOLERANCE):
+    """Live readings of the planned loads, each off by up to `tolerance` kW"""
+    return {mcb_id: power + rng.uniform(-tolerance, tolerance) for mcb_id, power in mcb_powers.items()}
+
+
+def check_live_parity(cases=CASES, seed=9):
+    """Return mismatches between plan lookups with drifted live loads and the greedy allocation on them"""
+    rng = random.Random(seed)
+    mismatches = []
+    for _ in range(cases):
+        mcb_powers, mcb_priorities = random_loads(rng)
+        plan = SheddingPlan(mcb_powers, mcb_priorities)
+        live = drifted(rng, mcb_powers)
+        if not plan.matches(live, mcb_priorities):
+            mismatches.append((mcb_powers, mcb_priorities, live, "plan does not cover the live loads"))
+            continue
+        for supply in supplies_for(rng, live) + supplies_for(rng, mcb_powers):
+            expected, expected_remaining = allocate_mcb_power(live, supply, mcb_priorities)
+            statuses, remaining = plan.lookup(supply, live)
+            if statuses != expected or not math.isclose(remaining, expected_remaining, abs_tol=1e-9):
+                mismatches.append((mcb_powers, mcb_priorities, live, supply))
+    return mismatches
+
+
+def test_plan_matches_greedy_allocation():
+    mismatches = check_parity()
+    assert not mismatches, mismatches[:3]
+
+
+def test_reported_cases():
+    mcb_powers = {"MCB_1": 5.05, "MCB_2": 3, "MCB_3": 2}
+    plan = SheddingPlan(mcb_powers)
+    for supply in [5.09, 10.05, 5.05, 8.05, 8.0499, 0.0]:
+        assert plan.lookup(supply)[0] == allocate_mcb_power(mcb_powers, supply)[0], supply
+    assert plan.lookup(10.05)[0] == {"MCB_1": 1, "MCB_2": 1, "MCB_3": 1}
+
+
+def test_oversized_site_falls_back_to_allocation():
+    mcb_powers = {f"MCB_{i}": 2.0 ** -i for i in range(1, 16)}
+    plan = SheddingPlan(mcb_powers, max_levels=64)
+    assert plan.starts is None
+    for supply in [0.3, 0.71, 1.0]:
+        assert plan.lookup(supply) == allocate_mcb_power(mcb_powers, supply)
+
+
+def test_planner_keys_on_loads_and_priorities():
+    mcb_powers = {"MCB_1": 8.0, "MCB_2": 7.0, "MCB_3": 6.0}
+    mcb_priorities = {"MCB_1": 3, "MCB_2": 1, "MCB_3": 2}
+    planner = SheddingPlanner()
+    planner.update_loads("site-a", mcb_powers, mcb_priorities)
+    planner.rebuild_pending()
+
+    plan = planner.get_plan("site-a", mcb_powers, mcb_priorities)
+    assert plan is not None
+    assert planner.get_plan("site-a", mcb_powers) is None
+    assert planner.get_plan("site-a", {**mcb_powers, "MCB_3": 6.5}, mcb_priorities) is None
+
+    # Priorities reach the allocation whether or not a plan is used
+    with_plan = simulate_grid_failure(5, 5, 3, 0, 80, 21, mcb_powers, 0, 0, plan, mcb_priorities)
+    without_plan = simulate_grid_failure(5, 5, 3, 0, 80, 21, mcb_powers, 0, 0, None, mcb_priorities)
+    assert with_plan["mcb_statuses"] == without_plan["mcb_statuses"] == {"MCB_2": 1, "MCB_3": 1, "MCB_1": 0}
+
+
+def test_live_loads_match_greedy_allocation():
+    mismatches = check_live_parity()
+    assert not mismatches, mismatches[:3]
+
+
+def test_live_load_request_hits_the_plan():
+    inventory_powers = {"MCB_1": 8.0, "MCB_2": 7.0, "MCB_3": 6.0, "MCB_4": 5.0, "MCB_5": 4.0}
+    mcb_priorities = {"MCB_1": 1, "MCB_2": 2, "MCB_3": 3, "MCB_4": 7, "MCB_5": 8}
+    planner = SheddingPlanner()
+    planner.update_loads("site-a", inventory_powers, mcb_priorities)
+    planner.rebuild_pending()
+
+    # The site actually draws other loads; readings while the grid is up
+    # move the plan onto them, and jitter within the tolerance doesn't
+    rng = random.Random(1)
+    observed = {"MCB_1": 6.3, "MCB_2": 2.1, "MCB_3": 4.4, "MCB_4": 3.05, "MCB_5": 1.7}
+    for _ in range(50):
+        planner.update_loads("site-a", drifted(rng, observed, PLAN_LOAD_TOLERANCE / 2), mcb_priorities)
+    assert planner.dirty == {"site-a"}
+    planner.rebuild_pending()
+    assert planner.get_plan("site-a", inventory_powers, mcb_priorities) is None
+    planner.update_loads("site-a", drifted(rng, observed, PLAN_LOAD_TOLERANCE / 2), mcb_priorities)
+    assert not planner.dirty
+
+    # On failure the live reading gets the plan, and the lookup answers
+    # without a fresh allocation for a supply clear of the breakpoints
+    live = drifted(rng, observed, PLAN_LOAD_TOLERANCE / 2)
+    plan = planner.get_plan("site-a", live, mcb_priorities)
+    assert plan is not None
+    without_plan = simulate_grid_failure(4.0, 3.0, 2.0, 0, 60, 0, live, 0, 0, None, mcb_priorities)
+    with mock.patch("shedding_planner.allocate_mcb_power", side_effect=AssertionError("plan not used")):
+        with_plan = simulate_grid_failure(4.0, 3.0, 2.0, 0, 60, 0, live, 0, 0, plan, mcb_priorities)
+    assert with_plan["mcb_statuses"] == without_plan["mcb_statuses"]
+    assert math.isclose(with_plan["remaining_power"], without_plan["remaining_power"], abs_tol=1e-9)
+
+
+def main():
+    print("🧪 Shedding plan parity test")
+    print("=" * 50)
+    mismatches = check_parity()
+    checked = CASES * SUPPLIES_PER_CASE
+    if mismatches:
+        print(f"❌ {len(mismatches)} mismatches, first few:")
+        for mcb_powers, mcb_priorities, supply, statuses, expected in mismatches[:10]:
+            print(f"   loads={mcb_powers} priorities={mcb_priorities} supply={supply!r}")
+            print(f"      plan={statuses} greedy={expected}")
+        sys.exit(1)
+    live_mismatches = check_live_parity()
+    if live_mismatches:
+        print(f"❌ {len(live_mismatches)} mismatches with drifted live loads, first few:")
+        for mismatch in live_mismatches[:10]:
+            print(f"   {mismatch}")
+        sys.exit(1)
+    print(f"✅ Plan lookups match the greedy allocation ({CASES} sites, {checked}+ supplies, planned and live loads)")
+
+
+if __name__ == "__main__":
+    main()